@@ -0,0 +1,271 @@
+"""
+Load-test the crawl pipeline offline, against a local stand-in for the shops.
+
+A separate process serves the saved corpus (benchmarks/corpus/, see make_corpus.py) on --hosts ports, each port
+standing in for one shop. Every URL /p/<page>/<n> returns the corpus page <page>, after --latency milliseconds.
+Half of the shops answer conditional requests with 304 Not Modified (ETag / Last-Modified); the other half always
+send the full page, like most shops do.
+
+Scenarios:
+- track: --tracks `!rena track` crawls, --concurrency at a time. Each crawl runs what start_crawl does: stream the
+  page, use the domain's cached rule or search for the selector, rank the candidates against the title and read
+  the price.
+- recheck-cold: the background price checker over --trackers trackers that have never been checked
+  (renachan.cogs.tasks.check_url, hosts checked PRICE_CHECK_CONCURRENCY at a time).
+- recheck-warm: the same trackers again, now with the ETag / Last-Modified / content hash from the cold run.
+
+For each scenario it prints throughput, p50/p99 latency per crawl, peak RSS of the bot process, how many prices
+were read correctly, and the crawl counters (pages whose parsing was skipped, bytes a streamed crawl didn't need).
+
+Usage:
+    python benchmarks/crawler_load.py --tracks 500 --concurrency 50 --trackers 2000 --hosts 8 --latency 20
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+from aiohttp import web
+
+import renachan
+from renachan.cogs.tasks import group_by_host, check_url
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.cogs.utils.crawler import CreepyCrawler, CrawlStats, ExtractionRules
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+LAST_MODIFIED = "Tue, 01 Aug 2023 00:00:00 GMT"
+
+
+def load_manifest():
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def serve(hosts, latency, connection):
+    """
+    Run the stand-in shops (in their own process) and send their ports back through `connection`.
+    """
+    pages = {}
+    for entry in load_manifest():
+        with open(os.path.join(CORPUS_DIR, entry['file']), "rb") as file:
+            body = file.read()
+        pages[entry['file']] = (body, f'"{zlib.crc32(body):08x}"')
+
+    def shop(conditional):
+        async def product(request):
+            await asyncio.sleep(latency / 1000)
+            body, etag = pages[request.match_info['page']]
+            if not conditional:
+                return web.Response(body=body, content_type="text/html")
+            if request.headers.get('If-None-Match') == etag or request.headers.get('If-Modified-Since') == LAST_MODIFIED:
+                return web.Response(status=304)
+            return web.Response(body=body, content_type="text/html", headers={'ETag': etag, 'Last-Modified': LAST_MODIFIED})
+
+        app = web.Application()
+        app.router.add_get("/robots.txt", lambda request: web.Response(text="User-agent: *\nAllow: /\n"))
+        app.router.add_get("/p/{page}/{n}", product)
+        return app
+
+    async def main():
+        ports = []
+        for index in range(hosts):
+            runner = web.AppRunner(shop(conditional=index % 2 == 0), access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            ports.append(site._server.sockets[0].getsockname()[1])
+        connection.send(ports)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+class PeakRSS:
+    """
+    Sample the process's resident memory in the background and keep the highest value.
+    """
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._task = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+class Bot:
+    """
+    The parts of the bot the crawl pipeline uses.
+    """
+    def __init__(self):
+        self.fetcher = AsyncFetcher(concurrency=renachan.config.crawler_concurrency(),
+                                    per_host_limit=renachan.config.crawler_per_host_limit(),
+                                    timeout=renachan.config.crawler_timeout(),
+                                    retries=renachan.config.crawler_retries(),
+                                    max_retry_after=renachan.config.crawler_max_retry_after(),
+                                    user_agent=renachan.config.crawler_user_agent())
+        self.crawl_stats = CrawlStats()
+        self.extraction_rules = ExtractionRules(max_entries=renachan.config.extraction_rules_size())
+
+
+async def track(bot, url, entry, streaming):
+    """
+    The crawl a `!rena track` command runs (start_crawl without the Discord replies and the database).
+    """
+    crawler = CreepyCrawler(url=url, fetcher=bot.fetcher, stats=bot.crawl_stats, rules=bot.extraction_rules)
+    if streaming:
+        await crawler.stream_load(entry['selector_type'], entry['selector'], entry['title'])
+    return await crawler.find_price(entry['selector_type'], entry['selector'], entry['title'], entry['currency'])
+
+
+async def run_tracks(bot, urls, concurrency, streaming):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    correct = 0
+
+    async def one(url, entry):
+        nonlocal correct
+        async with semaphore:
+            start = time.perf_counter()
+            price = await track(bot, url, entry, streaming)
+            latencies.append(time.perf_counter() - start)
+            correct += price == entry['price']
+
+    await asyncio.gather(*(one(url, entry) for url, entry in urls))
+    return latencies, correct
+
+
+async def run_rechecks(bot, trackers, entries):
+    """
+    One round of the background price checker over `trackers` (what check_batch does, without the database).
+    """
+    semaphore = asyncio.Semaphore(renachan.config.price_check_concurrency())
+    latencies = []
+    results = []
+
+    async def timed(url, url_trackers, checked_at):
+        start = time.perf_counter()
+        checked = await check_url(bot, url, url_trackers, checked_at)
+        latencies.append(time.perf_counter() - start)
+        return checked
+
+    async def check_host(urls, checked_at):
+        async with semaphore:
+            batches = await asyncio.gather(*(timed(url, url_trackers, checked_at) for url, url_trackers in urls.items()))
+            return [result for batch in batches for result in batch]
+
+    checked_at = time.time()
+    for outcome in await asyncio.gather(*(check_host(urls, checked_at) for urls in group_by_host(trackers).values())):
+        results.extend(outcome)
+
+    correct = sum(result['price'] == entries[result['tracker_id']]['price'] for result in results)
+    return latencies, correct, results
+
+
+def make_trackers(urls):
+    """
+    Tracker rows as due_trackers() returns them. Every other URL is tracked by two members.
+    """
+    trackers = []
+    for index, (url, entry) in enumerate(urls):
+        for member in range(1 + index % 2):
+            trackers.append({
+                'tracker_id': len(trackers), 'member_id': member, 'track_url': url, 'title': entry['title'],
+                'price': None, 'available': True, 'selector_type': entry['selector_type'],
+                'selector': entry['selector'], 'currency_symbol': entry['currency'],
+                'etag': None, 'last_modified': None, 'content_hash': None, 'entry': entry,
+            })
+    return trackers
+
+
+def report(name, requests, latencies, elapsed, correct, peak, stats):
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(f"{name:<13} {requests:>6} {elapsed:8.2f}s {len(latencies) / elapsed:9.1f}/s "
+          f"{statistics.median(latencies) * 1000:9.1f} ms {p99 * 1000:9.1f} ms {peak / 2**20:9.1f} MiB "
+          f"{correct:>6}/{requests:<6} {stats.skip_rate:8.0%} {stats.bytes_saved / 2**20:9.1f} MiB")
+
+
+async def benchmark(args, ports):
+    rng = random.Random(42)
+    manifest = load_manifest()
+    hosts = [f"http://127.0.0.1:{port}" for port in ports]
+
+    def urls(count):
+        return [(f"{rng.choice(hosts)}/p/{entry['file']}/{n}", entry)
+                for n, entry in ((n, rng.choice(manifest)) for n in range(count))]
+
+    print(f"{'scenario':<13} {'crawls':>6} {'time':>9} {'throughput':>11} {'p50':>12} {'p99':>12} {'peak RSS':>13} "
+          f"{'correct':>13} {'skipped':>8} {'not fetched':>13}")
+
+    bot = Bot()
+    track_urls = urls(args.tracks)
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        latencies, correct = await run_tracks(bot, track_urls, args.concurrency, not args.no_streaming)
+        elapsed = time.perf_counter() - start
+    report("track", args.tracks, latencies, elapsed, correct, rss.peak, bot.crawl_stats)
+    await bot.fetcher.close()
+
+    bot = Bot()
+    trackers = make_trackers(urls(args.trackers // 2 + args.trackers % 2))[:args.trackers]
+    entries = {tracker['tracker_id']: tracker['entry'] for tracker in trackers}
+    for name in ("recheck-cold", "recheck-warm"):
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            latencies, correct, results = await run_rechecks(bot, trackers, entries)
+            elapsed = time.perf_counter() - start
+        report(name, len(trackers), latencies, elapsed, correct, rss.peak, bot.crawl_stats)
+
+        # Store what the checker would have written, so the warm round sends conditional requests
+        written = {result['tracker_id']: result for result in results}
+        for tracker in trackers:
+            for field in ('price', 'available', 'etag', 'last_modified', 'content_hash'):
+                tracker[field] = written[tracker['tracker_id']][field]
+        bot.crawl_stats = CrawlStats()
+    await bot.fetcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=500, help="`!rena track` crawls to run (default: 500)")
+    parser.add_argument("--concurrency", type=int, default=50, help="track crawls in flight at once (default: 50)")
+    parser.add_argument("--trackers", type=int, default=2000, help="trackers in the re-check rounds (default: 2000)")
+    parser.add_argument("--hosts", type=int, default=8, help="stand-in shops to spread the URLs over (default: 8)")
+    parser.add_argument("--latency", type=float, default=20, help="milliseconds each shop waits before answering (default: 20)")
+    parser.add_argument("--no-streaming", action="store_true", help="download whole pages in the track scenario")
+    args = parser.parse_args()
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(target=serve, args=(args.hosts, args.latency, sender), daemon=True)
+    server.start()
+    try:
+        ports = receiver.recv()
+        asyncio.run(benchmark(args, ports))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
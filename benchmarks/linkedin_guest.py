@@ -0,0 +1,196 @@
+"""
+Run LinkedIn job searches over plain HTTP against a local stand-in for the guest job search endpoint.
+
+The stand-in answers /jobs-guest/jobs/api/seeMoreJobPostings/search like LinkedIn does: pages of 25 job cards
+(the `start` parameter picks the page) out of --results per search, generated deterministically from the search's
+keywords and geoId, after --latency milliseconds. Before every run after the first, --new-jobs jobs are posted at the
+top of every search. One search in --blocked answers 999 (how LinkedIn turns away clients it doesn't like), which is
+what sends a search to the browser fallback. With --robots-disallow the stand-in also serves linkedin.com's answer to
+unlisted user agents, a robots.txt that disallows everything: every search is then refused before it is sent, unless
+--ignore-robots skips the check like LINKEDIN_RESPECT_ROBOTS=false does.
+
+The searches are the keyword x location matrix of LinkedinURLGenerator, built here the same way, and go through
+renachan.cogs.utils.linkedIn_guest.fetch_new_jobs with the bot's AsyncFetcher and an in-memory SeenUrls, --runs times.
+For every run the script prints the time taken, the requests made, how many new jobs were found (and whether they
+are exactly the ones the stand-in posted since the last run), how many searches would fall back to a browser, and the
+peak RSS of the process, which is to be compared with one Firefox per worker.
+
+Usage:
+    python benchmarks/linkedin_guest.py --keywords 20 --locations 10 --results 100 --new-jobs 5 --runs 3
+    python benchmarks/linkedin_guest.py --robots-disallow
+    python benchmarks/linkedin_guest.py --robots-disallow --ignore-robots
+"""
+import os
+import sys
+import time
+import zlib
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+from aiohttp import web
+
+import renachan
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.managers.seen import SeenUrls
+from renachan.cogs.utils.linkedIn_guest import PAGE_SIZE, fetch_new_jobs
+
+GUEST_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vehement", "Soylent", "Stark"]
+PLACES = ["Austin, TX", "Houston, TX", "Dallas, TX", "Remote", "New York, NY"]
+
+
+def job_id(keywords, geo_id, index):
+    return zlib.crc32(f"{keywords}|{geo_id}|{index}".encode()) % 10**10
+
+
+def job_card(keywords, geo_id, index):
+    # Shaped like a real guest card: the link, title, company, location and date are what parse_job_cards reads
+    identifier = job_id(keywords, geo_id, index)
+    company = COMPANIES[identifier % len(COMPANIES)]
+    return (f"<li><div class=\"base-card relative w-full base-card--link base-search-card base-search-card--link "
+            f"job-search-card\" data-entity-urn=\"urn:li:jobPosting:{identifier}\">"
+            f"<a class=\"base-card__full-link absolute top-0 right-0 bottom-0 left-0 p-0 z-[2]\" "
+            f"href=\"https://www.linkedin.com/jobs/view/{identifier}?refId=abc%3D%3D&amp;trackingId=def\">"
+            f"<span class=\"sr-only\">{keywords} Engineer</span></a>"
+            f"<div class=\"search-entity-media\"><img class=\"artdeco-entity-image\" data-delayed-url=\"/logo.png\" alt=\"\"></div>"
+            f"<div class=\"base-search-card__info\"><h3 class=\"base-search-card__title\">\n   {keywords} Engineer  \n</h3>"
+            f"<h4 class=\"base-search-card__subtitle\"><a class=\"hidden-nested-link\" href=\"/company/{company}\">\n"
+            f"{company}</a></h4><div class=\"base-search-card__metadata\">"
+            f"<span class=\"job-search-card__location\">\n {PLACES[identifier % len(PLACES)]} \n</span>"
+            f"<time class=\"job-search-card__listdate\" datetime=\"2023-08-{1 + identifier % 28:02d}\">1 week ago</time>"
+            f"</div></div></div></li>")
+
+
+def geo_id_of(job):
+    return job['url'].split("geoId=")[1].split("&")[0]
+
+
+class StandIn:
+    """
+    The guest endpoint. Results are numbered from the oldest (0) up; run `run` lists the newest first, so every new
+    run pushes `new_jobs` fresh results onto the first page of every search.
+    """
+    def __init__(self, results, new_jobs, latency, blocked, robots_disallow=False):
+        self.results = results
+        self.new_jobs = new_jobs
+        self.latency = latency
+        self.blocked = blocked
+        self.robots_disallow = robots_disallow
+        self.run = 0
+        self.requests = 0
+
+    def newest(self):
+        return self.results + self.run * self.new_jobs
+
+    def listing(self, keywords, geo_id, start):
+        newest = self.newest()
+        return [job_card(keywords, geo_id, newest - 1 - position)
+                for position in range(start, min(start + PAGE_SIZE, newest))]
+
+    async def search(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency / 1000)
+        keywords = request.query.get('keywords', "")
+        geo_id = request.query.get('geoId', "")
+        if self.blocked and zlib.crc32(f"{keywords}|{geo_id}".encode()) % self.blocked == 0:
+            return web.Response(status=999)
+        body = "".join(self.listing(keywords, geo_id, int(request.query.get('start', "0"))))
+        return web.Response(text=body, content_type="text/html")
+
+    async def robots(self, request):
+        if not self.robots_disallow:
+            return web.Response(status=404)
+        return web.Response(text="User-agent: *\nDisallow: /\n")
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get(GUEST_PATH, self.search)
+        app.router.add_get("/robots.txt", self.robots)
+        return app
+
+    def posted_since(self, job, run):
+        # The job URLs that appeared since the run before `run` (all of them for the first run)
+        oldest = 0 if run == 0 else self.results + (run - 1) * self.new_jobs
+        return {f"https://www.linkedin.com/jobs/view/{job_id(job['keyword'], geo_id_of(job), index)}"
+                for index in range(oldest, self.newest())}
+
+
+def complete(cards):
+    return all(card['title'] and card['company'] and card['location'] and card['posted'] for card in cards)
+
+
+def searches(keywords, locations):
+    # The same query LinkedinURLGenerator builds, with a geoId per location
+    return [{'url': f"https://www.linkedin.com/jobs/search/?f_AL=true&keywords=Keyword{k}&geoId={100000 + l}&sortBy=DD",
+             'keyword': f"Keyword{k}", 'location': f"Location {l}"}
+            for l in range(locations) for k in range(keywords)]
+
+
+async def benchmark(args):
+    stand_in = StandIn(args.results, args.new_jobs, args.latency, args.blocked, args.robots_disallow)
+    runner = web.AppRunner(stand_in.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}{GUEST_PATH}"
+
+    fetcher = AsyncFetcher(concurrency=renachan.config.crawler_concurrency(),
+                           per_host_limit=args.per_host, timeout=renachan.config.crawler_timeout(),
+                           retries=0, user_agent=renachan.config.crawler_user_agent())
+    jobs = searches(args.keywords, args.locations)
+    seen = SeenUrls()
+    await seen.load()
+    process = psutil.Process()
+    peak = process.memory_info().rss
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, process.memory_info().rss)
+            await asyncio.sleep(0.02)
+
+    print(f"{len(jobs)} searches, {args.per_host} requests at a time")
+    print(f"{'run':>3} {'time':>8} {'requests':>9} {'new jobs':>9} {'correct':>13} {'to browser':>11}")
+    sampler = asyncio.get_running_loop().create_task(sample())
+    for run in range(args.runs):
+        stand_in.run = run
+        stand_in.requests = 0
+        start = time.perf_counter()
+        results = await asyncio.gather(*(fetch_new_jobs(fetcher, job, seen, base_url, args.max_pages, not args.ignore_robots)
+                                         for job in jobs))
+        elapsed = time.perf_counter() - start
+
+        answered = [(job, cards) for job, cards in zip(jobs, results) if cards is not None]
+        correct = sum({card['url'] for card in cards} == stand_in.posted_since(job, run) and complete(cards)
+                      for job, cards in answered)
+        print(f"{run + 1:>3} {elapsed:7.2f}s {stand_in.requests:>9} {sum(len(cards) for _, cards in answered):>9} "
+              f"{correct:>6}/{len(answered):<6} {len(jobs) - len(answered):>11}")
+    sampler.cancel()
+    print(f"peak RSS {peak / 2**20:.1f} MiB, {len(seen)} job URLs in the seen set")
+
+    await fetcher.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=20, help="keywords in the search matrix (default: 20)")
+    parser.add_argument("--locations", type=int, default=10, help="locations in the search matrix (default: 10)")
+    parser.add_argument("--results", type=int, default=100, help="results per search at the first run (default: 100)")
+    parser.add_argument("--new-jobs", type=int, default=5, help="jobs posted per search between runs (default: 5)")
+    parser.add_argument("--runs", type=int, default=3, help="crawl runs (default: 3)")
+    parser.add_argument("--max-pages", type=int, default=renachan.config.linkedin_max_pages(),
+                        help="pages read per search at most (default: LINKEDIN_MAX_PAGES)")
+    parser.add_argument("--latency", type=float, default=50, help="milliseconds the stand-in waits before answering (default: 50)")
+    parser.add_argument("--per-host", type=int, default=4, help="requests in flight at once (default: 4)")
+    parser.add_argument("--blocked", type=int, default=20, help="one search in this many is answered 999; 0 for none (default: 20)")
+    parser.add_argument("--robots-disallow", action="store_true", help="serve a robots.txt that disallows every path")
+    parser.add_argument("--ignore-robots", action="store_true", help="don't check robots.txt (LINKEDIN_RESPECT_ROBOTS=false)")
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark the hot lookup paths before and after the lookup indexes are added.
+
+Builds a SQLite database with the table layout the bot used before the indexes existed, fills it with
+--rows rows per table, times random lookups, runs the same migration the bot runs on startup
+(renachan.managers.migrations.add_lookup_indexes) and times the same lookups again.
+
+Usage:
+    python benchmarks/lookup_indexes.py --rows 1000000 --lookups 200
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from renachan.managers.migrations import add_lookup_indexes
+
+# The tables as they were created before the indexes and the association primary key were added
+OLD_SCHEMA = """
+CREATE TABLE trackers (
+    tracker_id INTEGER NOT NULL PRIMARY KEY, server_id INTEGER, member_id INTEGER, track_url VARCHAR,
+    title VARCHAR, available BOOLEAN, price FLOAT, last_checked DATETIME NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+);
+CREATE TABLE linkedin_urls (
+    id INTEGER NOT NULL PRIMARY KEY, url VARCHAR, keyword VARCHAR, location VARCHAR, applied BOOLEAN,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+);
+CREATE TABLE member_server_association (
+    member_id INTEGER, server_id INTEGER, created_at DATETIME, updated_at DATETIME
+);
+"""
+
+MEMBERS = 50000
+SERVERS = 1000
+NOW = "2023-08-01 00:00:00"
+
+
+def populate(path, rows):
+    connection = sqlite3.connect(path)
+    connection.executescript(OLD_SCHEMA)
+    connection.executemany(
+        "INSERT INTO trackers (member_id, track_url, title, available, price, last_checked, created_at, updated_at) "
+        "VALUES (?, ?, 'item', 1, 9.99, ?, ?, ?)",
+        ((i % MEMBERS, f"https://shop.example/item/{i}", NOW, NOW, NOW) for i in range(rows))
+    )
+    connection.executemany(
+        "INSERT INTO linkedin_urls (url, keyword, location, applied, created_at, updated_at) "
+        "VALUES (?, 'python', 'Austin, TX', 0, ?, ?)",
+        ((f"https://www.linkedin.com/jobs/view/{i}", NOW, NOW) for i in range(rows))
+    )
+    connection.executemany(
+        "INSERT INTO member_server_association VALUES (?, ?, ?, ?)",
+        ((i % MEMBERS, i // MEMBERS % SERVERS, NOW, NOW) for i in range(rows))
+    )
+    connection.commit()
+    connection.close()
+
+
+def time_lookups(path, rows, lookups):
+    rng = random.Random(42)
+    queries = {
+        "trackers by (member_id, track_url)": (
+            "SELECT tracker_id FROM trackers WHERE member_id = ? AND track_url = ?",
+            lambda: (lambda i: (i % MEMBERS, f"https://shop.example/item/{i}"))(rng.randrange(rows))
+        ),
+        "linkedin_urls by url": (
+            "SELECT id FROM linkedin_urls WHERE url = ?",
+            lambda: (f"https://www.linkedin.com/jobs/view/{rng.randrange(rows)}",)
+        ),
+        "member_server_association by member_id": (
+            "SELECT server_id FROM member_server_association WHERE member_id = ?",
+            lambda: (rng.randrange(MEMBERS),)
+        ),
+        "member_server_association by server_id": (
+            "SELECT member_id FROM member_server_association WHERE server_id = ?",
+            lambda: (rng.randrange(SERVERS),)
+        ),
+    }
+
+    connection = sqlite3.connect(path)
+    results = {}
+    for name, (sql, params) in queries.items():
+        timings = []
+        for _ in range(lookups):
+            args = params()
+            start = time.perf_counter()
+            connection.execute(sql, args).fetchall()
+            timings.append(time.perf_counter() - start)
+        results[name] = timings
+    connection.close()
+    return results
+
+
+def report(label, results):
+    print(f"\n{label}")
+    for name, timings in results.items():
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"  {name:<42} p50 {statistics.median(timings) * 1000:9.3f} ms   p99 {p99 * 1000:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="rows per table (default: 1,000,000)")
+    parser.add_argument("--lookups", type=int, default=200, help="lookups timed per query (default: 200)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+
+        start = time.perf_counter()
+        populate(path, args.rows)
+        print(f"Populated {args.rows:,} rows per table in {time.perf_counter() - start:.1f}s")
+
+        report("Before (no indexes)", time_lookups(path, args.rows, args.lookups))
+
+        engine = create_engine(f"sqlite:///{path}")
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            add_lookup_indexes(connection)
+        engine.dispose()
+        print(f"\nMigration (dedup + indexes + association rebuild) took {time.perf_counter() - start:.1f}s")
+
+        report("After (lookup indexes)", time_lookups(path, args.rows, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Write the product page corpus used by the crawler benchmarks into benchmarks/corpus/.
+
+The pages are synthetic but shaped like the shops people track: a product page with a "customers also bought"
+carousel, search listings with hundreds of near-identical titles, a European-formatted category grid, a price
+behind an id, and a page bloated with inline scripts. Every page is described in corpus/manifest.json with the
+selector a `!rena track` command would use, the embed title and the price the crawler should find.
+
+The output is deterministic, so re-running this script only changes the corpus when the script changes.
+
+Usage:
+    python benchmarks/make_corpus.py
+"""
+import os
+import json
+import zlib
+import random
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+BRANDS = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vehement", "Soylent", "Stark"]
+PRODUCTS = ["Widget", "Gadget", "Blender", "Headphones", "Keyboard", "Monitor", "Backpack", "Kettle"]
+MODELS = ["Ultra", "Pro", "Max", "Mini", "Air", "Plus", "Lite", "Neo"]
+COLOURS = ["Blue", "Red", "Black", "White", "Silver", "Green"]
+
+
+def product_title(rng):
+    return (f"{rng.choice(BRANDS)} {rng.choice(MODELS)} {rng.choice(PRODUCTS)} "
+            f"{rng.choice([100, 200, 300, 2000, 3000])} - {rng.choice(COLOURS)}")
+
+
+def near_miss(title, rng):
+    # Same brand and product, one detail changed: the hard case for picking the right card
+    words = title.split()
+    position = rng.choice([1, 3, 5])
+    replacement = {1: MODELS, 3: ["100", "200", "300", "2000", "3000"], 5: COLOURS}[position]
+    words[position] = rng.choice([word for word in replacement if word != words[position]])
+    return " ".join(words)
+
+
+def dollars(amount):
+    return f"${amount:,.2f}"
+
+
+def euros(amount):
+    whole, cents = f"{amount:,.2f}".split(".")
+    return f"{whole.replace(',', '.')},{cents} €"
+
+
+def page(title, body):
+    head = (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title>"
+            "<link rel='stylesheet' href='/static/site.css'></head><body>")
+    nav = "<header><nav>" + "".join(f"<a href='/c/{i}'>Category {i}</a>" for i in range(30)) + "</nav></header>"
+    footer = "<footer>" + "".join(f"<p>Footer link {i}</p>" for i in range(40)) + "</footer>"
+    return head + nav + body + footer + "</body></html>"
+
+
+def card(title, price, price_class="price", money=dollars):
+    return (f"<div class='card'><a href='/p/{zlib.crc32(title.encode()) % 100000}'><img src='/img/{len(title)}.jpg' alt=''>"
+            f"<h3 class='card-title'>{title}</h3></a><div class='rating'>★★★★☆ <span>(123)</span></div>"
+            f"<div class='buy'><span class='{price_class}'>{money(price)}</span></div></div>")
+
+
+def product_page(rng):
+    title = product_title(rng)
+    price = round(rng.uniform(20, 900), 2)
+    carousel = "".join(card(near_miss(title, rng), round(rng.uniform(5, 900), 2)) for _ in range(24))
+    body = (f"<main><div class='breadcrumbs'>Home / Gadgets / {title.split()[2]}</div>"
+            f"<div class='product'><h1 class='product-title'>{title}</h1>"
+            f"<div class='buy-box'><span class='price'>{dollars(price)}</span><button>Add to cart</button></div>"
+            f"<p class='description'>{'Great product. ' * 40}</p></div>"
+            f"<section class='carousel'><h2>Customers also bought</h2>{carousel}</section></main>")
+    return page(title, body), {'selector_type': "class", 'selector': "price", 'title': title, 'price': price, 'currency': "$"}
+
+
+def embed_title(title):
+    # How a title pasted into a Discord embed tends to drift from the page: different case and punctuation,
+    # and a typo in the last word
+    words = title.lower().replace(" - ", " ").split()
+    words[-1] = words[-1][:-1]
+    return " ".join(words)
+
+
+def listing_page(rng, cards, target_position, typo=False):
+    title = product_title(rng)
+    price = round(rng.uniform(20, 900), 2)
+    items = []
+    for index in range(cards):
+        if index == target_position:
+            items.append(card(title, price))
+        else:
+            other = near_miss(title, rng) if rng.random() < 0.3 else product_title(rng)
+            items.append(card(other, round(rng.uniform(5, 900), 2)))
+    body = f"<main><h1>Search results</h1><div class='results'>{''.join(items)}</div></main>"
+    return page("Search results", body), {'selector_type': "class", 'selector': "price",
+                                          'title': embed_title(title) if typo else title, 'price': price, 'currency': "$"}
+
+
+def euro_grid_page(rng):
+    title = product_title(rng)
+    price = round(rng.uniform(1000, 3000), 2)
+    target = rng.randrange(200)
+    items = [
+        card(title, price, "product-price", euros) if index == target
+        else card(product_title(rng), round(rng.uniform(5, 3000), 2), "product-price", euros)
+        for index in range(200)
+    ]
+    body = f"<main><h1>Kategorie</h1><div class='grid'>{''.join(items)}</div></main>"
+    return page("Kategorie", body), {'selector_type': "class", 'selector': "product-price", 'title': title, 'price': price, 'currency': "€"}
+
+
+def id_page(rng):
+    title = product_title(rng)
+    price = round(rng.uniform(20, 900), 2)
+    body = (f"<main><div id='title'><h1>{title}</h1></div>"
+            f"<div id='price'><span id='priceblock_ourprice'>{dollars(price)}</span></div>"
+            f"<div class='reviews'>{'<p>Works as described. 5 stars.</p>' * 200}</div></main>")
+    return page(title, body), {'selector_type': "id", 'selector': "priceblock_ourprice", 'title': None, 'price': price, 'currency': "$"}
+
+
+def bloated_page(rng):
+    title = product_title(rng)
+    price = round(rng.uniform(20, 900), 2)
+    state = json.dumps([{'sku': index, 'name': product_title(rng), 'tags': ["x" * 20] * 10} for index in range(2500)])
+    body = (f"<main><div class='product'><h1>{title}</h1><span class='price'>{dollars(price)}</span></div></main>"
+            f"<script>window.__STATE__ = {state};</script>"
+            f"<section class='reviews'>{'<div class=review><p>' + 'Lovely. ' * 30 + '</p></div>' * 1500}</section>")
+    return page(title, body), {'selector_type': "class", 'selector': "price", 'title': title, 'price': price, 'currency': "$"}
+
+
+def main():
+    rng = random.Random(2023)
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+
+    pages = {
+        "product_page.html": product_page(rng),
+        "search_listing_top.html": listing_page(rng, 300, 4),
+        "search_listing_middle.html": listing_page(rng, 300, 150),
+        "search_listing_bottom.html": listing_page(rng, 400, 395),
+        "search_listing_typo.html": listing_page(rng, 300, 200, typo=True),
+        "category_grid_eu.html": euro_grid_page(rng),
+        "price_by_id.html": id_page(rng),
+        "bloated_product.html": bloated_page(rng),
+    }
+
+    manifest = []
+    for name, (html, entry) in pages.items():
+        with open(os.path.join(CORPUS_DIR, name), "w", encoding="utf-8") as file:
+            file.write(html)
+        manifest.append({'file': name, **entry})
+        print(f"{name:<28} {len(html.encode()) / 1024:8.1f} KiB")
+
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Measure how long the bot takes to get ready to connect to Discord, and which imports that time goes to.
+
+Every measurement runs in a fresh interpreter (so nothing is already imported) with `python -X importtime`:
+
+- package: `import renachan`, what a short CLI run or a benchmark script pays.
+- entry: everything renachan.py does at import time, then setup_bot(). The next thing main() does is bot.run(),
+  which opens the gateway connection, so this is the time to gateway connect minus the network. The version check
+  and the LinkedIn self-test that main() runs first are left out: they are network and browser time, not startup.
+
+For each target it prints the median wall time of --runs processes (interpreter startup included), the median total
+reported by -X importtime, which heavy packages ended up imported, and the slowest top-level imports of one run.
+
+Usage:
+    python benchmarks/startup.py --runs 10 --top 10
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that are expensive to import and only needed by some features
+HEAVY = ("sqlalchemy", "lxml", "rapidfuzz", "psutil", "parsel", "selenium", "transformers", "torch", "sklearn")
+
+TARGETS = {
+    'package': "import renachan",
+    'entry': ("import importlib.util\n"
+              "spec = importlib.util.spec_from_file_location('renachan_main', os.path.join(ROOT, 'renachan.py'))\n"
+              "main = importlib.util.module_from_spec(spec)\n"
+              "spec.loader.exec_module(main)\n"
+              "main.setup_bot()"),
+}
+
+CHILD = """
+import os, sys
+ROOT = {root!r}
+sys.path.insert(0, ROOT)
+{code}
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def run_once(code):
+    """
+    Run `code` in a fresh interpreter. Returns (wall seconds, -X importtime lines, heavy packages imported).
+    """
+    script = CHILD.format(root=ROOT, code=code, heavy=HEAVY)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=ROOT,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = [line for line in result.stderr.splitlines() if line.startswith("import time:") and "|" in line]
+    heavy = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    return elapsed, lines, heavy
+
+
+def parse(lines):
+    """
+    -X importtime lines -> [(cumulative microseconds, module)] for top-level imports only.
+    """
+    imports = []
+    for line in lines[1:]:  # the first line is the header
+        _, cumulative, name = line.split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # imported by another module, already counted in its parent
+        imports.append((int(cumulative), name.strip()))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes per target (default: 10)")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list (default: 10)")
+    args = parser.parse_args()
+
+    for target, code in TARGETS.items():
+        walls, totals = [], []
+        for _ in range(args.runs):
+            elapsed, lines, heavy = run_once(code)
+            walls.append(elapsed)
+            totals.append(sum(cumulative for cumulative, _ in parse(lines)))
+
+        print(f"{target}: {statistics.median(walls) * 1000:.0f} ms wall, "
+              f"{statistics.median(totals) / 1000:.0f} ms importing (median of {args.runs})")
+        print(f"  heavy packages imported: {heavy.replace(',', ', ') or 'none'}")
+        for cumulative, name in sorted(parse(lines), reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark how find_correct_element() picks the price element on the saved product page corpus.
+
+For every page in benchmarks/corpus/ (see make_corpus.py), collects the candidates for the page's selector and
+times two ways of choosing between them:
+
+- word overlap: count the title's words in the text of each candidate's ancestors, one candidate at a time
+- rapidfuzz: renachan.cogs.utils.crawler.rank_candidates, one batched process.extract pass over every candidate
+
+and checks whether the chosen element holds the price listed in the manifest.
+
+Usage:
+    python benchmarks/title_matching.py --repeat 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import html
+from renachan.cogs.utils.crawler import PRICE_PATTERN, CONTEXT_DEPTH, element_text, words, rank_candidates, parse_price
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CONTEXT_LENGTH = 500
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), encoding="utf-8") as file:
+        manifest = json.load(file)
+    for entry in manifest:
+        with open(os.path.join(CORPUS_DIR, entry['file']), "rb") as file:
+            entry['tree'] = html.fromstring(file.read())
+    return manifest
+
+
+def candidates(entry):
+    tree = entry['tree']
+    if entry['selector_type'] == "class":
+        found = tree.find_class(entry['selector'])
+    else:
+        found = tree.xpath("//*[@id=$item_id]", item_id=entry['selector'])
+    return [element for element in found if PRICE_PATTERN.search(element_text(element))]
+
+
+def title_overlap(element, title_words):
+    # Title words found in the text of each ancestor, nearest first; compared as tuples so the nearest match wins
+    counts = []
+    node = element
+    for _ in range(CONTEXT_DEPTH):
+        node = node.getparent()
+        if node is None:
+            break
+        counts.append(len(title_words & words(node.text_content()[:CONTEXT_LENGTH * 2])))
+    return tuple(counts)
+
+
+def word_overlap(priced, title):
+    title_words = words(title)
+    scores = [title_overlap(element, title_words) for element in priced]
+    return priced[max(range(len(priced)), key=scores.__getitem__)]
+
+
+def fuzzy(priced, title):
+    return rank_candidates(priced, title)[0][0]
+
+
+def time_choice(choose, priced, title, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        element = choose(priced, title)
+        timings.append(time.perf_counter() - start)
+    return element, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per page and method (default: 20)")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"{'page':<28} {'candidates':>10}   {'word overlap':>18}   {'rapidfuzz':>18}   confidence")
+
+    correct = {'word overlap': 0, 'rapidfuzz': 0}
+    for entry in corpus:
+        priced = candidates(entry)
+        title = entry['title']
+        row = f"{entry['file']:<28} {len(priced):>10}"
+
+        if not title or len(priced) == 1:
+            # Nothing to choose between: both methods take the only candidate
+            ok = parse_price(element_text(priced[0]), entry['currency']) == entry['price']
+            correct['word overlap'] += ok
+            correct['rapidfuzz'] += ok
+            print(f"{row}   {'(single candidate)':>18}   {'(single candidate)':>18}")
+            continue
+
+        for name, choose in (('word overlap', word_overlap), ('rapidfuzz', fuzzy)):
+            element, median = time_choice(choose, priced, title, args.repeat)
+            ok = parse_price(element_text(element), entry['currency']) == entry['price']
+            correct[name] += ok
+            row += f"   {median * 1000:9.3f} ms {'ok' if ok else 'WRONG':>5}"
+
+        confidence = rank_candidates(priced, title)[0][1]
+        print(f"{row}   {confidence:.0%}")
+
+    print()
+    for name, count in correct.items():
+        print(f"{name:<13} picked the right price on {count}/{len(corpus)} pages")
+
+
+if __name__ == "__main__":
+    main()
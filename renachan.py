@@ -62,8 +62,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 ### This allows the script to access and use environment variables defined in the .env file during its execution.
 load_dotenv(join(dirname(__file__), '.env'))
 
-from renachan import renachan  # Import renachan package
-from renachan.managers.database import initialize_database
+import renachan  # Import renachan package (its submodules load on first use, see renachan/__init__.py)
+from renachan.managers.storage import STORAGE_BACKENDS
+from renachan.managers.inference import create_backend, InferenceBatcher
+from renachan.managers.cache import ResponseCache
+from renachan.managers.conversation import ConversationStore
+from renachan.managers.members import MemberIndex
+from renachan.cogs.utils.fetcher import AsyncFetcher
 
 ## renachan:
 ### A package is a way to organize Python modules in a directory. It is a collection of Python modules and may contain a __init__.py file (not to be confused with the .env file).
@@ -72,7 +77,8 @@ from renachan.managers.database import initialize_database
 
 ## renachan.managers.database:
 ### This is a module within the renachan package responsible for managing the bot's database.
-### The initialize_database() function from this module will be used later to initialize the database.
+### Its initialize_database() function is imported in on_ready(), where the database is set up: SQLAlchemy is one of the
+### slowest imports of the bot and isn't needed to connect to Discord, so it is loaded once the bot is connected.
 
 
 def check_latest_version():
@@ -141,7 +147,7 @@ def setup_bot() -> discord.ext.commands.Bot:
         1. Sets up the intents to define which events the bot should receive from the Discord API.
         2. Creates a new discord.ext.commands.Bot instance with the specified intents and command prefix '!'.
         3. Defines an on_ready() event handler that is triggered when the bot connects to Discord and is ready to receive events.
-        4. If the storage type is "sqlite", initializes the database session for the bot using renachan.managers.database.initialize_database().
+        4. If the storage type is a supported database (sqlite, mysql, mariadb), initializes the bot's data access layer (bot.db) using renachan.managers.database.initialize_database().
         5. Initializes event handlers and command implementations from renachan.events and renachan.cogs.cmds modules.
         6. Sets the bot's presence (status and activity) on Discord using the configuration from renachan.config.bot_status().
         7. Logs the command prefix and a confirmation message indicating that the database is set, and the bot is ready to serve.
@@ -161,26 +167,75 @@ def setup_bot() -> discord.ext.commands.Bot:
     # Create a new discord.ext.commands.Bot instance with the specified intents and command prefix '!'
     bot = commands.Bot(intents=intents, command_prefix='!rena ', help_command=None)
 
-    bot.api_endpoint = renachan.config.api_url() + renachan.config.get_model()
-    bot.huggingface_token = renachan.config.get_huggingface()
-    bot.request_headers = {
-        'Authorization': 'Bearer {}'.format(bot.huggingface_token)
-    }
+    # Pooled, non-blocking backend for the chat model: the hosted Hugging Face API by default,
+    # or a local worker-process pool when INFERENCE_BACKEND=local.
+    # Waiting on the model no longer freezes heartbeats, commands or guild joins.
+    bot.inference = create_backend(renachan.config.inference_backend())
 
-    def query(bot, payload):
+    async def setup_hook():
         """
-        make request to the Hugging Face model API
+        Warm the inference backend up in the background while the bot connects to the gateway.
         """
-        data = json.dumps(payload)
-        response = requests.request('POST',
-                                    bot.api_endpoint,
-                                    headers=bot.request_headers,
-                                    data=data)
-        ret = json.loads(response.content.decode('utf-8'))
-        return ret
+        bot.loop.create_task(bot.inference.warm_up())
+
+    bot.setup_hook = setup_hook
+
+    # DMs that arrive within the same short window are sent to the model as one batched request,
+    # and identical prompts that are already queued or in flight share a single request.
+    bot.batcher = InferenceBatcher(bot.inference,
+                                   window=renachan.config.inference_batch_window(),
+                                   max_batch_size=renachan.config.inference_batch_size())
+
+    async def query(bot, payload):
+        """
+        make request to the chat model through the batcher
+        """
+        return await bot.batcher.submit(payload)
 
     bot.query = query
 
+    # Bounded TTL/LRU cache of model replies, so repeated prompts like "hi" don't hit the API at all.
+    bot.response_cache = ResponseCache(max_entries=renachan.config.response_cache_size(),
+                                       ttl=renachan.config.response_cache_ttl(),
+                                       path=renachan.config.response_cache_path())
+
+    # Per-user DM history fed back to the model, bounded per user and across all users.
+    bot.conversations = ConversationStore(max_turns=renachan.config.conversation_max_turns(),
+                                          token_budget=renachan.config.conversation_token_budget(),
+                                          idle_timeout=renachan.config.conversation_idle_timeout(),
+                                          max_total_tokens=renachan.config.conversation_max_tokens())
+
+    # Guild members by username, filled in once the member cache is ready (on_ready) and kept current by the member events
+    bot.member_index = MemberIndex()
+
+    # Shared HTTP fetcher for the price crawler: pooled connections, per-host limits, retries and robots.txt.
+    bot.fetcher = AsyncFetcher(concurrency=renachan.config.crawler_concurrency(),
+                               per_host_limit=renachan.config.crawler_per_host_limit(),
+                               timeout=renachan.config.crawler_timeout(),
+                               retries=renachan.config.crawler_retries(),
+                               max_retry_after=renachan.config.crawler_max_retry_after(),
+                               user_agent=renachan.config.crawler_user_agent())
+    # bot.crawl_stats and bot.extraction_rules are created in on_ready(), with the commands that use them, so the
+    # crawler (lxml, rapidfuzz) isn't imported before the bot has connected.
+
+    # Coroutines that are awaited when the bot shuts down, so pooled resources are released cleanly.
+    # The batcher is drained before the client's session is closed.
+    bot.shutdown_hooks = [bot.batcher.close, bot.inference.close, bot.response_cache.close, bot.fetcher.close]
+    discord_close = bot.close
+
+    async def close():
+        """
+        Run every registered shutdown hook before closing the connection to Discord.
+        """
+        for hook in bot.shutdown_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"Error while running shutdown hook {hook}: {e}")
+        await discord_close()
+
+    bot.close = close
+
 
     # Define an on_ready() event handler that is triggered when the bot connects to Discord and is ready to receive events.
     @bot.event
@@ -195,15 +250,41 @@ def setup_bot() -> discord.ext.commands.Bot:
             - The event module contains event handlers that define how the discord bot will respond to various events, such as joining or leaving servers.
               The renachan.events.__init__(bot) call initializes these event handlers, allowing the bot to listen for and handle specific events.
             - The renachan.cogs.cmds.__init__(bot) call initializes command implementations, enabling the bot to recognize user commands and perform corresponding actions based on the inputs.
+            - The renachan.cogs.tasks.__init__(bot) call starts background tasks, such as reconciling the guilds in the discord.py cache with the database.
         """
 
-        # If the storage type is "sqlite", initializes the database session for the bot.
-        if renachan.config.storage_type() == "sqlite":
+        # If the storage type is a supported database (sqlite, mysql, mariadb), initializes the data access layer for the bot.
+        # on_ready fires again after a reconnect, so the database is only set up the first time.
+        if renachan.config.storage_type() in STORAGE_BACKENDS and getattr(bot, 'db', None) is None:
+            from renachan.managers.database import initialize_database
+            from renachan.managers.telemetry import TelemetryBuffer
             bot.db = initialize_database(logger)
+            if bot.db:
+                # Command telemetry is written behind the replies, in batches
+                bot.telemetry = TelemetryBuffer(bot.db,
+                                                batch_size=renachan.config.telemetry_batch_size(),
+                                                flush_interval=renachan.config.telemetry_flush_interval(),
+                                                max_pending=renachan.config.telemetry_max_pending())
+                # The telemetry buffer is flushed before the database is closed
+                bot.shutdown_hooks.extend([bot.telemetry.close, bot.db.close])
+
+        # The price crawler's shared state. Only created the first time, so it survives reconnects.
+        if getattr(bot, 'crawl_stats', None) is None:
+            from renachan.cogs.utils.crawler import CrawlStats, ExtractionRules
+            # How many crawled pages were skipped because they hadn't changed (see bot.crawl_stats.skip_rate)
+            bot.crawl_stats = CrawlStats()
+            # Where the price was last confirmed on each shop, so repeat crawls skip the search for it
+            bot.extraction_rules = ExtractionRules(max_entries=renachan.config.extraction_rules_size())
+
+        # Index the cached members by username. After a reconnect the cache may have changed while events were missed,
+        # so the index is rebuilt every time.
+        bot.member_index.rebuild(bot.guilds)
+        logger.info(f"Indexed {len(bot.member_index)} guild members by username")
 
         # Initializes event handlers and command implementations from renachan.events and renachan.cogs.cmds modules.
         renachan.events.__init__(bot)
         renachan.cogs.cmds.__init__(bot)
+        renachan.cogs.tasks.__init__(bot)
 
         # Sets the bot's presence (status and activity) on Discord using the configuration from renachan.config.bot_status().
         await bot.change_presence(status=discord.Status.online, activity=discord.Game(renachan.config.bot_status()))
@@ -2,12 +2,38 @@ import datetime
 import platform
 import socket
 import sys
+import importlib
 
-from .cogs import *
 from .tools import *
 from .config import *
-from .events import *
-from .setup import *
+
+# Submodules that are only imported when first used (PEP 562 module __getattr__ below). cogs and events pull in
+# discord.py helpers, SQLAlchemy models and the crawler, none of which a short CLI run (or the bot before it has
+# connected to Discord) needs.
+LAZY_SUBMODULES = ("cogs", "events", "setup", "managers")
+
+
+def __getattr__(name):
+    """
+    Import a lazy submodule on first access (renachan.cogs, renachan.events...).
+
+    Names the package used to re-export from cogs, events and setup (e.g. renachan.send_message) are still found,
+    by importing those submodules, so existing code keeps working; it just pays for the import when it asks.
+    """
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    # Same precedence as the star imports had: the last one imported won
+    for module_name in ("setup", "events", "cogs"):
+        module = importlib.import_module(f".{module_name}", __name__)
+        if not name.startswith("_") and hasattr(module, name):
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_SUBMODULES))
 
 
 def version():
@@ -1 +1,18 @@
-from .cmds import *
+import importlib
+
+# cmds and tasks are imported when first used (PEP 562 module __getattr__ below), so importing a helper such as
+# renachan.cogs.utils.fetcher doesn't load every command, the SQLAlchemy models and the crawler with it.
+LAZY_SUBMODULES = ("cmds", "tasks", "utils")
+
+
+def __getattr__(name):
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    # Names the package used to re-export from cmds (`from .cmds import *`)
+    if not name.startswith("_"):
+        cmds = importlib.import_module(".cmds", __name__)
+        if hasattr(cmds, name):
+            value = getattr(cmds, name)
+            globals()[name] = value
+            return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,6 @@
 import discord
 import time
-import psutil
+import asyncio
 from discord.ext import commands as cmd
 from .utils.discord_helpers import *
 from datetime import datetime
@@ -78,6 +78,7 @@ def setup_harass_command(bot):
     Note:
         - The bot must have the necessary permissions to send messages in the server and access to the "general" channel (if applicable).
         - The 'harass' command can only be used in a direct message (DM) with the bot.
+        - The target is looked up in bot.member_index, so finding them doesn't depend on how many guilds the bot is in.
 
     Example usage of the 'harass' command:
         !harass JohnDoe mysecretpassword Hello, this is a harassment message!
@@ -94,14 +95,10 @@ def setup_harass_command(bot):
         # Extract individual components
         username, password, message = params
 
-        # Find the user in any of the bot's guilds (servers)
-        user = None
-        for guild in bot.guilds:
-            user = discord.utils.get(guild.members, name=username)
-            if user:
-                await ctx.send(f"Found {username}, I'm off to annoying them now...")
-                break
+        # Find the user in any of the bot's guilds (servers), through the username index (see renachan.managers.members)
+        user = bot.member_index.get(username)
         if user:
+            await ctx.send(f"Found {username}, I'm off to annoying them now...")
             # Send the initial message to the user
             await send_message(bot, user, ctx.channel, message)
             # Continuously send the message respecting the rate limit
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from discord.ext import tasks
+
+import renachan
+from .utils.crawler import CreepyCrawler
+from .utils.database_helpers import guild_snapshot, reconcile_guild, due_trackers, save_price_checks
+
+
+def __init__(bot):
+    """
+    Start the bot's background tasks.
+
+    Parameters:
+        bot (discord.ext.commands.Bot): The instance of the Discord bot.
+
+    Note:
+        - on_ready can fire more than once (e.g. after a reconnect), so each task is only started the first time.
+    """
+    if getattr(bot, 'db', None) is not None and getattr(bot, 'reconcile_task', None) is None:
+        bot.reconcile_task = setup_reconciliation_task(bot)
+    if getattr(bot, 'db', None) is not None and getattr(bot, 'price_check_task', None) is None:
+        bot.price_check_task = setup_price_check_task(bot)
+
+
+def setup_reconciliation_task(bot):
+    """
+    Create and start the guild reconciliation task.
+
+    Parameters:
+        bot (discord.ext.commands.Bot): The instance of the Discord bot.
+
+    Returns:
+        discord.ext.tasks.Loop: The running task.
+
+    Explanation:
+    Servers and members only reach the database through on_guild_join, so guilds the bot was already in, members who
+    joined later and members who left are never recorded. This task runs once as soon as it starts (at on_ready) and
+    then every RECONCILE_INTERVAL minutes. For every guild in the discord.py cache it takes a snapshot of the member
+    list and hands it to reconcile_guild() in a worker thread, which writes only the differences, in batches.
+
+    An `asyncio.Semaphore` limits how many guilds are reconciled at the same time (RECONCILE_CONCURRENCY), so a startup
+    with hundreds of guilds doesn't pile hundreds of writers onto SQLite at once. Snapshots are taken inside the
+    semaphore so only the guilds currently being written are copied in memory.
+    """
+    semaphore = asyncio.Semaphore(renachan.config.reconcile_concurrency())
+
+    async def reconcile(guild):
+        async with semaphore:
+            snapshot = guild_snapshot(guild)
+            return await bot.db.run_sync(reconcile_guild, bot.db.engine, snapshot)
+
+    @tasks.loop(minutes=renachan.config.reconcile_interval())
+    async def reconcile_guilds():
+        results = await asyncio.gather(*(reconcile(guild) for guild in bot.guilds), return_exceptions=True)
+
+        added = removed = 0
+        for guild, result in zip(bot.guilds, results):
+            if isinstance(result, Exception):
+                logging.error(f"Could not reconcile '{guild.name}': {result}")
+                continue
+            added += result[0]
+            removed += result[1]
+
+        logging.info(f"Reconciled {len(results)} guilds: {added} new members, {removed} stale memberships removed")
+
+    reconcile_guilds.start()
+    return reconcile_guilds
+
+
+def group_by_host(trackers):
+    """
+    Group due trackers by host, then by URL: {host: {url: [tracker, ...]}}.
+    """
+    hosts = {}
+    for tracker in trackers:
+        url = tracker['track_url']
+        hosts.setdefault(urlsplit(url).netloc, {}).setdefault(url, []).append(tracker)
+    return hosts
+
+
+def unchanged_result(tracker, checked_at):
+    """
+    The result for a tracker whose page couldn't be checked or hasn't changed: keep everything we knew.
+    """
+    return {'tracker': tracker, 'tracker_id': tracker['tracker_id'], 'price': tracker['price'],
+            'available': tracker['available'], 'last_checked': checked_at, 'etag': tracker['etag'],
+            'last_modified': tracker['last_modified'], 'content_hash': tracker['content_hash']}
+
+
+async def check_url(bot, url, trackers, checked_at):
+    """
+    Check every tracker of one URL. The page is downloaded and parsed once, however many members track it.
+
+    Returns:
+        list[dict]: One result per tracker, for save_price_checks() and notify_owner().
+
+    Note:
+        - The request is conditional on the validators stored at the last check, so an unchanged page costs a 304
+          (or at most a download and a hash) instead of a full parse. That only holds when every tracker saw the same
+          version of the page: if their validators differ (a tracker added since, or one whose last check failed), the
+          page is fetched and parsed in full so none of them keeps an outdated price.
+        - Any answer other than a 200 leaves the trackers as they were; only a parsed page without the price marks
+          an item out of stock.
+    """
+    validators = {(tracker['etag'], tracker['last_modified'], tracker['content_hash']) for tracker in trackers}
+    etag, last_modified, page_hash = validators.pop() if len(validators) == 1 else (None, None, None)
+    crawler = CreepyCrawler(url=url, fetcher=bot.fetcher, etag=etag, last_modified=last_modified,
+                            content_hash=page_hash, stats=bot.crawl_stats, rules=bot.extraction_rules)
+    results = []
+    for tracker in trackers:
+        price = await crawler.find_price(tracker['selector_type'], tracker['selector'],
+                                         tracker['title'], tracker['currency_symbol'])
+        if crawler.status != 200 or crawler.tree is None:
+            # The page couldn't be downloaded (which says nothing about the item) or hasn't changed. Only a page that
+            # came back with 200 and was parsed can show the item is gone: a 403 or a 404 may be a shop blocking bots.
+            results.append(unchanged_result(tracker, checked_at))
+            continue
+
+        # The page is up but the price is gone: the item is out of stock (or was taken down)
+        available = price is not None
+        results.append({'tracker': tracker, 'tracker_id': tracker['tracker_id'],
+                        'price': price if available else tracker['price'], 'available': available,
+                        'last_checked': checked_at, 'etag': crawler.etag, 'last_modified': crawler.last_modified,
+                        'content_hash': crawler.content_hash})
+    return results
+
+
+async def notify_owner(bot, result):
+    """
+    DM the member who owns a tracker about a change in its price or stock.
+    A first price for a tracker stored without one is only recorded, not announced.
+    """
+    tracker = result['tracker']
+    title = tracker['title'] or tracker['track_url']
+    currency = tracker['currency_symbol'] or ""
+
+    if result['available'] != tracker['available']:
+        status = "is back in stock" if result['available'] else "went out of stock"
+        content = f"Heads up! {title} {status} :3\n{tracker['track_url']}"
+    elif tracker['price'] is None:
+        # The price couldn't be read when the item was tracked: this is the first one we know, not a change
+        return
+    else:
+        content = (f"Heads up! The price of {title} changed from {currency}{tracker['price']} "
+                   f"to {currency}{result['price']} :3\n{tracker['track_url']}")
+
+    try:
+        user = bot.get_user(tracker['member_id']) or await bot.fetch_user(tracker['member_id'])
+        await user.send(content)
+    except Exception as e:
+        logging.warning(f"Could not tell member {tracker['member_id']} about tracker {tracker['tracker_id']}: {e}")
+
+
+def setup_price_check_task(bot):
+    """
+    Create and start the background price checker.
+
+    Parameters:
+        bot (discord.ext.commands.Bot): The instance of the Discord bot.
+
+    Returns:
+        discord.ext.tasks.Loop: The running task.
+
+    Explanation:
+    `!rena track` promises to tell the member when the price changes or the item goes out of stock. Every
+    PRICE_CHECK_INTERVAL minutes this task checks the trackers that haven't been checked for PRICE_CHECK_AGE minutes:
+
+    1. due_trackers() takes the oldest PRICE_CHECK_BATCH_SIZE of them through the last_checked index.
+    2. The trackers are grouped by host and URL. Each URL is downloaded once however many members track it, and
+       at most PRICE_CHECK_CONCURRENCY hosts are crawled at the same time (the fetcher also limits requests per host),
+       so a big batch never floods one shop or the bot's own event loop. Pages are parsed on worker threads.
+       Requests are conditional on the page's last ETag / Last-Modified, and a page that comes back identical
+       (same content hash) isn't parsed; bot.crawl_stats counts how often that happens.
+    3. save_price_checks() writes the whole batch with a few executemany UPDATEs in a database thread.
+    4. Only the members whose tracker actually changed get a DM.
+
+    Batches are repeated until nothing is due, so a backlog of tens of thousands of trackers is worked through in
+    bounded steps. The loop never overlaps itself: the next run starts PRICE_CHECK_INTERVAL minutes after this one ends.
+    A run that fails (the database is locked, a connection drops) is logged and the loop carries on.
+    """
+    semaphore = asyncio.Semaphore(renachan.config.price_check_concurrency())
+    max_age = timedelta(minutes=renachan.config.price_check_age())
+    batch_size = renachan.config.price_check_batch_size()
+
+    async def check_host(urls, checked_at):
+        async with semaphore:
+            batches = await asyncio.gather(*(check_url(bot, url, trackers, checked_at) for url, trackers in urls.items()))
+            return [result for batch in batches for result in batch]
+
+    async def check_batch(trackers):
+        checked_at = datetime.utcnow()
+        hosts = group_by_host(trackers)
+        outcomes = await asyncio.gather(*(check_host(urls, checked_at) for urls in hosts.values()), return_exceptions=True)
+
+        results = []
+        for (host, urls), outcome in zip(hosts.items(), outcomes):
+            if isinstance(outcome, Exception):
+                # Keep what we knew but still move the host's trackers to the back of the queue
+                logging.error(f"Could not check prices on {host}: {outcome}")
+                outcome = [unchanged_result(tracker, checked_at) for trackers in urls.values() for tracker in trackers]
+            results.extend(outcome)
+
+        await bot.db.run_sync(save_price_checks, bot.db.engine, results)
+
+        changed = [result for result in results
+                   if result['price'] != result['tracker']['price'] or result['available'] != result['tracker']['available']]
+        for result in changed:
+            await notify_owner(bot, result)
+        return len(results), len(changed)
+
+    async def check_due_trackers():
+        checked = changed = 0
+        while True:
+            trackers = await bot.db.run(due_trackers, max_age, batch_size)
+            if not trackers:
+                break
+            batch_checked, batch_changed = await check_batch(trackers)
+            checked += batch_checked
+            changed += batch_changed
+            # A short batch means nothing else is due
+            if len(trackers) < batch_size:
+                break
+        return checked, changed
+
+    @tasks.loop(minutes=renachan.config.price_check_interval())
+    async def check_prices():
+        try:
+            checked, changed = await check_due_trackers()
+        except Exception as e:
+            # tasks.loop stops for good on an unhandled exception. A locked database or a dropped connection only
+            # costs this run: the trackers are still due, so the next run picks them up.
+            logging.error(f"Price check failed, trying again in {renachan.config.price_check_interval()} minutes: {e}")
+            return
+
+        if checked:
+            logging.info(f"Checked {checked} trackers, {changed} changed "
+                         f"({bot.crawl_stats.skip_rate:.0%} of pages skipped parsing so far)")
+
+    check_prices.start()
+    return check_prices
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BrowserPool:
+    """
+    A fixed number of browser workers that share a queue of pages to visit.
+
+    Parameters:
+        create_driver (callable): Starts one browser and returns its driver (e.g. linkedIn_utils.firefox_driver).
+        workers (int): How many browsers run at the same time.
+        recycle_after (int): How many pages a browser loads before it is quit and replaced.
+
+    Explanation:
+    Selenium drivers block, so every call to a driver runs on a thread of the pool's own executor (one thread per
+    worker) and the event loop stays free. run() puts the jobs on a queue and starts one task per worker; each takes the
+    next job as soon as it is done with the previous one, so throughput grows with the number of workers instead of
+    being set by fixed sleeps.
+
+    Each worker keeps its browser between jobs and between run() calls: starting Firefox costs seconds, loading a page
+    on a warm browser doesn't. Browsers do grow over time, so a worker quits its browser and starts a fresh one after
+    `recycle_after` pages, and right away when a job fails (the browser may be stuck on a broken page).
+
+    Example usage:
+        pool = BrowserPool(create_driver=firefox_driver, workers=4, recycle_after=50)
+        results = await pool.run(jobs, collect_job_links)
+        await pool.close()
+    """
+    def __init__(self, create_driver, workers=2, recycle_after=50):
+        self.create_driver = create_driver
+        self.workers = workers
+        self.recycle_after = recycle_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="browser")
+        self._drivers = [None] * workers  # worker -> its running driver
+        self._pages = [0] * workers       # worker -> pages loaded by its current driver
+        self.started = 0                  # browsers started so far, recycled ones included
+
+    async def _call(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def _driver(self, worker):
+        if self._drivers[worker] is None:
+            self._drivers[worker] = await self._call(self.create_driver)
+            self._pages[worker] = 0
+            self.started += 1
+        return self._drivers[worker]
+
+    async def _recycle(self, worker):
+        driver, self._drivers[worker] = self._drivers[worker], None
+        if driver is not None:
+            try:
+                await self._call(driver.quit)
+            except Exception as e:
+                logging.warning(f"Could not quit browser worker {worker}: {e}")
+
+    async def _work(self, worker, queue, handler, results):
+        while True:
+            try:
+                index, job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                driver = await self._driver(worker)
+                results[index] = await self._call(handler, driver, job)
+            except Exception as e:
+                logging.warning(f"Browser worker {worker} failed on {job}: {e}")
+                results[index] = e
+                await self._recycle(worker)
+                continue
+
+            self._pages[worker] += 1
+            if self._pages[worker] >= self.recycle_after:
+                await self._recycle(worker)
+
+    async def run(self, jobs, handler):
+        """
+        Run `handler(driver, job)` for every job, spread over the workers.
+
+        Parameters:
+            jobs (list): The jobs, e.g. the URL dicts of LinkedinURLGenerator.generate_url_links().
+            handler (callable): Visits one job with a driver and returns its result. It runs on a worker thread.
+
+        Returns:
+            list: One result per job, in the order of `jobs`. A job that failed has the exception as its result.
+        """
+        queue = asyncio.Queue()
+        for index, job in enumerate(jobs):
+            queue.put_nowait((index, job))
+
+        results = [None] * len(jobs)
+        await asyncio.gather(*(self._work(worker, queue, handler, results)
+                               for worker in range(min(self.workers, len(jobs)))))
+        return results
+
+    async def close(self):
+        """
+        Quit every browser and stop the worker threads.
+        """
+        for worker in range(self.workers):
+            await self._recycle(worker)
+        self._executor.shutdown(wait=False)
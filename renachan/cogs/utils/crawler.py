@@ -0,0 +1,667 @@
+import re
+import asyncio
+import hashlib
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from lxml import html, etree
+from rapidfuzz import process, fuzz, utils
+
+
+# Matches a number with an optional decimal part, e.g. "19", "19.99" or "1,299.00" (see regex.py for a walkthrough)
+PRICE_PATTERN = re.compile(r"[0-9]+(?:[,.][0-9]+)*")
+
+# Words used to match a product title against the text around a candidate element
+WORD_PATTERN = re.compile(r"\w+")
+
+# How many ancestors of a candidate element are searched for the product title
+CONTEXT_DEPTH = 3
+
+# Limits on the text compared with a product title: no title is longer than a few hundred characters, and the
+# first few hundred pieces of text of a large ancestor (a whole results list) are plenty to find it in
+MAX_SEGMENT_LENGTH = 300
+MAX_SEGMENTS = 500
+
+# Below this title match confidence, the user is asked to double check the price that was picked
+LOW_CONFIDENCE = 0.6
+
+
+def content_hash(body):
+    """
+    A short fingerprint of a page body, to tell whether it changed since the last check.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class CrawlStats:
+    """
+    Counts how often the crawler could skip work because a page hadn't changed.
+
+    Attributes:
+        fetched (int): Pages requested.
+        not_modified (int): Pages the server answered with 304 Not Modified (nothing downloaded or parsed).
+        unchanged (int): Pages downloaded but identical to the last check (nothing parsed).
+        parsed (int): Pages that had to be parsed.
+        bytes_read (int): Body bytes downloaded by streamed crawls.
+        bytes_saved (int): Body bytes streamed crawls didn't need to download because they stopped early.
+    """
+    def __init__(self):
+        self.fetched = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.parsed = 0
+        self.bytes_read = 0
+        self.bytes_saved = 0
+
+    @property
+    def skip_rate(self):
+        """
+        The share of fetched pages that didn't need parsing, between 0 and 1.
+        """
+        return (self.not_modified + self.unchanged) / self.fetched if self.fetched else 0.0
+
+
+class ExtractionRule:
+    """
+    Where a site keeps the price for one selector: the compiled path of the element that was confirmed to hold it.
+    """
+    def __init__(self, selector_type, selector, path):
+        self.selector_type = selector_type
+        self.selector = selector
+        self.path = path
+        self.xpath = etree.XPath(path)
+
+    def matches(self, element):
+        if self.selector_type == "class":
+            return self.selector in element.classes
+        return element.get('id') == self.selector
+
+    def apply(self, tree):
+        """
+        The element the rule points at, or None if the page's layout no longer fits the rule.
+        """
+        for element in self.xpath(tree):
+            if self.matches(element) and PRICE_PATTERN.search(element_text(element)):
+                return element
+        return None
+
+
+class ExtractionRules:
+    """
+    Bounded per-domain cache of confirmed price locations.
+
+    Parameters:
+        max_entries (int): Maximum number of rules kept. The least recently used rule is dropped when full.
+
+    Explanation:
+    Finding the price means collecting every element with the selector's class or id, then scoring each candidate
+    against the product title. Pages on one shop share a template, so once that search has found the price for a
+    selector on a domain, the element's position in the page (its XPath, e.g. /html/body/div[3]/span[2]) is compiled
+    once and kept here. Later crawls on the same domain with the same selector evaluate that path directly, which only
+    walks the element's ancestors, and skip the search entirely.
+
+    A rule is only trusted while it keeps working: if its path doesn't lead to an element with the selector and a
+    number in it (the shop changed its layout, or this page is built differently), the rule is forgotten and the crawl
+    falls back to the full search, which records a fresh rule.
+
+    Example usage:
+        rules = ExtractionRules(max_entries=2048)
+        crawler = CreepyCrawler(url, fetcher=bot.fetcher, rules=rules)
+    """
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._rules = OrderedDict()  # (domain, selector_type, selector) -> ExtractionRule
+
+    @staticmethod
+    def domain(url):
+        return urlsplit(url).netloc.lower()
+
+    def get(self, domain, selector_type, selector):
+        rule = self._rules.get((domain, selector_type, selector))
+        if rule is not None:
+            self._rules.move_to_end((domain, selector_type, selector))
+        return rule
+
+    def remember(self, domain, selector_type, selector, element):
+        """
+        Record where the price was found on a domain.
+        """
+        path = element.getroottree().getpath(element)
+        self._rules[(domain, selector_type, selector)] = ExtractionRule(selector_type, selector, path)
+        self._rules.move_to_end((domain, selector_type, selector))
+        while len(self._rules) > self.max_entries:
+            self._rules.popitem(last=False)
+
+    def forget(self, domain, selector_type, selector):
+        self._rules.pop((domain, selector_type, selector), None)
+
+    def __len__(self):
+        return len(self._rules)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PriceScanner:
+    """
+    Incremental parser that watches a page being built for the price element.
+
+    Parameters:
+        selector_type (str): "class" or "id".
+        selector (str): The class name or id.
+        title (str or None): The product title.
+
+    Explanation:
+    Chunks of the body are fed to an lxml `HTMLPullParser` as they arrive. Every time an element is closed the scanner
+    checks whether it carries the selector and has a number in its text. It reports that it is done when:
+
+    - the selector is an id (ids are unique, so the first priced match is the one), or
+    - the selector is a class and there is no title to choose with, or
+    - the selector is a class and the title already appears next to the match (see mentions_title()), which is as good
+      as find_correct_element() can do with the whole page.
+
+    close() returns the tree built so far, which the crawler then searches exactly like a fully downloaded page.
+    """
+    def __init__(self, selector_type, selector, title=None):
+        self.selector_type = selector_type
+        self.selector = selector
+        self.title_words = words(title) if title else set()
+        self.parser = etree.HTMLPullParser(events=("end",))
+        self.parser.set_element_class_lookup(html.HtmlElementClassLookup())
+        self.found = False
+        # Text of the ancestors already looked at. A list that is still being parsed keeps the text it had when it was
+        # first looked at, which can only hide the title from the check (the download then simply goes on).
+        self.segments = {}
+
+    def matches(self, element):
+        # Called for every element of the page, so it sticks to a plain attribute lookup
+        if self.selector_type == "class":
+            return self.selector in (element.get('class') or "").split()
+        return element.get('id') == self.selector
+
+    def is_enough(self, element):
+        if self.selector_type != "class" or not self.title_words:
+            return True
+        return mentions_title(element, self.title_words, self.segments, self.selector)
+
+    def feed(self, chunk):
+        """
+        Parse one chunk of the body. Returns True once the price element has been found.
+        """
+        self.parser.feed(chunk)
+        for _, element in self.parser.read_events():
+            if self.matches(element) and PRICE_PATTERN.search(element_text(element)) and self.is_enough(element):
+                self.found = True
+        return self.found
+
+    def close(self):
+        try:
+            return self.parser.close()
+        except etree.XMLSyntaxError:
+            # Nothing parseable arrived (e.g. an empty body)
+            return None
+
+
+def parse_html(body):
+    """
+    Parse a page into an lxml tree. Runs on a worker thread, off the event loop.
+    """
+    return html.fromstring(body)
+
+
+def element_text(element):
+    return " ".join(element.text_content().split())
+
+
+def text_segments(node):
+    """
+    The separate pieces of text inside an element (a heading, a link, a rating...), whitespace-normalized.
+    Pieces too long to be a product title (descriptions, inline scripts) are left out.
+    """
+    segments = []
+    for part in node.itertext():
+        if len(part) > MAX_SEGMENT_LENGTH * 2:
+            continue
+        text = " ".join(part.split())
+        if text and len(text) <= MAX_SEGMENT_LENGTH:
+            segments.append(text)
+            if len(segments) == MAX_SEGMENTS:
+                break
+    return segments
+
+
+def mentions_title(element, title_words, cache=None, class_name=None):
+    """
+    Whether every word of the title appears in one piece of text (a heading, a link...) near an element.
+
+    Parameters:
+        element (lxml.html.HtmlElement): The candidate element.
+        title_words (set): words() of the title.
+        cache (dict or None): Ancestor -> word sets of its text pieces (False past the product's own part of the
+            page), shared between the candidates of one page.
+        class_name (str or None): The class the price was looked up by. Ancestors that hold more than one element
+            with it aren't searched.
+
+    Explanation:
+    All the title's words have to be in the same piece of text: a results list holds every word of the title
+    somewhere across its cards, but only the product's own card has them together. The list itself also holds the
+    product's own heading, so with a class the search stops below the first ancestor shared with another candidate.
+    """
+    node = element
+    for _ in range(CONTEXT_DEPTH):
+        node = node.getparent()
+        if node is None:
+            return False
+        segments = cache.get(node) if cache is not None else None
+        if segments is None:
+            if class_name and len(node.find_class(class_name)) > 1:
+                # From here up the text belongs to other products too
+                segments = False
+            else:
+                segments = [words(segment) for segment in text_segments(node)]
+            if cache is not None:
+                cache[node] = segments
+        if segments is False:
+            return False
+        if any(title_words <= segment for segment in segments):
+            return True
+    return False
+
+
+def rank_candidates(candidates, title):
+    """
+    Rank candidate price elements by how well the text around them matches a product title.
+
+    Parameters:
+        candidates (list): The candidate elements.
+        title (str): The product title.
+
+    Returns:
+        list[tuple]: (element, confidence) pairs, best first. Confidence is between 0 and 1.
+
+    Explanation:
+    Each candidate is scored on its nearest ancestors (parent, grandparent, ... up to CONTEXT_DEPTH). An ancestor's
+    score is its best-matching piece of text (see text_segments()), so the title is compared with the card's heading
+    on its own rather than with the heading, the star rating and the price glued together.
+
+    Candidates on one page share most of their ancestors (every card sits in the same list), so the segments of
+    every distinct ancestor are collected once and all of them are scored against the title in a single
+    `rapidfuzz.process.extract` call with `token_set_ratio`. That gives 100 when every word of the title appears in the
+    text, whatever else is around it, and degrades gracefully for near misses ("Product 17" vs "Product 7", a typo,
+    different punctuation or case).
+
+    A candidate's score is its best score over its ancestors. Between equal scores the one found on the nearest
+    ancestor wins, so the price inside the product's own card beats a price that only shares the list with it.
+    """
+    ancestors = {}  # ancestor -> index into ancestor_scores
+    levels = []     # per candidate: [(ancestor index, level), ...]
+    for element in candidates:
+        chain = []
+        node = element
+        for level in range(CONTEXT_DEPTH):
+            node = node.getparent()
+            if node is None:
+                break
+            chain.append((ancestors.setdefault(node, len(ancestors)), level))
+        levels.append(chain)
+
+    choices = []
+    owners = []  # choice position -> ancestor index
+    for node, index in ancestors.items():
+        for segment in text_segments(node):
+            choices.append(segment)
+            owners.append(index)
+
+    ancestor_scores = [0.0] * len(ancestors)
+    matches = process.extract(title, choices, scorer=fuzz.token_set_ratio, processor=utils.default_process, limit=None)
+    for _, score, position in matches:
+        index = owners[position]
+        ancestor_scores[index] = max(ancestor_scores[index], score)
+
+    keys = [max(((ancestor_scores[index], -level) for index, level in chain), default=(0.0, 0)) for chain in levels]
+    # sorted() is stable, so candidates that score the same keep their order in the page
+    order = sorted(range(len(candidates)), key=keys.__getitem__, reverse=True)
+    return [(candidates[index], keys[index][0] / 100) for index in order]
+
+
+def words(text):
+    """
+    The set of lowercase words in a text. Splitting on anything that isn't a letter or digit copes with text_content()
+    gluing neighbouring nodes together (e.g. "Product 7" and "$7.99" become "Product 7$7.99").
+    """
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+class CreepyCrawler:
+    """
+    Finds an item's price on a web page.
+
+    Parameters:
+        url (str): The URL of the product page.
+        fetcher (AsyncFetcher): The bot's shared fetcher (bot.fetcher), used to download the page.
+        etag (str or None): The page's ETag at the last check, if known.
+        last_modified (str or None): The page's Last-Modified at the last check, if known.
+        content_hash (str or None): The hash of the page body at the last check, if known.
+        stats (CrawlStats or None): Where to count fetched, skipped and parsed pages.
+        rules (ExtractionRules or None): The shared cache of confirmed price locations per domain.
+
+    Explanation:
+    `!rena track` tells the crawler where the price is: the class or the id of the HTML element that holds it.
+    The crawler downloads the page through the shared async fetcher (pooled connections, per-host limits, retries,
+    robots.txt), then parses it on a worker thread so a large page never blocks the event loop.
+
+    1. crawler_by_item_class() / crawler_by_item_id() return every element with that class or id.
+    2. find_correct_element() picks the element that belongs to the product when there are several.
+    3. extract_number_from_class() turns the element's text into a float.
+
+    The page is downloaded and parsed once per crawler; later calls reuse the tree. `status` keeps the HTTP status the
+    page was answered with.
+
+    When the validators from the last check are given, the crawler skips as much work as the page allows:
+    the request is made conditional (If-None-Match / If-Modified-Since), so a server that supports it answers
+    304 with no body, and a page that is downloaded anyway but hashes the same as last time isn't parsed.
+    Either way `not_modified` is set and the caller can keep what it already knows about the page.
+
+    stream_load() is the streaming alternative to load(): the body is parsed as it downloads, and the download stops
+    as soon as the price element has turned up (see PriceScanner). Later calls search the partial tree as usual.
+    `bytes_saved` tells how much of the page was never downloaded.
+
+    With a rule cache, cached_element() looks the price up where it was last confirmed on the same domain, and
+    remember_element() records a confirmed element for the next crawl (see ExtractionRules).
+
+    Example usage:
+        crawler = CreepyCrawler(url="https://example.com/item123", fetcher=bot.fetcher)
+        possible_results = await crawler.crawler_by_item_class(class_name="price")
+        element = await crawler.find_correct_element(possible_results, title, ctx)
+        price = crawler.extract_number_from_class(element, currency="$")
+    """
+    def __init__(self, url, fetcher, etag=None, last_modified=None, content_hash=None, stats=None, rules=None):
+        self.url = url
+        self.fetcher = fetcher
+        self.rules = rules
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.stats = stats
+        self.tree = None
+        self.status = None
+        self.error = None
+        self.not_modified = False
+        self.bytes_saved = None
+        self.confidence = None
+
+    def _conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers or None
+
+    async def load(self):
+        """
+        Download and parse the page, once.
+
+        Returns:
+            lxml.html.HtmlElement or None: The parsed page, or None if it couldn't be downloaded (see `error`)
+            or hasn't changed since the last check (see `not_modified`).
+        """
+        if self.tree is not None or self.error is not None or self.not_modified:
+            return self.tree
+
+        result = await self.fetcher.fetch(self.url, headers=self._conditional_headers())
+        self.status = result.status
+        if self.stats:
+            self.stats.fetched += 1
+
+        if result.status == 304:
+            self.not_modified = True
+            if self.stats:
+                self.stats.not_modified += 1
+            return None
+        if not result.ok:
+            self.error = result.error
+            return None
+
+        # Keep the new validators for the next check
+        self.etag = result.headers.get('ETag')
+        self.last_modified = result.headers.get('Last-Modified')
+        body_hash = content_hash(result.body)
+        if body_hash == self.content_hash:
+            self.not_modified = True
+            if self.stats:
+                self.stats.unchanged += 1
+            return None
+        self.content_hash = body_hash
+
+        if self.stats:
+            self.stats.parsed += 1
+        loop = asyncio.get_running_loop()
+        self.tree = await loop.run_in_executor(None, parse_html, result.body)
+        return self.tree
+
+    async def stream_load(self, selector_type, selector, title=None):
+        """
+        Download and parse the page as it arrives, stopping once the price element for `selector` has been found.
+
+        Returns:
+            lxml.html.HtmlElement or None: The page (possibly only its first part), or None if it couldn't be
+            downloaded (see `error`).
+
+        Note:
+            - A streamed page isn't hashed, since the crawl may never see the whole body.
+        """
+        if self.tree is not None or self.error is not None:
+            return self.tree
+
+        scanner = PriceScanner(selector_type, selector, title)
+
+        async def consume(chunk):
+            # Each chunk is parsed as soon as it arrives. lxml parsers must stay on the thread that created them,
+            # so this runs on the event loop; one chunk at a time is small enough not to hold it up.
+            return scanner.feed(chunk)
+
+        result = await self.fetcher.fetch_stream(self.url, consume)
+        self.status = result.status
+        if not result.ok:
+            self.error = result.error
+            return None
+
+        self.tree = scanner.close()
+        if self.tree is None:
+            self.error = "empty page"
+            return None
+
+        self.bytes_saved = result.bytes_saved if scanner.found else 0
+        if self.stats:
+            self.stats.fetched += 1
+            self.stats.parsed += 1
+            self.stats.bytes_read += result.bytes_read
+            self.stats.bytes_saved += self.bytes_saved or 0
+        return self.tree
+
+    async def crawler_by_item_class(self, class_name):
+        """
+        Every element whose class attribute contains `class_name`.
+        """
+        tree = await self.load()
+        if tree is None:
+            return []
+        return tree.find_class(class_name)
+
+    async def crawler_by_item_id(self, item_id):
+        """
+        Every element whose id is `item_id` (normally just one).
+        """
+        tree = await self.load()
+        if tree is None:
+            return []
+        return tree.xpath("//*[@id=$item_id]", item_id=item_id)
+
+    async def cached_element(self, selector_type, selector, title=None):
+        """
+        The price element according to the domain's cached rule, skipping the search.
+
+        Parameters:
+            selector_type (str): "class" or "id".
+            selector (str): The class name or id.
+            title (str or None): The product title. When given, the rule's element is only used if every word of the
+                title appears around it: on a listing page the same path leads to a different product every time.
+
+        Returns:
+            lxml.html.HtmlElement or None: The element, or None if there is no rule (or it stopped working, in which
+            case it is forgotten), the element belongs to another product, or the page couldn't be loaded.
+        """
+        if self.rules is None:
+            return None
+        tree = await self.load()
+        if tree is None:
+            return None
+
+        domain = self.rules.domain(self.url)
+        rule = self.rules.get(domain, selector_type, selector)
+        element = rule.apply(tree) if rule is not None else None
+        if element is None:
+            self.rules.misses += 1
+            if rule is not None:
+                self.rules.forget(domain, selector_type, selector)
+            return None
+
+        if title:
+            class_name = selector if selector_type == "class" else None
+            if not mentions_title(element, words(title), class_name=class_name):
+                # The rule still fits the page, just not this product: let the search find it (and update the rule)
+                self.rules.misses += 1
+                return None
+
+        self.rules.hits += 1
+        return element
+
+    def remember_element(self, selector_type, selector, element):
+        """
+        Record a confirmed price element so the next crawl on this domain can skip the search.
+        """
+        if self.rules is not None and element is not None:
+            self.rules.remember(self.rules.domain(self.url), selector_type, selector, element)
+
+    def forget_rule(self, selector_type, selector):
+        """
+        Drop the domain's rule for a selector, e.g. when the element it found held no price.
+        """
+        if self.rules is not None:
+            self.rules.forget(self.rules.domain(self.url), selector_type, selector)
+
+    async def find_correct_element(self, possible_results, title, ctx):
+        """
+        Pick the element that holds the product's price.
+
+        Parameters:
+            possible_results (list): The candidate elements.
+            title (str or None): The product title from the command's embed, if there was one.
+            ctx (discord.ext.commands.Context or None): The command context, used to tell the user how the choice was made.
+                None when there is no one to tell (e.g. a background price check).
+
+        Returns:
+            lxml.html.HtmlElement or None: The chosen element, or None if no candidate contains a number.
+            How sure the choice is (0 to 1) is left in `confidence`.
+
+        Explanation:
+        Only candidates whose text contains a number can hold a price. With no title, the first of them wins.
+        With a title, every candidate is ranked against it in one batched fuzzy matching pass (see rank_candidates())
+        and the best one wins.
+        """
+        priced = [element for element in possible_results if PRICE_PATTERN.search(element_text(element))]
+        if not priced:
+            self.confidence = 0.0
+            return None
+        if len(priced) == 1 or not title:
+            self.confidence = 1.0
+            return priced[0]
+
+        element, self.confidence = rank_candidates(priced, title)[0]
+        if ctx is not None:
+            await ctx.send(f"Found {len(priced)} possible prices, going with the one closest to '{title}' "
+                           f"({self.confidence:.0%} match)")
+            if self.confidence < LOW_CONFIDENCE:
+                await ctx.send("I'm not too sure about that one, double check the price I found pwease :c")
+        return element
+
+    async def find_price(self, selector_type, selector, title=None, currency=None):
+        """
+        Run the whole lookup for a selector stored with a tracker: use the domain's cached rule, or find the
+        candidates, pick one and remember it, then read its price.
+
+        Parameters:
+            selector_type (str): "class" or "id".
+            selector (str): The class name or id.
+            title (str or None): The product title, used to pick between several candidates.
+            currency (str or None): The currency symbol.
+
+        Returns:
+            float or None: The price, or None if the page doesn't hold it. None is also returned when the page couldn't
+            be downloaded (see `error`) or hasn't changed (see `not_modified`).
+        """
+        element = await self.cached_element(selector_type, selector, title)
+        discovered = element is None
+        if discovered:
+            if selector_type == "class":
+                possible_results = await self.crawler_by_item_class(class_name=selector)
+            else:
+                possible_results = await self.crawler_by_item_id(item_id=selector)
+            element = await self.find_correct_element(possible_results, title, None)
+            if element is None:
+                return None
+
+        price = self.extract_number_from_class(element, currency=currency)
+        if price is None:
+            self.forget_rule(selector_type, selector)
+        elif discovered:
+            self.remember_element(selector_type, selector, element)
+        return price
+
+    def extract_number_from_class(self, element, currency=None):
+        """
+        Read the price out of an element's text.
+
+        Parameters:
+            element (lxml.html.HtmlElement): The element holding the price.
+            currency (str or None): The currency symbol. When given, the number right after it is preferred.
+
+        Returns:
+            float or None: The price, or None if the text holds no number.
+        """
+        return parse_price(element_text(element), currency)
+
+
+def parse_price(text, currency=None):
+    """
+    Turn a price string such as "$1,299.99", "1.299,99 €" or "19" into a float.
+    """
+    if currency and currency in text:
+        # Prefer the number that follows the currency symbol over any number in front of it (e.g. "2 for $19.99")
+        text = text[text.index(currency) + len(currency):] or text
+
+    match = PRICE_PATTERN.search(text)
+    if not match:
+        return None
+
+    number = match.group(0)
+    if "," in number and "." in number:
+        # Whichever separator comes last is the decimal point
+        if number.rindex(",") > number.rindex("."):
+            number = number.replace(".", "").replace(",", ".")
+        else:
+            number = number.replace(",", "")
+    elif "," in number:
+        # "19,99" is a decimal comma, "1,299" is a thousands separator
+        head, _, tail = number.rpartition(",")
+        number = f"{head.replace(',', '')}.{tail}" if len(tail) == 2 else number.replace(",", "")
+    elif number.count(".") > 1:
+        # "1.299.000" only uses dots as thousands separators
+        number = number.replace(".", "")
+
+    return float(number)
@@ -1,73 +1,319 @@
+import logging
 import renachan.managers.models as models
 import renachan
-from datetime import time
+from datetime import time, datetime
+from sqlalchemy import select, insert, update, delete, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session as DBSession
 
 
-def add_to_database(bot, item):
-     bot.db.add(item)
-     bot.db.commit()
-     bot.db.close()
+def add_to_database(session, item):
+     session.add(item)
 
-def check_membership(bot, ctx):
-    member = bot.db.query(models.Member).filter_by(id=ctx.author.id).first()
+def check_membership(session, author_id, author_name):
+    member = session.get(models.Member, author_id)
     if member:
         return member
     new_member = models.Member(
-            id=ctx.author.id,
-            username=ctx.author.name
+            id=author_id,
+            username=author_name
         )
-    add_to_database(bot, new_member)
+    add_to_database(session, new_member)
     return new_member
 
-def create_tracker(bot, ctx, title, url, price, member):
-     if ctx.guild:
-        server = bot.db.query(models.Server).filter_by(id=ctx.guild.id).first()
-        server_tracker = models.Tracker(
-            track_url=url,
-            title=title,
-            available=True,  # Set initial values as necessary
-            price=price,      # Set initial values as necessary
-            member=member,  # Set the member relationship
-            server=server   # Set the server relationship
-        )
-        return server_tracker
-
-     member_tracker = models.Tracker(
+def create_tracker(session, guild_id, title, url, price, member, selector_type=None, selector=None, currency_symbol=None):
+     tracker = models.Tracker(
         track_url=url,
         title=title,
         available=True,  # Set initial values as necessary
         price=price,      # Set initial values as necessary
         member=member,  # Set the member relationship
+        selector_type=selector_type,  # Remember how the price was found, for the price checker
+        selector=selector,
+        currency_symbol=currency_symbol,
         )
+     if guild_id:
+        tracker.server = session.get(models.Server, guild_id)  # Set the server relationship
+
+     return tracker
+
+def save_tracker(session, author_id, author_name, guild_id, title, url, price, selector_type=None, selector=None, currency_symbol=None):
+    """
+    Unit of work for add_tracker: make sure the member exists and store the tracker unless it is already tracked.
 
-     return member_tracker
+    Returns:
+        bool: True if a new tracker was added, False if the member was already tracking this URL.
+    """
+    member = check_membership(session, author_id, author_name)
 
+    existing_tracker = session.query(models.Tracker).filter_by(member_id=author_id, track_url=url).first()
+    if existing_tracker:
+        return False
 
-async def add_tracker(ctx, bot, title, url, price):
-    member = check_membership(bot, ctx)
+    add_to_database(session, create_tracker(session, guild_id, title, url, price, member,
+                                            selector_type, selector, currency_symbol))
+    return True
 
+
+async def add_tracker(ctx, bot, title, url, price, selector_type=None, selector=None, currency_symbol=None):
     await ctx.send(f"""I found the {title} you want!\nChecking the database now... \nWIP: Getting availability, adding tasks/stat queries to make requests to check prices""")
 
-    existing_tracker = bot.db.query(renachan.models.Tracker).filter_by(member_id=ctx.author.id, track_url=url).first()
+    # Only plain values cross into the database thread, never discord.py objects
+    guild_id = ctx.guild.id if ctx.guild else None
+    created = await bot.db.run(save_tracker, ctx.author.id, ctx.author.name, guild_id, title, url, price,
+                               selector_type, selector, currency_symbol)
 
-    if not existing_tracker:
-        tracker = create_tracker(bot, ctx, title, url, price, member)
-        add_to_database(bot, tracker)
+    if created:
         await ctx.send(f"Success! I added it to the database. Will update you if the price changes or it goes out of stock :3")
     else:
         await ctx.send(f"I am already tracking this on the database. Stat queries are curretly a WIP!")
 
 
 async def track_time(ctx, bot, data):
-    new_bot_command = models.BotCommands(
-         user_id=data['user_id'],
-         username=data['username'],
-         command=data['command'],
-         last_response=data['last_response'],
-         duration=data['duration']
-    )
-    add_to_database(bot, new_bot_command)
+    # Queued in the write-behind buffer: the reply below doesn't wait on the database
+    bot.telemetry.record({
+         'user_id': data['user_id'],
+         'username': data['username'],
+         'command': data['command'],
+         'last_response': data['last_response'],
+         'duration': data['duration']
+    })
     if "error" in data['last_response']:
          await ctx.send(f"sorry you got an error :( feel free to suggest any input on how to make renachan.py better :) this command took {data['duration']} ms to complete thanks so much for checking my bot out :)")
     else:
          await ctx.send(f"thanks so much for checking my discord bot out! this command took {data['duration']} ms to complete")
+
+
+def guild_snapshot(guild):
+    """
+    Copy what the database needs out of a discord.Guild.
+
+    Parameters:
+        guild (discord.Guild): The guild to copy.
+
+    Returns:
+        dict: Plain data (ids and names only) that is safe to hand to a worker thread.
+
+    Explanation:
+    discord.py objects belong to the event loop and can change while a worker thread is reading them.
+    Copying the handful of fields we store into plain tuples up front is fast (it is all in memory) and lets the
+    database work run in a thread without touching the member cache.
+    """
+    return {
+        'id': guild.id,
+        'name': guild.name,
+        'owner_id': guild.owner_id,
+        'owner_name': guild.owner.name if guild.owner else None,
+        'members': [(member.id, member.name, member.discriminator) for member in guild.members]
+    }
+
+
+def insert_ignoring_duplicates(session, table):
+    """
+    An INSERT into `table` that skips rows whose key is already stored instead of failing: `INSERT ... ON CONFLICT
+    DO NOTHING` on SQLite and `INSERT IGNORE` on MySQL / MariaDB.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(table).on_conflict_do_nothing()
+    if dialect in ("mysql", "mariadb"):
+        return insert(table).prefix_with("IGNORE")
+    return insert(table)
+
+
+def sync_guild(engine, snapshot, chunk_size=900, progress=None):
+    """
+    Write a guild's owner, server and members to the database with set-based queries.
+
+    Parameters:
+        engine (sqlalchemy.engine.Engine): The engine to open a session on. A fresh session is used because this runs in a worker thread.
+        snapshot (dict): The output of guild_snapshot().
+        chunk_size (int): Number of members handled per chunk. Each chunk is one lookup, two bulk inserts and one commit.
+        progress (callable or None): Called as progress(done, total) after every committed chunk.
+
+    Returns:
+        int: The number of members that were new to the database.
+
+    Explanation:
+    Looking members up one by one means one SELECT per member, which is 50k round-trips for a large guild.
+    Instead, for each chunk of members this function:
+
+    1. Looks up which of the chunk's member IDs already exist with a single `SELECT ... WHERE id IN (...)`.
+    2. Bulk inserts the members that don't exist yet.
+    3. Looks up which of the chunk's members are already associated with the server, again with one query.
+    4. Bulk inserts the missing rows into `member_server_association`.
+    5. Commits, so a huge guild is written in bounded transactions instead of one giant one.
+
+    Syncs of different guilds run at the same time (on_guild_join, the reconciliation loop), and guilds share members
+    and owners, so a row found missing in step 1 or 3 may have been written by another sync before the insert runs.
+    Every insert goes through insert_ignoring_duplicates(), so such a row is simply skipped.
+
+    Note:
+        - The default chunk size stays under SQLite's limit on bound parameters per statement.
+        - This is blocking code: call it with `loop.run_in_executor` from the bot.
+    """
+    association = models.member_server_association
+    members = snapshot['members']
+    new_members = 0
+
+    with DBSession(bind=engine) as session:
+        # Make sure the owner and the server exist before any members are associated with it
+        if snapshot['owner_id']:
+            session.execute(insert_ignoring_duplicates(session, models.Owner.__table__),
+                            [{'id': snapshot['owner_id'], 'username': snapshot['owner_name']}])
+
+        session.execute(insert_ignoring_duplicates(session, models.Server.__table__),
+                        [{'id': snapshot['id'], 'owner_id': snapshot['owner_id'], 'server_name': snapshot['name']}])
+        session.execute(update(models.Server.__table__)
+                        .where(models.Server.id == snapshot['id'])
+                        .values(server_name=snapshot['name']))
+        session.commit()
+
+        for start in range(0, len(members), chunk_size):
+            chunk = members[start:start + chunk_size]
+            member_ids = [member[0] for member in chunk]
+
+            existing_ids = set(session.execute(
+                select(models.Member.id).where(models.Member.id.in_(member_ids))
+            ).scalars())
+            member_rows = [
+                {'id': member_id, 'username': username, 'user_discriminator': discriminator}
+                for member_id, username, discriminator in chunk
+                if member_id not in existing_ids
+            ]
+            if member_rows:
+                result = session.execute(insert_ignoring_duplicates(session, models.Member.__table__), member_rows)
+                new_members += result.rowcount if result.rowcount >= 0 else len(member_rows)
+
+            associated_ids = set(session.execute(
+                select(association.c.member_id).where(
+                    association.c.server_id == snapshot['id'],
+                    association.c.member_id.in_(member_ids)
+                )
+            ).scalars())
+            association_rows = [
+                {'member_id': member_id, 'server_id': snapshot['id']}
+                for member_id in member_ids
+                if member_id not in associated_ids
+            ]
+            if association_rows:
+                session.execute(insert_ignoring_duplicates(session, association), association_rows)
+
+            session.commit()
+
+            if progress:
+                progress(min(start + chunk_size, len(members)), len(members))
+
+    return new_members
+
+
+def reconcile_guild(engine, snapshot, chunk_size=900):
+    """
+    Bring the database in line with a guild's current member list, writing only the differences.
+
+    Parameters:
+        engine (sqlalchemy.engine.Engine): The engine to open sessions on.
+        snapshot (dict): The output of guild_snapshot().
+        chunk_size (int): Number of rows handled per statement and commit.
+
+    Returns:
+        tuple[int, int]: The number of members that were new to the database, and the number of stale
+        member_server_association rows that were removed.
+
+    Explanation:
+    sync_guild() already records the server and adds whatever members and associations are missing.
+    What it can't see is members who have left the guild since it was last synced. This function loads every
+    member ID associated with the server in one query, takes the set difference with the member IDs in the
+    snapshot, and deletes the leftover association rows in chunks.
+    """
+    association = models.member_server_association
+    new_members = sync_guild(engine, snapshot, chunk_size)
+    current_ids = {member[0] for member in snapshot['members']}
+
+    with DBSession(bind=engine) as session:
+        stored_ids = set(session.execute(
+            select(association.c.member_id).where(association.c.server_id == snapshot['id'])
+        ).scalars())
+        stale_ids = list(stored_ids - current_ids)
+
+        for start in range(0, len(stale_ids), chunk_size):
+            session.execute(delete(association).where(
+                association.c.server_id == snapshot['id'],
+                association.c.member_id.in_(stale_ids[start:start + chunk_size])
+            ))
+            session.commit()
+
+    return new_members, len(stale_ids)
+
+
+def log_sync_progress(server_name):
+    """
+    Build a progress callback for sync_guild() that logs how far along a guild sync is.
+    """
+    def progress(done, total):
+        logging.info(f"Synced {done}/{total} members of '{server_name}'")
+    return progress
+
+
+def due_trackers(session, max_age, limit):
+    """
+    The trackers that haven't been checked for `max_age`, oldest first.
+
+    Parameters:
+        session (sqlalchemy.orm.Session): The session to query with.
+        max_age (datetime.timedelta): How long ago a tracker must have been checked to be due.
+        limit (int): The most trackers to return.
+
+    Returns:
+        list[dict]: Plain rows (never ORM objects, which are tied to the session) for the price checker.
+
+    Note:
+        - The query walks ix_trackers_last_checked, so it stays cheap however many trackers there are.
+        - Trackers without a selector (added before selectors were stored) can't be checked and are skipped.
+    """
+    tracker = models.Tracker
+    cutoff = datetime.utcnow() - max_age
+    rows = session.execute(
+        select(tracker.tracker_id, tracker.member_id, tracker.track_url, tracker.title, tracker.price,
+               tracker.available, tracker.selector_type, tracker.selector, tracker.currency_symbol,
+               tracker.etag, tracker.last_modified, tracker.content_hash)
+        .where(tracker.last_checked <= cutoff, tracker.selector.isnot(None))
+        .order_by(tracker.last_checked)
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def save_price_checks(engine, results, chunk_size=500):
+    """
+    Write the outcome of a round of price checks with one executemany UPDATE per chunk.
+
+    Parameters:
+        engine (sqlalchemy.engine.Engine): The engine to open a session on (this runs in a worker thread).
+        results (list[dict]): One {'tracker_id', 'price', 'available', 'last_checked', 'etag', 'last_modified',
+            'content_hash'} per checked tracker.
+        chunk_size (int): Number of trackers updated per statement and commit.
+
+    Note:
+        - Every checked tracker is written, changed or not, so its last_checked moves to the back of the queue.
+    """
+    table = models.Tracker.__table__
+    statement = update(table).where(table.c.tracker_id == bindparam('b_tracker_id')).values(
+        price=bindparam('b_price'),
+        available=bindparam('b_available'),
+        last_checked=bindparam('b_last_checked'),
+        etag=bindparam('b_etag'),
+        last_modified=bindparam('b_last_modified'),
+        content_hash=bindparam('b_content_hash'),
+    )
+
+    with DBSession(bind=engine) as session:
+        for start in range(0, len(results), chunk_size):
+            session.execute(statement, [
+                {'b_tracker_id': result['tracker_id'], 'b_price': result['price'],
+                 'b_available': result['available'], 'b_last_checked': result['last_checked'],
+                 'b_etag': result['etag'], 'b_last_modified': result['last_modified'],
+                 'b_content_hash': result['content_hash']}
+                for result in results[start:start + chunk_size]
+            ])
+            session.commit()
@@ -1,6 +1,8 @@
 import discord
+import logging
 from discord.ext import commands
 from .crawler import CreepyCrawler
+import renachan
 import renachan.managers.models as models
 from datetime import datetime
 import time as time
@@ -204,41 +206,61 @@ async def start_crawl(ctx, bot, command_data):
     try:
         time_start = time.time()
         data = {'user_id': ctx.author.id, 'username': ctx.author.name, 'command':ctx.message.content}
-        crawler = CreepyCrawler(url=command_data["url"])
-
-        ## Grabbing html tags that share this class
-        if "class" in command_data['type']:
-            possible_results = crawler.crawler_by_item_class(class_name=command_data['start'])
-        elif "id" in command_data['type']:
-            possible_results = crawler.crawler_by_item_id(item_id=command_data['start'])
-
-        ## Log Error
-        if not possible_results:
-            await ctx.send(f"Sowwi couldn't find what you were looking for :c")
-            time_end = time.time()
-            data['last_response'] = "error: unable to find html tag"
-            data['duration'] = time_end - time_start
-            await track_time(ctx, bot, data)
-            return
-
-        ## Finding correct item
-        correct_element = await crawler.find_correct_element(possible_results, command_data['title'], ctx)
-
-        ## Log Error
-        if not correct_element:
-            await ctx.send(f"Sowwi I couldn't find the right price :c")
-            time_end = time.time()
-            data['last_response'] = "error: unable to find price"
-            data['duration'] = time_end - time_start
-            await track_time(ctx, bot, data)
-            return
+        crawler = CreepyCrawler(url=command_data["url"], fetcher=bot.fetcher, stats=bot.crawl_stats,
+                                rules=bot.extraction_rules)
+        selector_type = "class" if "class" in command_data['type'] else "id"
+
+        ## Stream the page and stop downloading once the price has turned up, instead of reading all of it first
+        if renachan.config.crawler_streaming():
+            await crawler.stream_load(selector_type, command_data['start'], command_data['title'])
+            if crawler.bytes_saved:
+                logging.info(f"Stopped {command_data['url']} early, {crawler.bytes_saved} bytes not downloaded")
+
+        ## Shops we've crawled before: go straight to where the price was last found on this site
+        correct_element = await crawler.cached_element(selector_type, command_data['start'], command_data['title'])
+
+        if correct_element is None:
+            ## Grabbing html tags that share this class (the page is downloaded without blocking the bot)
+            possible_results = None
+            if "class" in command_data['type']:
+                possible_results = await crawler.crawler_by_item_class(class_name=command_data['start'])
+            elif "id" in command_data['type']:
+                possible_results = await crawler.crawler_by_item_id(item_id=command_data['start'])
+
+            ## Log Error
+            if not possible_results:
+                await ctx.send(f"Sowwi couldn't find what you were looking for :c")
+                time_end = time.time()
+                data['last_response'] = f"error: {crawler.error}" if crawler.error else "error: unable to find html tag"
+                data['duration'] = time_end - time_start
+                await track_time(ctx, bot, data)
+                return
+
+            ## Finding correct item
+            correct_element = await crawler.find_correct_element(possible_results, command_data['title'], ctx)
+
+            ## Log Error
+            if correct_element is None:
+                await ctx.send(f"Sowwi I couldn't find the right price :c")
+                time_end = time.time()
+                data['last_response'] = "error: unable to find price"
+                data['duration'] = time_end - time_start
+                await track_time(ctx, bot, data)
+                return
+
+            ## Remember where the price was, for the next crawl on this site
+            crawler.remember_element(selector_type, command_data['start'], correct_element)
 
         #Getting price
         await ctx.send(f"Parsing Price")
-        price = crawler.extract_number_from_class(possible_results[0], currency=command_data['currency_symbol'])
+        price = crawler.extract_number_from_class(correct_element, currency=command_data['currency_symbol'])
+        if price is None:
+            crawler.forget_rule(selector_type, command_data['start'])
 
         #Add to Database
-        await add_tracker(ctx,bot,command_data['title'],command_data['url'],price=price)
+        await add_tracker(ctx,bot,command_data['title'],command_data['url'],price=price,
+                          selector_type=selector_type, selector=command_data['start'],
+                          currency_symbol=command_data['currency_symbol'])
 
         #Log Success
         time_end = time.time()
@@ -257,23 +279,46 @@ async def ai_chat(bot, message):
     if message.author.id == bot.user.id:
         return
 
-    # Form query payload with the content of the message
-    payload = {'inputs': {'text': message.content}}
-
-    # While the bot is waiting on a response from the model,
-    # set its status as typing for user-friendliness
-    async with message.channel.typing():
-        response = bot.query(bot, payload)
+    # Previous turns of this user's conversation, so the model can answer in context
+    past_user_inputs, generated_responses = bot.conversations.history(message.author.id)
 
-    bot_response = response.get('generated_text', None)
+    # Answer repeated opening prompts straight from the cache without calling the model.
+    # Once a conversation has history the reply depends on it, so only the first turn is cached.
+    model = renachan.config.get_model()
+    bot_response = None
+    if not past_user_inputs:
+        bot_response = bot.response_cache.get(model, message.content)
 
-    # We may get an ill-formed response if the model hasn't fully loaded
-    # or has timed out
     if not bot_response:
-        if 'error' in response:
-            bot_response = '`Error: {}`'.format(response['error'])
-        else:
-            bot_response = 'Hmm... something is not right.'
+        # Form query payload with the content of the message and the conversation so far
+        payload = {'inputs': {
+            'past_user_inputs': past_user_inputs,
+            'generated_responses': generated_responses,
+            'text': message.content
+        }}
+
+        # While the bot is waiting on a response from the model,
+        # set its status as typing for user-friendliness
+        async with message.channel.typing():
+            response = await bot.query(bot, payload)
+
+        bot_response = response.get('generated_text', None)
+
+        # We may get an ill-formed response if the model hasn't fully loaded
+        # or has timed out
+        if not bot_response:
+            if 'error' in response:
+                bot_response = '`Error: {}`'.format(response['error'])
+            else:
+                bot_response = 'Hmm... something is not right.'
+            await message.channel.send(bot_response)
+            return
+
+        # Only well-formed opening answers are worth caching
+        if not past_user_inputs:
+            bot.response_cache.set(model, message.content, bot_response)
+
+    bot.conversations.add_turn(message.author.id, message.content, bot_response)
 
     # Send the model's response to the Discord channel
     await message.channel.send(bot_response)
@@ -0,0 +1,251 @@
+import time
+import random
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+from multidict import CIMultiDict
+
+
+# Status codes worth retrying: rate limited, or a server/gateway that may recover
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchResult:
+    """
+    The outcome of AsyncFetcher.fetch().
+
+    Attributes:
+        url (str): The URL that was requested.
+        status (int): The HTTP status code, or 0 if the request never got a response.
+        headers (CIMultiDict): The response headers (looked up case-insensitively).
+        body (bytes): The response body (empty when the request failed or the body was streamed).
+        error (str or None): Why the request failed, if it did ("HTTP 404" for any response other than 2xx and 304).
+        bytes_read (int): How many bytes of the body were read.
+    """
+    def __init__(self, url, status=0, headers=None, body=b"", error=None, bytes_read=None):
+        self.url = url
+        self.status = status
+        self.headers = headers if headers is not None else CIMultiDict()
+        self.body = body
+        self.error = error
+        self.bytes_read = len(body) if bytes_read is None else bytes_read
+
+    @property
+    def bytes_saved(self):
+        """
+        How many bytes of the body were never downloaded because a stream stopped early.
+        None when the full size isn't known (no Content-Length, or a compressed body).
+        """
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit() or 'Content-Encoding' in self.headers:
+            return None
+        return max(int(length) - self.bytes_read, 0)
+
+    @property
+    def ok(self):
+        return self.error is None and 200 <= self.status < 300
+
+    def text(self, encoding="utf-8"):
+        return self.body.decode(encoding, errors="replace")
+
+
+class AsyncFetcher:
+    """
+    Shared, polite HTTP fetcher for the crawlers.
+
+    Parameters:
+        concurrency (int): Maximum number of open connections across all hosts.
+        per_host_limit (int): Maximum number of requests in flight to any single host.
+        timeout (float): Seconds a single attempt may take before it is abandoned.
+        retries (int): How many times a failed attempt is retried.
+        backoff (float): Base delay in seconds for the exponential backoff between retries.
+        max_retry_after (float): The longest wait between retries, in seconds. A server asking for a longer wait
+            (Retry-After) gets no retry: the failed result is returned right away.
+        user_agent (str): The User-Agent sent with every request.
+        respect_robots (bool): Whether robots.txt is checked before fetching a page.
+        robots_ttl (float): Seconds a site's robots.txt is cached for.
+
+    Explanation:
+    A blocking download inside a coroutine freezes the whole bot while a shop's page comes in. Every crawl shares this
+    fetcher instead, which keeps:
+
+    - one pooled `aiohttp.ClientSession`, so connections (and TLS handshakes) to a shop are reused,
+    - an `asyncio.Semaphore` per host, so many `!rena track` commands for the same shop don't hammer it,
+    - a timeout per attempt, and retries with exponential backoff plus jitter for connection errors, timeouts,
+      429 and 5xx responses (a `Retry-After` header is honoured when the server sends one, up to `max_retry_after`),
+    - a cache of parsed robots.txt files per site, so each site's robots.txt is downloaded at most once per `robots_ttl`,
+    - fetch_stream(), which hands the body over chunk by chunk so a caller can stop a large download early.
+
+    Example usage:
+        fetcher = AsyncFetcher(per_host_limit=2)
+        result = await fetcher.fetch("https://example.com/item123")
+        if result.ok:
+            html = result.text()
+        await fetcher.close()
+    """
+    def __init__(self, concurrency=20, per_host_limit=2, timeout=15, retries=3, backoff=0.5, max_retry_after=30,
+                 user_agent="RenaChan.py", respect_robots=True, robots_ttl=3600):
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.robots_ttl = robots_ttl
+        self._session = None
+        self._host_semaphores = {}
+        self._robots = {}        # origin -> (fetched_at, RobotFileParser)
+        self._robots_locks = {}  # origin -> asyncio.Lock, so a site's robots.txt is only fetched once at a time
+
+    def _get_session(self):
+        # Reuse the pooled session, (re)creating it if it was never opened or has been closed
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_limit, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': self.user_agent})
+        return self._session
+
+    def _host_semaphore(self, host):
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def allowed(self, url):
+        """
+        Check robots.txt (cached per site) to see whether the bot may fetch a URL.
+        """
+        if not self.respect_robots:
+            return True
+
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+
+        async with lock:
+            cached = self._robots.get(origin)
+            if cached is None or time.monotonic() - cached[0] > self.robots_ttl:
+                parser = RobotFileParser()
+                result = await self._request(origin + "/robots.txt", retries=1)
+                if result.status in (401, 403):
+                    parser.disallow_all = True
+                elif result.ok:
+                    parser.parse(result.text().splitlines())
+                else:
+                    # No robots.txt (404) or the site couldn't be reached: nothing is disallowed
+                    parser.allow_all = True
+                cached = (time.monotonic(), parser)
+                self._robots[origin] = cached
+
+        return cached[1].can_fetch(self.user_agent, url)
+
+    async def fetch(self, url, headers=None, ignore_robots=False):
+        """
+        Fetch a URL, respecting robots.txt, the per-host limit, the timeout and the retry policy.
+
+        Parameters:
+            url (str): The URL to fetch.
+            headers (dict or None): Extra request headers.
+            ignore_robots (bool): Skip the robots.txt check for this request. Only for callers whose configuration
+                says so explicitly (see LINKEDIN_RESPECT_ROBOTS).
+
+        Returns:
+            FetchResult: The response. `error` is set if every attempt failed, the server answered with anything but
+            2xx or 304, or robots.txt forbids the URL.
+        """
+        if not ignore_robots and not await self.allowed(url):
+            return FetchResult(url, error="disallowed by robots.txt")
+        return await self._request(url, headers=headers)
+
+    async def fetch_stream(self, url, consume, headers=None, chunk_size=16384):
+        """
+        Fetch a URL like fetch(), but hand the body to `consume` chunk by chunk instead of reading all of it.
+
+        Parameters:
+            url (str): The URL to fetch.
+            consume (coroutine function): Awaited with every chunk of a successful response's body. Returning True
+                stops the download: the rest of the body is never read and the connection is dropped.
+            headers (dict or None): Extra request headers.
+            chunk_size (int): The most bytes handed to `consume` at a time.
+
+        Returns:
+            FetchResult: The response without a body. `bytes_read` and `bytes_saved` tell how much was downloaded.
+
+        Note:
+            - An attempt is only retried if it failed before any of the body reached `consume`.
+        """
+        if not await self.allowed(url):
+            return FetchResult(url, error="disallowed by robots.txt")
+        return await self._request(url, headers=headers, consume=consume, chunk_size=chunk_size)
+
+    async def _stream_body(self, response, consume, chunk_size):
+        read = 0
+        async for chunk in response.content.iter_chunked(chunk_size):
+            read += len(chunk)
+            if await consume(chunk):
+                # Don't hand a half-read connection back to the pool
+                response.close()
+                break
+        return read
+
+    async def _request(self, url, headers=None, retries=None, consume=None, chunk_size=16384):
+        retries = self.retries if retries is None else retries
+        session = self._get_session()
+        host = urlsplit(url).netloc
+        result = None
+
+        for attempt in range(retries + 1):
+            retry_after = None
+            streaming = False
+            async with self._host_semaphore(host):
+                try:
+                    async with session.get(url, headers=headers, timeout=self.timeout) as response:
+                        response_headers = CIMultiDict(response.headers)
+                        retry_after = response.headers.get('Retry-After')
+                        if consume is not None and 200 <= response.status < 300:
+                            streaming = True
+                            read = await self._stream_body(response, consume, chunk_size)
+                            result = FetchResult(url, response.status, response_headers, bytes_read=read)
+                        else:
+                            body = await response.read()
+                            result = FetchResult(url, response.status, response_headers, body)
+                except asyncio.TimeoutError:
+                    result = FetchResult(url, error="timed out")
+                except aiohttp.ClientError as e:
+                    result = FetchResult(url, error=str(e))
+
+            if streaming and result.error is not None:
+                # Part of the body was already consumed, so it can't simply be fetched again
+                return result
+            if (result.error is None and result.status not in RETRY_STATUSES) or attempt == retries:
+                break
+
+            # Exponential backoff with jitter, unless the server told us how long to wait
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            if retry_after and retry_after.isdigit():
+                if float(retry_after) > self.max_retry_after:
+                    # Waiting that long would hold up whoever is waiting on this page (e.g. a `!rena track`)
+                    logging.info(f"Not retrying {url}: the server asked to wait {retry_after}s")
+                    break
+                delay = max(delay, float(retry_after))
+            delay = min(delay, self.max_retry_after)
+            logging.info(f"Retrying {url} in {delay:.1f}s ({result.error or result.status})")
+            await asyncio.sleep(delay)
+
+        if result.error is None and not (200 <= result.status < 300 or result.status == 304):
+            # Not found, forbidden, gone, or still failing after the retries: the page couldn't be fetched
+            result.error = f"HTTP {result.status}"
+        return result
+
+    async def close(self):
+        """
+        Close the pooled session. Safe to call more than once.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -1,21 +1,181 @@
-import time,math,random,os
-import platform
-from .linkedIn_utils import browser_options, LinkedinURLGenerator
-import renachan.managers.models as models
-from .database_helpers import add_to_database
+import asyncio
+import logging
+from functools import partial
+from itertools import islice
+from .linkedIn_utils import firefox_driver, LinkedinURLGenerator
+from .browser_pool import BrowserPool
+from .linkedIn_guest import fetch_new_jobs
+import renachan
+from renachan.managers.seen import SeenUrls
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
-from selenium.webdriver.firefox.options import Options
+# The job cards of a LinkedIn job search, and the "no matching jobs" notice shown instead of them
+JOB_CARD_LINK = "a.job-card-container__link"
+NO_RESULTS = ".jobs-search-no-results-banner"
+
+
+def collect_job_links(driver, job, timeout=15):
+    """
+    Open one job search and collect the links of the jobs it lists. Runs on a BrowserPool worker thread.
+
+    Parameters:
+        driver (selenium.webdriver.Firefox): The worker's browser.
+        job (dict): One entry of LinkedinURLGenerator.generate_url_links() ("url", "keyword", "location").
+        timeout (float): How long to wait for the results to show up.
+
+    Returns:
+        list[str]: The job links, empty if the search has no results.
+
+    Note:
+        - The page is read as soon as the job cards (or the "no results" notice) are there, instead of after a fixed
+          sleep: a fast page isn't held up, and a slow one isn't read before it has loaded.
+    """
+    driver.get(job["url"])
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.presence_of_element_located((By.CSS_SELECTOR, JOB_CARD_LINK)),
+            EC.presence_of_element_located((By.CSS_SELECTOR, NO_RESULTS)),
+        ))
+    except TimeoutException:
+        raise TimeoutException(f"No job cards after {timeout}s on {job['url']}")
+
+    links = []
+    for card in driver.find_elements(By.CSS_SELECTOR, JOB_CARD_LINK):
+        href = card.get_attribute("href")
+        if href:
+            links.append(href.split("?")[0])
+    return links
 
 
 class Linkedin_Bot:
-    def __init__(self):
-        self.driver=webdriver.Firefox(options=browser_options())
+    """
+    Runs the LinkedIn job searches, over plain HTTP where possible and on headless browsers otherwise.
+
+    Parameters:
+        fetcher (AsyncFetcher or None): The bot's shared fetcher (bot.fetcher), used for the guest endpoint.
+            Without one every search goes to the browsers.
+        db (renachan.managers.database.Database or None): Where the job URLs found so far are kept (bot.db), so each
+            run only reports the jobs that are new since the last one.
+        pool (BrowserPool or None): The browsers to use. By default a pool of BROWSER_WORKERS Firefox workers
+            (headless unless HEADLESS is false) that are replaced every BROWSER_RECYCLE_AFTER pages. It is only
+            started when a search needs it.
+
+    Explanation:
+    With LINKEDIN_FETCH_MODE=http (the default), every search is first requested from LinkedIn's guest job search
+    endpoint (LINKEDIN_GUEST_URL) and the cards are read from the returned HTML, with no browser involved. Only the
+    searches the endpoint won't answer are run on the browser pool. LINKEDIN_FETCH_MODE=browser skips the HTTP step.
+
+    The fetcher checks robots.txt before every request, and linkedin.com's robots.txt disallows everything for user
+    agents it doesn't list, CRAWLER_USER_AGENT included. So with LINKEDIN_RESPECT_ROBOTS=true (the default) the HTTP
+    step is refused: http_allowed() finds that out once per batch from the cached robots.txt, without sending any
+    search, logs it the first time, and every search runs on the browsers as with LINKEDIN_FETCH_MODE=browser.
+    The HTTP step only does its work against an endpoint whose robots.txt allows it (e.g. a stand-in at
+    LINKEDIN_GUEST_URL), or when the operator sets LINKEDIN_RESPECT_ROBOTS=false to skip the check for the guest
+    endpoint on purpose. The browsers never consult robots.txt either way.
+
+    The crawl is incremental: job URLs are checked against `seen` (see renachan.managers.seen.SeenUrls), each search is
+    paged through only until a page holds nothing new (up to LINKEDIN_MAX_PAGES pages), and the new URLs are written
+    in bulk at the end of the run.
+
+    Example usage:
+        linkedin = Linkedin_Bot(fetcher=bot.fetcher, db=bot.db)
+        jobs = await linkedin.collect_jobs()
+        await linkedin.close()
+    """
+    def __init__(self, fetcher=None, pool=None, db=None):
+        self.fetcher = fetcher
+        self.pool = pool
+        self.seen = SeenUrls(db)
+        self.guest_url = renachan.config.linkedin_guest_url()
+        self.respect_robots = renachan.config.linkedin_respect_robots()
+        self.fallbacks = 0  # searches that needed a browser
+        self.robots_refused = False
+
+    def browser_pool(self):
+        if self.pool is None:
+            self.pool = BrowserPool(create_driver=partial(firefox_driver, renachan.config.headless()),
+                                    workers=renachan.config.browser_workers(),
+                                    recycle_after=renachan.config.browser_recycle_after())
+        return self.pool
 
     def generate_urls(self):
-        url_obj = LinkedinURLGenerator.generate_url_links()
+        """
+        The searches to run: every keyword in every location, generated lazily.
+        """
+        return LinkedinURLGenerator().generate_url_links()
+
+    async def collect_jobs(self, url_objs=None):
+        """
+        Run every search of the keyword x location matrix, several at a time, and keep the jobs not seen before.
+
+        Parameters:
+            url_objs (iterable or None): The searches to run (a list or a generator). Defaults to generate_urls().
+
+        Returns:
+            dict: search URL -> list of new job links. Searches that failed both ways are left out (and logged by the
+            pool).
+
+        Note:
+            - The searches are taken LINKEDIN_BATCH_SIZE at a time, so only one batch of them (and of their requests)
+              is in flight however big the matrix is. The new URLs are written after every batch.
+        """
+        searches = iter(self.generate_urls() if url_objs is None else url_objs)
+        batch_size = renachan.config.linkedin_batch_size()
+        await self.seen.load()
+
+        found = {}
+        while True:
+            batch = list(islice(searches, batch_size))
+            if not batch:
+                break
+            await self.collect_batch(batch, found)
+            await self.seen.flush()
+        return found
+
+    async def http_allowed(self):
+        """
+        Whether this batch's searches can go to the guest endpoint over HTTP.
+        """
+        if self.fetcher is None or renachan.config.linkedin_fetch_mode() != "http":
+            return False
+        if self.respect_robots and not await self.fetcher.allowed(self.guest_url):
+            if not self.robots_refused:
+                logging.warning(f"robots.txt disallows {self.guest_url} for '{self.fetcher.user_agent}', running the "
+                                f"LinkedIn searches on browsers (set LINKEDIN_RESPECT_ROBOTS=false to skip the check)")
+                self.robots_refused = True
+            return False
+        return True
+
+    async def collect_batch(self, url_objs, found):
+        """
+        Run one batch of searches, adding their new job links to `found`.
+        """
+        pending = url_objs
+        if await self.http_allowed():
+            max_pages = renachan.config.linkedin_max_pages()
+            results = await asyncio.gather(*(fetch_new_jobs(self.fetcher, obj, self.seen, self.guest_url, max_pages,
+                                                            self.respect_robots)
+                                             for obj in url_objs))
+            pending = []
+            for obj, cards in zip(url_objs, results):
+                if cards is None:
+                    pending.append(obj)
+                else:
+                    found[obj["url"]] = [card["url"] for card in cards]
+
+        if pending:
+            self.fallbacks += len(pending)
+            handler = partial(collect_job_links, timeout=renachan.config.browser_page_timeout())
+            results = await self.browser_pool().run(pending, handler)
+            for obj, links in zip(pending, results):
+                if not isinstance(links, Exception):
+                    found[obj["url"]] = [link for link in links if self.seen.add(
+                        {'url': link, 'keyword': obj["keyword"], 'location': obj["location"], 'applied': False})]
 
-        for obj in url_obj:
-            query = bot.db.query(models.LinkedInUrls).filter_by(url=obj["url"]).first()
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
@@ -0,0 +1,113 @@
+import asyncio
+from urllib.parse import urlsplit
+from parsel import Selector
+
+# LinkedIn's public (logged-out) job search. It takes the same query as the regular search page and answers with a
+# plain HTML list of job cards, no JavaScript needed.
+GUEST_SEARCH_URL = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
+# Cards per page of results; the next page starts this many results further
+PAGE_SIZE = 25
+
+
+def guest_search_url(search_url, base_url=GUEST_SEARCH_URL, start=0):
+    """
+    The guest endpoint URL for a job search URL from LinkedinURLGenerator.
+
+    Parameters:
+        search_url (str): The regular search URL (https://www.linkedin.com/jobs/search/?keywords=...).
+        base_url (str): Where the guest endpoint lives (LINKEDIN_GUEST_URL, e.g. a local stand-in).
+        start (int): Offset of the first result; the endpoint returns a page of cards from there.
+    """
+    query = urlsplit(search_url).query
+    return f"{base_url}?{query}&start={start}" if query else f"{base_url}?start={start}"
+
+
+def parse_job_cards(text):
+    """
+    Read the job cards out of a guest search response.
+
+    Parameters:
+        text (str): The response body.
+
+    Returns:
+        list[dict]: One dict per card: "url" (without tracking parameters), "title", "company", "location" and
+        "posted" (the listing date, "YYYY-MM-DD"). Fields missing from a card are None.
+    """
+    jobs = []
+    for card in Selector(text=text).css("div.base-search-card"):
+        link = card.css("a.base-card__full-link::attr(href)").get()
+        if not link:
+            continue
+        jobs.append({
+            'url': link.split("?")[0],
+            'title': clean(card.css("h3.base-search-card__title::text").get()),
+            'company': clean(card.css("h4.base-search-card__subtitle a::text").get()
+                             or card.css("h4.base-search-card__subtitle::text").get()),
+            'location': clean(card.css("span.job-search-card__location::text").get()),
+            'posted': card.css("time::attr(datetime)").get(),
+        })
+    return jobs
+
+
+def clean(text):
+    return " ".join(text.split()) if text else None
+
+
+async def fetch_job_cards(fetcher, job, base_url=GUEST_SEARCH_URL, start=0, respect_robots=True):
+    """
+    Run one job search over plain HTTP.
+
+    Parameters:
+        fetcher (AsyncFetcher): The bot's shared fetcher (bot.fetcher).
+        job (dict): One entry of LinkedinURLGenerator.generate_url_links() ("url", "keyword", "location").
+        base_url (str): Where the guest endpoint lives.
+        start (int): Offset of the first result.
+        respect_robots (bool): Whether the endpoint's robots.txt is checked first (LINKEDIN_RESPECT_ROBOTS).
+
+    Returns:
+        list[dict] or None: The job cards (see parse_job_cards()), or None if the endpoint didn't answer with a page
+        of results (blocked, rate limited, disallowed by robots.txt...), in which case the search needs a browser.
+
+    Explanation:
+    A guest response is a few KB of static HTML, so a search costs one pooled HTTP request and a parse of a small
+    fragment on a worker thread, where a browser costs a Firefox process and seconds of rendering.
+    """
+    result = await fetcher.fetch(guest_search_url(job['url'], base_url, start), ignore_robots=not respect_robots)
+    if not result.ok:
+        return None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, parse_job_cards, result.text())
+
+
+async def fetch_new_jobs(fetcher, job, seen, base_url=GUEST_SEARCH_URL, max_pages=10, respect_robots=True):
+    """
+    Page through one job search until it only shows jobs that were already seen.
+
+    Parameters:
+        fetcher (AsyncFetcher): The bot's shared fetcher (bot.fetcher).
+        job (dict): One entry of LinkedinURLGenerator.generate_url_links() ("url", "keyword", "location").
+        seen (renachan.managers.seen.SeenUrls): The job URLs found before. New ones are added to it.
+        base_url (str): Where the guest endpoint lives.
+        max_pages (int): The most pages to read.
+        respect_robots (bool): Whether the endpoint's robots.txt is checked first (LINKEDIN_RESPECT_ROBOTS).
+
+    Returns:
+        list[dict] or None: The job cards that weren't seen before, or None if not even the first page could be
+        fetched (the search needs a browser).
+
+    Explanation:
+    The searches are sorted newest first, so once a whole page is made of jobs that were already seen, the pages after
+    it are older still and the rest of the search is skipped. A run after a quiet day reads one page per search.
+    """
+    new = []
+    for page in range(max_pages):
+        cards = await fetch_job_cards(fetcher, job, base_url, page * PAGE_SIZE, respect_robots)
+        if cards is None:
+            # A later page that fails just ends the search with what was found so far
+            return new if page else None
+        fresh = [card for card in cards
+                 if seen.add({'url': card['url'], 'keyword': job['keyword'], 'location': job['location'], 'applied': False})]
+        new.extend(fresh)
+        if len(cards) < PAGE_SIZE or not fresh:
+            break
+    return new
@@ -1,46 +1,94 @@
-import time
+import logging
+from urllib.parse import urlencode, quote_plus
 from linkedIn_constants import LOCATIONS, KEYWORDS, firefoxProfileRootDir
+from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
+import renachan
+from renachan.tools.locations import LOCATIONS_PATH, load_geo_ids, geo_id
 
 linkJobUrl = "https://www.linkedin.com/jobs/search/"
 jobsPerPage = 25
+# The filters every search uses: Easy Apply, full-time / contract / internship, entry and associate level,
+# posted in the last week, newest first
+SEARCH_FILTERS = {"f_AL": "true", "f_JT": "F,C,I", "f_E": "2,3", "f_TPR": "r604800", "f_SB2": "2", "sortBy": "DD"}
 
-fast = 2
-medium = 3
-slow = 10
-
-botSpeed = slow
-
-def browser_options():
+def browser_options(headless=True):
     options = Options()
-    firefoxProfileRootDir = firefoxProfileRootDir
-    options.add_argument("--start-maximized")
+    if headless:
+        options.add_argument("-headless")
+        # A headless window has no screen to be maximized on, and LinkedIn hides parts of the page on small windows
+        options.add_argument("--width=1920")
+        options.add_argument("--height=1080")
+    else:
+        options.add_argument("--start-maximized")
     options.add_argument("--ignore-certificate-errors")
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument("--disable-extensions")
     options.add_argument("--disable-blink-features")
     options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--profile")
-    options.add_argument(firefoxProfileRootDir)
+    # Firefox locks a profile directory while it runs, so every browser gets its own copy of the logged-in profile
+    # and several can run side by side
+    options.profile = FirefoxProfile(firefoxProfileRootDir)
 
     return options
 
+def firefox_driver(headless=True):
+    """
+    Start one Firefox with the logged-in LinkedIn profile (the `create_driver` of a BrowserPool).
+    """
+    return webdriver.Firefox(options=browser_options(headless))
+
 class LinkedinURLGenerator:
+    """
+    Generates the LinkedIn job searches to run: every keyword in every location.
+
+    Parameters:
+        locations (list or None): Location names (or geoIds). Defaults to LOCATIONS.
+        keywords (list or None): Search keywords. Defaults to KEYWORDS.
+        geo_ids (dict or None): The location registry (see renachan.tools.locations). Defaults to the one at
+            LINKEDIN_LOCATIONS_PATH, or the bundled renachan/tools/locations.json.
+
+    Explanation:
+    Locations are looked up in a registry of name -> geoId, loaded once from JSON, so supporting a new location means
+    adding a line to the registry. A location the registry doesn't know is logged and skipped.
+
+    The query is built with urlencode() / quote_plus(), so keywords with spaces or symbols ("C++", "data & ML") reach
+    LinkedIn intact. Everything the searches share (the base URL and SEARCH_FILTERS) is encoded once into a template,
+    and every keyword once per generator run, so a search costs a single format().
+
+    generate_url_links() yields the searches one at a time instead of building the whole keyword x location list, so
+    hundreds of keywords and locations don't have to be held in memory at once.
+
+    Example usage:
+        for search in LinkedinURLGenerator().generate_url_links():
+            print(search["url"], search["keyword"], search["location"])
+    """
+    def __init__(self, locations=None, keywords=None, geo_ids=None):
+        self.locations = LOCATIONS if locations is None else locations
+        self.keywords = KEYWORDS if keywords is None else keywords
+        if geo_ids is None:
+            geo_ids = load_geo_ids(renachan.config.linkedin_locations_path() or LOCATIONS_PATH)
+        self.geo_ids = geo_ids
+        self.template = linkJobUrl + "?" + urlencode(SEARCH_FILTERS) + "&keywords={keywords}&geoId={geo_id}"
+
     def generate_url_links(self):
-        path = []
-        for location in LOCATIONS:
-            for keyword in KEYWORDS:
-                url = linkJobUrl + "?f_AL=true&keywords=" + keyword + "f_JT=F%2CC%2CI" + self.get_location(location) + "&0f_E=2%2C3" + "&f_TPR=r604800" + "&f_SB2=2&" + "&sortBy=DD"
-                path.append({"url": url, "keyword": keyword, "location":location})
-        return path
-
-    def get_location(self,location):
-        if location == "United States":
-            return "&geoId=103644278"
-        elif location == "Austin, TX":
-            return "&geoId=104472865"
-        elif location == "Houston, TX":
-            return "&geoId=103743442"
-        elif location == "Dallas, TX":
-            return "&geoId=103743442"
+        """
+        Yield one {"url", "keyword", "location"} search per keyword and known location.
+        """
+        keywords = [(keyword, quote_plus(keyword)) for keyword in self.keywords]
+        for location in self.locations:
+            location_id = self.get_location(location)
+            if location_id is None:
+                logging.warning(f"Unknown LinkedIn location '{location}': add its geoId to the location registry")
+                continue
+            for keyword, quoted in keywords:
+                yield {"url": self.template.format(keywords=quoted, geo_id=location_id),
+                       "keyword": keyword, "location": location}
+
+    def get_location(self, location):
+        """
+        The geoId of a location, or None if it isn't in the registry.
+        """
+        return geo_id(location, self.geo_ids)
@@ -24,7 +24,49 @@ def api_url():
     return os.getenv('API_URL')
 
 def get_model():
-    return "DialoGPT-medium-umineko"
+    return os.getenv('MODEL_NAME') or "DialoGPT-medium-umineko"
+
+def inference_backend():
+    return os.getenv('INFERENCE_BACKEND', "http")
+
+def inference_workers():
+    return int(os.getenv('INFERENCE_WORKERS', "1"))
+
+def local_model_path():
+    return os.getenv('LOCAL_MODEL_PATH') or get_model()
+
+def inference_timeout():
+    return float(os.getenv('INFERENCE_TIMEOUT', "30"))
+
+def inference_concurrency():
+    return int(os.getenv('INFERENCE_CONCURRENCY', "4"))
+
+def inference_batch_window():
+    return float(os.getenv('INFERENCE_BATCH_WINDOW', "0.05"))
+
+def inference_batch_size():
+    return int(os.getenv('INFERENCE_BATCH_SIZE', "8"))
+
+def response_cache_size():
+    return int(os.getenv('RESPONSE_CACHE_SIZE', "1024"))
+
+def response_cache_ttl():
+    return float(os.getenv('RESPONSE_CACHE_TTL', "3600"))
+
+def response_cache_path():
+    return os.getenv('RESPONSE_CACHE_PATH') or None
+
+def conversation_max_turns():
+    return int(os.getenv('CONVERSATION_MAX_TURNS', "5"))
+
+def conversation_token_budget():
+    return int(os.getenv('CONVERSATION_TOKEN_BUDGET', "256"))
+
+def conversation_idle_timeout():
+    return float(os.getenv('CONVERSATION_IDLE_TIMEOUT', "1800"))
+
+def conversation_max_tokens():
+    return int(os.getenv('CONVERSATION_MAX_TOKENS', "1000000"))
 
 def set_project_folder_as_env_variable():
     project_folder = os.getcwd()
@@ -37,8 +79,80 @@ def bot_status():
     except:
         return os.getenv('BOT_STATUS', default_prefix)
 
+def reconcile_interval():
+    return float(os.getenv('RECONCILE_INTERVAL', "60"))
+
+def reconcile_concurrency():
+    return int(os.getenv('RECONCILE_CONCURRENCY', "2"))
+
+def price_check_interval():
+    return float(os.getenv('PRICE_CHECK_INTERVAL', "5"))
+
+def price_check_age():
+    return float(os.getenv('PRICE_CHECK_AGE', "60"))
+
+def price_check_batch_size():
+    return int(os.getenv('PRICE_CHECK_BATCH_SIZE', "500"))
+
+def price_check_concurrency():
+    return int(os.getenv('PRICE_CHECK_CONCURRENCY', "8"))
+
+def crawler_concurrency():
+    return int(os.getenv('CRAWLER_CONCURRENCY', "20"))
+
+def crawler_per_host_limit():
+    return int(os.getenv('CRAWLER_PER_HOST_LIMIT', "2"))
+
+def crawler_timeout():
+    return float(os.getenv('CRAWLER_TIMEOUT', "15"))
+
+def crawler_retries():
+    return int(os.getenv('CRAWLER_RETRIES', "3"))
+
+def crawler_max_retry_after():
+    return float(os.getenv('CRAWLER_MAX_RETRY_AFTER', "30"))
+
+def crawler_user_agent():
+    return os.getenv('CRAWLER_USER_AGENT', "RenaChan.py")
+
+def crawler_streaming():
+    return os.getenv('CRAWLER_STREAMING', "true").lower() in ("1", "true", "yes")
+
+def extraction_rules_size():
+    return int(os.getenv('EXTRACTION_RULES_SIZE', "2048"))
+
+def headless():
+    return os.getenv('HEADLESS', "true").lower() in ("1", "true", "yes")
+
+def browser_workers():
+    return int(os.getenv('BROWSER_WORKERS', "2"))
+
+def browser_recycle_after():
+    return int(os.getenv('BROWSER_RECYCLE_AFTER', "50"))
+
+def browser_page_timeout():
+    return float(os.getenv('BROWSER_PAGE_TIMEOUT', "15"))
+
+def linkedin_fetch_mode():
+    return os.getenv('LINKEDIN_FETCH_MODE', "http").lower()
+
+def linkedin_guest_url():
+    return os.getenv('LINKEDIN_GUEST_URL') or "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
+
+def linkedin_respect_robots():
+    return os.getenv('LINKEDIN_RESPECT_ROBOTS', "true").lower() in ("1", "true", "yes")
+
+def linkedin_max_pages():
+    return int(os.getenv('LINKEDIN_MAX_PAGES', "10"))
+
+def linkedin_locations_path():
+    return os.getenv('LINKEDIN_LOCATIONS_PATH') or None
+
+def linkedin_batch_size():
+    return int(os.getenv('LINKEDIN_BATCH_SIZE', "100"))
+
 def db_host():
-    return os.getenv['DB_HOST']
+    return os.getenv('DB_HOST', "localhost")
 
 def storage_type():
     return os.environ['STORAGE_TYPE']
@@ -49,8 +163,29 @@ def get_huggingface():
 def db_port():
     return os.getenv('DB_PORT', "5000")
 
+def db_pool_size():
+    return int(os.getenv('DB_POOL_SIZE', "5"))
+
+def db_max_overflow():
+    return int(os.getenv('DB_MAX_OVERFLOW', "10"))
+
+def db_pool_timeout():
+    return float(os.getenv('DB_POOL_TIMEOUT', "30"))
+
+def telemetry_batch_size():
+    return int(os.getenv('TELEMETRY_BATCH_SIZE', "50"))
+
+def telemetry_flush_interval():
+    return float(os.getenv('TELEMETRY_FLUSH_INTERVAL', "5"))
+
+def telemetry_max_pending():
+    return int(os.getenv('TELEMETRY_MAX_PENDING', "10000"))
+
 def db_schema():
     return os.environ['DB_SCHEMA']
 
 def db_user():
     return os.environ['DB_USER']
+
+def db_password():
+    return os.getenv('DB_PASSWORD', "")
@@ -1,15 +1,19 @@
 import json
+import logging
 import renachan
 import discord
 import renachan.managers.models as models
 from discord.ext import commands
 from .cogs.utils.discord_helpers import ai_chat
+from .cogs.utils.database_helpers import guild_snapshot, sync_guild, log_sync_progress
 
 
 
 def __init__(bot):
     """ Initialize events """
     on_guild_join(bot)
+    on_guild_remove(bot)
+    on_member_changes(bot)
     on_message(bot)
 
 def on_guild_join(bot):
@@ -19,6 +23,7 @@ def on_guild_join(bot):
     2. Checks if the owner already exists in the database and adds it if not.
     3. Adds the new server to the database.
     4. Associates guild members with the server in the database, will include new members to the database if they are not there.
+       Members are looked up and inserted in bulk, chunk by chunk, in a worker thread so the event loop keeps running.
     5. Finds the 'general' channel in the guild and sends a welcome message there or in the first text channel.
 
     Parameters:
@@ -26,60 +31,32 @@ def on_guild_join(bot):
 
     Notes:
         - This function assumes that 'renachan.config' and 'renachan.models' have been imported and properly set up.
-        - The function relies on a database session named 'bot.db' to perform database operations.
+        - The function relies on the data access layer 'bot.db' (renachan.managers.database.Database) to perform database operations.
         - It is assumed that 'bot' is an instance of the bot (client) used to interact with Discord.
 
     """
     @bot.event
     async def on_guild_join(guild):
-        if renachan.config.storage_type() == "sqlite":
-            server_id = guild.id
-            owner_id = guild.owner_id
-            server_name = guild.name
-            owner_username = guild.owner.name
-
-            # Check if the owner already exists in the database
-            existing_owner = bot.db.query(renachan.models.Owner).filter_by(id=owner_id).first()
-
-            # If the owner does not exist, add it to the database
-            if not existing_owner:
-                owner = renachan.models.Owner(id=owner_id, username=owner_username)
-                bot.db.add(owner)
-
-            # Add the new server to the database
-            server = renachan.models.Server(id=server_id, server_name=server_name, owner=existing_owner)
-            bot.db.add(server)
-
-            # Commit the changes to the database
-            bot.db.commit()
-
-            # Iterate through the guild members and associate them with the server
-            for member in guild.members:
-                member_id = member.id
-                member_username = member.name
-                member_discriminator = member.discriminator
-
-                # Check if the member already exists in the database
-                existing_member = bot.db.query(renachan.models.Member).filter_by(id=member_id).first()
-                if existing_member:
-                    # If the member exists, retrieve the member instance and add the server to its 'servers' relationship
-                    existing_member.servers.append(server)
-                else:
-                    # If the member does not exist, create a new member instance and add it to the database with the associated server
-                    new_member = renachan.models.Member(id=member_id, username=member_username, user_discriminator=member_discriminator)
-                    new_member.servers.append(server)
-                    bot.db.add(new_member)
+        bot.member_index.add_guild(guild)
+        if getattr(bot, 'db', None) is not None:
+            # Copy the guild's members out of the discord.py cache, then write them to the database
+            # in a worker thread with set-based lookups, bulk inserts and chunked commits.
+            snapshot = guild_snapshot(guild)
+            new_members = await bot.db.run_sync(
+                sync_guild,
+                bot.db.engine,
+                snapshot,
+                900,
+                log_sync_progress(guild.name)
+            )
+            logging.info(f"Joined '{guild.name}': {len(snapshot['members'])} members synced, {new_members} new")
 
             # Finding General Channel
             general_channel = next((channel for channel in guild.text_channels if channel.name == 'general'), None)
-
-            # Commit the changes to the database and close the session
-            bot.db.commit()
-            bot.db.close()
+            welcome_message = "Rena-Chan has arrived and is ready to serve! :3"
 
             # Send the welcome message if the 'general' channel is found
             if general_channel:
-                welcome_message = "Rena-Chan has arrived and is ready to serve! :3"
                 await general_channel.send(welcome_message)
             else:
                 # If 'general' channel doesn't exist, send it to the first text channel in the guild
@@ -87,6 +64,40 @@ def on_guild_join(bot):
                 if first_text_channel:
                     await first_text_channel.send(welcome_message)
 
+def on_guild_remove(bot):
+    """
+    Forget the members of a guild the bot left (or was removed from) in the username index (bot.member_index).
+    """
+    @bot.event
+    async def on_guild_remove(guild):
+        bot.member_index.remove_guild(guild)
+
+def on_member_changes(bot):
+    """
+    Keep the username index (bot.member_index) current as members join, leave and change their username,
+    so `!rena harass` can look its target up without scanning every guild.
+
+    Notes:
+        - A username change arrives as on_user_update (once per user) and may also come with on_member_update
+          (once per guild). Both re-file the member under the new name, so whichever arrives first wins and the other
+          does nothing.
+    """
+    @bot.event
+    async def on_member_join(member):
+        bot.member_index.add(member)
+
+    @bot.event
+    async def on_member_remove(member):
+        bot.member_index.remove(member)
+
+    @bot.event
+    async def on_member_update(before, after):
+        bot.member_index.rename(before, after)
+
+    @bot.event
+    async def on_user_update(before, after):
+        bot.member_index.rename_user(before, after)
+
 def on_message(bot):
     @bot.event
     async def on_message(message):
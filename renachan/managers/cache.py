@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import time
+import logging
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Bounded cache of model responses with TTL and LRU eviction.
+
+    Parameters:
+        max_entries (int): Maximum number of responses kept. The least recently used entry is dropped when full.
+        ttl (float): Number of seconds a response stays valid after it was stored.
+        path (str or None): Optional JSON file used to keep the cache across restarts. None keeps it in memory only.
+
+    Explanation:
+    Greetings like "hi" or "hello rena" come in all the time and the model would be asked the same thing over and over.
+    This cache keeps the model's answers keyed on the model name and a normalized version of the prompt, so repeated
+    prompts are answered straight from memory without touching the API quota.
+
+    Entries are kept in an `OrderedDict` in least-recently-used order: a hit moves the entry to the end, and when the
+    cache is full the entry at the front is evicted. Every entry also stores the time it was written, and entries
+    older than `ttl` are treated as misses and removed. `hits` and `misses` count lookups so the hit rate can be logged.
+
+    Note:
+        - Timestamps use wall-clock time (time.time()) so entries loaded from disk still expire correctly after a restart.
+        - `save()` writes the file atomically (write to a temp file, then replace) so a crash can't leave half a cache behind.
+
+    Example usage:
+        cache = ResponseCache(max_entries=1024, ttl=3600, path="response_cache.json")
+        response = cache.get(model, message.content)
+        if response is None:
+            response = await ask_the_model()
+            cache.set(model, message.content, response)
+    """
+    def __init__(self, max_entries=1024, ttl=3600, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, response)
+
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def normalize(prompt):
+        # "Hello Rena!!", " hello   rena" and "hello rena" should all share one entry
+        prompt = re.sub(r"\s+", " ", prompt.lower()).strip()
+        return prompt.strip(".,!?~ ")
+
+    def _key(self, model, prompt):
+        return f"{model}:{self.normalize(prompt)}"
+
+    def get(self, model, prompt):
+        """
+        Look up a cached response.
+
+        Parameters:
+            model (str): The model name, e.g. renachan.config.get_model().
+            prompt (str): The prompt as the user typed it.
+
+        Returns:
+            str or None: The cached response, or None on a miss or an expired entry.
+        """
+        key = self._key(model, prompt)
+        entry = self._entries.get(key)
+
+        if entry is None or time.time() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, model, prompt, response):
+        """
+        Store a response, evicting the least recently used entry if the cache is full.
+        """
+        key = self._key(model, prompt)
+        self._entries[key] = (time.time(), response)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """
+        Load unexpired entries from the backing file, if it exists.
+        """
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r') as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not load response cache from {self.path}: {e}")
+            return
+
+        now = time.time()
+        # The file is written oldest-first, so loading in order restores the LRU order too
+        for key, stored_at, response in entries[-self.max_entries:]:
+            if now - stored_at <= self.ttl:
+                self._entries[key] = (stored_at, response)
+
+    def save(self):
+        """
+        Write the cache to the backing file. Does nothing for a memory-only cache.
+        """
+        if not self.path:
+            return
+
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w') as file:
+                json.dump([[key, stored_at, response] for key, (stored_at, response) in self._entries.items()], file)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.error(f"Could not save response cache to {self.path}: {e}")
+
+    async def close(self):
+        """
+        Shutdown hook: persist the cache and log how useful it was.
+        """
+        logging.info(f"Response cache: {self.hits} hits, {self.misses} misses ({self.hit_rate():.0%} hit rate)")
+        self.save()
@@ -0,0 +1,113 @@
+import time
+from collections import OrderedDict, deque
+
+
+class ConversationStore:
+    """
+    Bounded per-user conversation history for the DM chat.
+
+    Parameters:
+        max_turns (int): Maximum number of (user input, bot response) turns remembered per user.
+        token_budget (int): Maximum number of tokens of history kept per user. Oldest turns are dropped first.
+        idle_timeout (float): Number of seconds after which an idle user's conversation is forgotten.
+        max_total_tokens (int): Memory cap across all users. The least recently active users are evicted past it.
+
+    Explanation:
+    DialoGPT only gives sensible follow-up answers when it can see the previous turns, which the inference API takes
+    as `past_user_inputs` and `generated_responses`. This store keeps those turns for every user who DMs the bot.
+
+    Every user gets a small ring buffer (`deque(maxlen=max_turns)`) of turns, trimmed further so it never holds more
+    than `token_budget` tokens. Users are kept in an `OrderedDict` ordered by last activity, which makes both idle
+    eviction and the global cap cheap: the least recently active users are always at the front.
+
+    Tokens are counted by splitting on whitespace. That is only an estimate of what the model tokenizer produces,
+    but it is cheap and good enough to bound memory.
+
+    Example usage:
+        store = ConversationStore(max_turns=5, token_budget=256)
+        past_user_inputs, generated_responses = store.history(message.author.id)
+        ...
+        store.add_turn(message.author.id, message.content, bot_response)
+    """
+    def __init__(self, max_turns=5, token_budget=256, idle_timeout=1800, max_total_tokens=1000000):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.idle_timeout = idle_timeout
+        self.max_total_tokens = max_total_tokens
+        self.total_tokens = 0
+        self._users = OrderedDict()  # user_id -> [last_active, tokens, deque of (user_input, response, tokens)]
+
+    @staticmethod
+    def count_tokens(text):
+        return len(text.split())
+
+    def history(self, user_id):
+        """
+        Get the remembered turns for a user.
+
+        Parameters:
+            user_id (int): The Discord user ID.
+
+        Returns:
+            tuple[list[str], list[str]]: The user's past inputs and the bot's matching responses, oldest first.
+        """
+        self.evict_idle()
+        conversation = self._users.get(user_id)
+        if conversation is None:
+            return [], []
+
+        turns = conversation[2]
+        return [turn[0] for turn in turns], [turn[1] for turn in turns]
+
+    def add_turn(self, user_id, user_input, response):
+        """
+        Remember one exchange, then enforce the per-user budget and the global memory cap.
+        """
+        conversation = self._users.get(user_id)
+        if conversation is None:
+            conversation = [0.0, 0, deque()]
+            self._users[user_id] = conversation
+
+        conversation[0] = time.time()
+        self._users.move_to_end(user_id)
+
+        tokens = self.count_tokens(user_input) + self.count_tokens(response)
+        turns = conversation[2]
+        turns.append((user_input, response, tokens))
+        conversation[1] += tokens
+        self.total_tokens += tokens
+
+        # Drop the oldest turns until the user fits both the ring size and the token budget
+        while turns and (len(turns) > self.max_turns or conversation[1] > self.token_budget):
+            dropped = turns.popleft()
+            conversation[1] -= dropped[2]
+            self.total_tokens -= dropped[2]
+
+        # Forget the least recently active users until everyone fits under the global cap
+        while self.total_tokens > self.max_total_tokens and self._users:
+            self._drop(next(iter(self._users)))
+
+    def reset(self, user_id):
+        """
+        Forget a user's conversation.
+        """
+        if user_id in self._users:
+            self._drop(user_id)
+
+    def evict_idle(self):
+        """
+        Forget every conversation that has been idle for longer than `idle_timeout`.
+        """
+        cutoff = time.time() - self.idle_timeout
+        while self._users:
+            user_id, conversation = next(iter(self._users.items()))
+            if conversation[0] >= cutoff:
+                break
+            self._drop(user_id)
+
+    def _drop(self, user_id):
+        conversation = self._users.pop(user_id)
+        self.total_tokens -= conversation[1]
+
+    def __len__(self):
+        return len(self._users)
@@ -1,173 +1,197 @@
 import os
+import asyncio
 import logging
-from sqlalchemy import create_engine, MetaData
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import OperationalError
 from renachan.managers.models import Base, Server, Owner, Member, Channel, Finder, Session, ToDo, i_like, i_might
+from renachan.managers.storage import get_storage_backend
+from renachan.managers.migrations import upgrade_schema, LATEST_VERSION
 
+import renachan
 
-def initialize_database(logger):
+
+def create_db_engine(backend):
     """
-    Initialize the SQLite database for the bot.
+    Create a pooled SQLAlchemy engine for a storage backend.
+
+    Parameters:
+        backend (StorageBackend): The backend to connect to (see renachan.managers.storage).
 
     Returns:
-        session (sqlalchemy.orm.Session): A session object that can be used to interact with the database.
-
-    This function sets up and initializes the SQLite database for the bot. It performs the following steps:
-    1. Constructs the path to the 'dev.db' file inside the 'renachan' directory.
-    2. Creates a new SQLAlchemy engine connected to the 'dev.db' file.
-    3. Creates a session factory using the engine, allowing the bot to create new session instances for database operations.
-    4. Initializes a session instance, which effectively opens a connection to the database (if the file exists) or creates a new database file if it doesn't exist.
-    5. Uses reflection to gather schema information from the database engine and populate the metadata object with Table objects representing each table in the database.
-    6. Checks if all the expected tables exist in the database. If they do, the function returns the existing session object.
-    7. If any expected tables are missing or the database file doesn't exist, the function creates the necessary tables using the metadata associated with the model classes.
-    8. Logs the initialization status and returns the new session object connected to the database.
+        sqlalchemy.engine.Engine: An engine with a connection pool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT.
 
     Note:
-        - The function expects the SQLAlchemy model classes (Base, Server, Owner, etc.) to be defined and imported from 'renachan.managers.models'.
-        - The function relies on the 'os' module to handle file path operations and the 'logging' module to log messages.
-        - The 'create_engine' function is used to create a new SQLAlchemy engine connected to the 'dev.db' file using a SQLite dialect.
-        - The 'sessionmaker' is a factory class provided by SQLAlchemy to generate new session objects bound to the database engine.
-        - The 'metadata.reflect()' method is used for reflection, dynamically gathering schema information from the database.
-        - The 'Base.metadata.create_all(engine)' method creates necessary database tables based on model definitions if missing.
+        - The backend adds its own engine options and configures every new raw connection through its on_connect().
     """
-    # Get the base directory path of the current file (database.py)
-
+    options = {
+        'poolclass': QueuePool,
+        'pool_size': renachan.config.db_pool_size(),
+        'max_overflow': renachan.config.db_max_overflow(),
+        'pool_timeout': renachan.config.db_pool_timeout(),
+        'pool_pre_ping': True,
+    }
+    options.update(backend.engine_options())
 
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    engine = create_engine(backend.database_url(), **options)
 
+    @event.listens_for(engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        backend.on_connect(dbapi_connection)
 
-    # Construct the path to the dev.db file inside the renachan directory
+    return engine
 
 
-    db_file = "dev.db"
-    db_path = os.path.join(base_dir, db_file)
-
-
-    # Create a session to return to the bot
-    # SQLAlchemy
-        ### SQLAlchemy is an Object-Relational Mapping (ORM) library for Python, which allows you to interact with databases using Python objects instead of writing raw SQL queries.
-        ### Since we are using a SQLite engine for testing, this means we'll be connecting to an SQLite database.
-        ### SQLite is a lightweight, file-based database system that doesn't require a separate server; it's often used for smaller applications or prototyping.
-
-    ## create_engine() - This function is used to create a new SQLAlchemy engine. It takes a URL-like string as its argument, specifying the database connection details.
-    ## "sqlite:///" - The URL-like string used here is a SQLite database connection URL. The sqlite:// part indicates that you want to use the SQLite dialect (driver) for the database engine.
-    ## "/{db_path}" - The {db_path} is a placeholder representing the path to the SQLite database file. It is provided using Python's string formatting with an "f-string" (formatted string literal) where the f prefix allows you to include expressions inside curly braces {}.
-
-    ### So, when create_engine() is called with the formatted URL, it creates an engine connected to the dev.db file, allowing you to interact with the SQLite database through SQLAlchemy's API.
-
-
-    engine = create_engine(f"sqlite:///{db_path}")
-
-
-    # sessionmaker
-    ## The sessionmaker is a factory class provided by SQLAlchemy.
-        ## Factory classes is a class that is responsible for creating objects of another class or a group of related classes.
-        ## It is a creational design pattern that helps encapsulate the object creation process and provides a centralized place for creating instances.
-
-    # bind=engine
-    ## The bind parameter in the sessionmaker constructor allows you to specify the database engine to which the session objects should be bound.
-    ## In this case, we are binding the sessions to the engine you created earlier using create_engine().
-    ## It means that any operations performed with this session will be executed on the database connected through the specified engine.
-
-    # Session = sessionmaker(bind=engine)
-    ## It is used to generate new session objects that will be bound to a specific database engine (engine).
-    ## When you call sessionmaker(bind=engine), you are creating a session factory that knows how to create sessions associated with the specified database engine.
-    ## Since this is coming from a factory class this is not exactly making the instance of the class but rather creating the class itself.
+class Database:
+    """
+    The bot's data access layer: a session factory plus helpers to run database work off the event loop.
 
+    Parameters:
+        engine (sqlalchemy.engine.Engine): The pooled engine created by create_db_engine().
 
-    Session = sessionmaker(bind=engine)
+    Explanation:
+    A single long-lived session shared by every handler is unsafe as soon as two handlers overlap, and running
+    queries directly inside a coroutine blocks the event loop while the disk is busy. Instead:
 
+    - `session_scope()` opens a fresh session for one unit of work (a command or an event), commits it when the block
+      succeeds, rolls it back when it fails and always closes it.
+    - `run(fn, *args)` calls `fn(session, *args)` inside such a unit of work on a dedicated thread pool and awaits the result,
+      so coroutines never block on the database.
+    - `run_sync(fn, *args)` runs any other blocking database function (one that manages its own sessions) on the same pool.
 
-    # Session()
-    ## This line creates a new session instance using the Session class we defined earlier.
-    ## It effectively opens a connection to the database (if it's not already open) and provides you with a session object through which you can perform database operations.
-    ## Since we have recieved the Session class from the line before we can now create an instance of the Session class here, which is what we will use to to work with the database.
-    ## If the dev.db file already exists at the specified path, the engine will connect to it.
-    ## If the file doesn't exist, SQLAlchemy will create it at that location. So, at this step, the dev.db file is created if it doesn't already exist.
+    SQLAlchemy 1.4's asyncio extension needs an async driver (e.g. aiosqlite), which is not one of this bot's
+    dependencies, so the sync engine is driven from worker threads. The thread pool is the same size as the connection
+    pool so threads never queue up waiting for a connection.
 
+    Example usage:
+        def count_trackers(session, member_id):
+            return session.query(models.Tracker).filter_by(member_id=member_id).count()
 
-    session = Session()
+        total = await bot.db.run(count_trackers, ctx.author.id)
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False)
+        workers = renachan.config.db_pool_size() + renachan.config.db_max_overflow()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="renachan-db")
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Provide a session for one unit of work, committing on success and rolling back on error.
+        """
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _run_in_session(self, fn, args):
+        with self.session_scope() as session:
+            return fn(session, *args)
+
+    async def run(self, fn, *args):
+        """
+        Run fn(session, *args) in its own unit of work on the database thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run_in_session, fn, args)
+
+    async def run_sync(self, fn, *args):
+        """
+        Run a blocking function on the database thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def close(self):
+        """
+        Shutdown hook: wait for running database work, then close every pooled connection.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.engine.dispose()
 
 
-    try:
-        # MetaData
-        ## MetaData is a class in SQLAlchemy that represents a collection of database schema information.
-        ## It acts as a container to hold metadata about the structure of a database, including tables, columns, and other database constructs.
+def initialize_database(logger):
+    """
+    Initialize the database for the bot.
 
-        # Check if all tables and columns are correct
-        # MetaData(bind=engine)
-        ## This creates a new MetaData instance and binds it to a specific database engine (engine).
-        ## By binding MetaData to the engine, SQLAlchemy knows which database engine to use when it needs to retrieve the database schema information.
+    Returns:
+        database (Database): The data access layer, holding the pooled engine and the session factory.
+        None if STORAGE_TYPE names a database the bot doesn't support or the database can't be reached.
+
+    This function sets up and initializes the database for the bot. It performs the following steps:
+    1. Picks the storage backend named by STORAGE_TYPE: a 'dev.db' SQLite file inside the 'renachan' directory, or a MySQL/MariaDB server.
+    2. Creates a new pooled SQLAlchemy engine for that backend (for SQLite: with WAL mode and the other SQLITE_PRAGMAS).
+    3. Wraps the engine in a Database, which holds the session factory the bot uses to open one session per unit of work.
+    4. Reads the schema version stored in the database. If it is the latest one, the function returns the Database right away.
+    5. If the database is brand new, the function creates every table using the metadata associated with the model classes.
+    6. If the database is at an older version, the function applies the missing migrations in order.
+    7. Logs the initialization status and returns the Database.
 
+    Note:
+        - The function expects the SQLAlchemy model classes (Base, Server, Owner, etc.) to be defined and imported from 'renachan.managers.models'.
+        - The function relies on the 'os' module to handle file path operations and the 'logging' module to log messages.
+        - The 'create_engine' function is used to create a new SQLAlchemy engine from the URL given by the storage backend (renachan.managers.storage).
+        - The 'sessionmaker' is a factory class provided by SQLAlchemy to generate new session objects bound to the database engine.
+        - Schema versions and migrations live in 'renachan.managers.migrations'; 'Base.metadata.create_all()' is only used for brand new databases.
+    """
+    # Pick the storage backend (SQLite file or MySQL/MariaDB server) named by STORAGE_TYPE
 
-        metadata = MetaData(bind=engine)
 
+    backend = get_storage_backend(renachan.config.storage_type())
+    if backend is None:
+        logger.error(f"Unsupported storage type '{renachan.config.storage_type()}'")
+        return None
 
-        # metadata.reflect()
-        ## When this function is called SQLAlchemy retrieves the schema information from the database engine (engine) to populate the metadata object with Table objects representing each table in the database.
-        ## Each Table object contains information about its columns, constraints, and other metadata.
 
-        # Why use reflection?
-        ## Reflection is particularly useful when you want to work with an existing database without having to manually define SQLAlchemy models for each table.
-        ## By reflecting the schema, you can dynamically interact with the database using the metadata object and perform queries without writing explicit model definitions.
-        ## The process of reflection gathers information from the database and populates the metadata object with Table objects, making it a valuable tool for dynamically interacting with the database without explicitly defining model classes.
+    # Create a session to return to the bot
+    # SQLAlchemy
+        ### SQLAlchemy is an Object-Relational Mapping (ORM) library for Python, which allows you to interact with databases using Python objects instead of writing raw SQL queries.
+        ### Since we are using a SQLite engine for testing, this means we'll be connecting to an SQLite database.
+        ### SQLite is a lightweight, file-based database system that doesn't require a separate server; it's often used for smaller applications or prototyping.
 
+    ## create_engine() - This function is used to create a new SQLAlchemy engine. It takes a URL-like string as its argument, specifying the database connection details.
+    ## "sqlite:///" - The URL-like string used here is a SQLite database connection URL. The sqlite:// part indicates that you want to use the SQLite dialect (driver) for the database engine.
+    ## "/{db_path}" - The {db_path} is a placeholder representing the path to the SQLite database file. It is provided using Python's string formatting with an "f-string" (formatted string literal) where the f prefix allows you to include expressions inside curly braces {}.
 
-        metadata.reflect()
+    ### So, when create_engine() is called with the formatted URL, it creates an engine connected to the dev.db file, allowing you to interact with the SQLite database through SQLAlchemy's API.
+    ### create_db_engine() asks the storage backend for that URL, so the same code also connects to a MySQL/MariaDB server.
 
 
-        # List of table names that should be present in the database
+    engine = create_db_engine(backend)
 
 
-        expected_tables = [
-        'servers',
-        'owners',
-        'members',
-        'channels',
-        'finders',
-        'sessions',
-        'to_dos',
-        'trackers',
-        'member_server_association',
-        'i_like',
-        'i_might_like',
-        'bot_commands'
-        ]
+    # Database(engine)
+    ## Database wraps a sessionmaker bound to the engine.
+    ## The sessionmaker is a factory class provided by SQLAlchemy: it knows how to create new session objects bound to the engine.
+    ## Instead of one session shared by every handler, the bot opens a short-lived session for every command or event
+    ## (a "unit of work") through Database.session_scope() or Database.run(), and closes it again when the work is done.
 
 
+    database = Database(engine)
 
-        # Check if all expected tables exist in the database
 
-        missing_tables = set(expected_tables) - set(metadata.tables.keys())
-        if not missing_tables and os.path.exists(db_path):
+    try:
+        # upgrade_schema(engine, logger)
+        ## The database remembers which version of the schema it is at in the 'schema_version' table.
+        ## If that version matches the newest migration there is nothing else to do, so a normal start costs one small query
+        ## instead of reflecting every table in the database.
+        ## A brand new database gets every table from the model classes (Base.metadata.create_all), and an older database
+        ## gets each migration it is missing applied in order (see renachan.managers.migrations).
 
-            # All expected tables are present, no need to recreate them
 
+        previous_version = upgrade_schema(engine, logger)
+        if previous_version == LATEST_VERSION:
             logger.info("Database found and ready to use")
-            return session
-        else:
-            # Base
-            ## This is the base class that serves as the parent for all your SQLAlchemy model classes.
-            ## It is typically created using the declarative_base() function from SQLAlchemy. When you define your model classes, you should make them subclasses of Base.
-            ## This allows SQLAlchemy to track your model classes and their associated database tables.
-
-            # Base.metadata
-            ## This is an attribute of the Base class that holds the metadata associated with your models.
-            ## It includes information about all the tables, columns, and other database constructs defined in your model classes.
-
-            # create_all(engine)
-            ## This is a method is a convenience method provided by SQLAlchemy's MetaData object to create the database tables based on the model definitions.
-            ## It takes an engine as its argument and uses that engine to execute the SQL commands necessary to create the tables in the connected database.
-            # Some tables are missing, create them
-
-            # Conclusion
-            ## SQLAlchemy will use the metadata associated with your model classes (Base.metadata) to create the necessary tables in the SQLite database represented by the engine.
-
-
-            Base.metadata.create_all(engine) # engine = dev.dv
-            logger.info("Database is missing... creating tables as needed")
-            return session # session = connection to the database
+        return database # database = session factory for the database engine
 
     except OperationalError as e:
         logger.error(f"Error while initializing the database: {e}")
@@ -176,4 +200,4 @@ def initialize_database(logger):
 
 # Example usage:
 if __name__ == "__main__":
-    session = initialize_database()
+    database = initialize_database(logging.getLogger(__name__))
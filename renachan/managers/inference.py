@@ -0,0 +1,392 @@
+import json
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+
+class InferenceBackend:
+    """
+    Interface every inference backend implements.
+
+    Explanation:
+    `ai_chat` and the `InferenceBatcher` only talk to the model through these methods, so the bot can switch between
+    the hosted Hugging Face API (`InferenceClient`) and a model running on this machine (`LocalBackend`) with the
+    `INFERENCE_BACKEND` setting and nothing else changes.
+
+    Methods:
+        - query(payload): Answer a single payload shaped like {'inputs': {'text': ..., 'past_user_inputs': [...], ...}}.
+        - query_batch(payloads): Answer several payloads, returning one response per payload in order.
+        - warm_up(): Get the backend ready to answer quickly. Called once at startup.
+        - close(): Release whatever the backend holds (sessions, worker processes).
+        - queue_depth: Number of requests currently waiting on or being processed by the backend.
+    """
+    def __init__(self):
+        self._in_flight = 0
+
+    @property
+    def queue_depth(self):
+        return self._in_flight
+
+    async def query(self, payload):
+        raise NotImplementedError
+
+    async def query_batch(self, payloads):
+        return await asyncio.gather(*(self.query(payload) for payload in payloads))
+
+    async def warm_up(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InferenceClient(InferenceBackend):
+    """
+    Non-blocking client for the Hugging Face model API.
+
+    Parameters:
+        api_endpoint (str): The full URL of the model endpoint (api_url + model name).
+        token (str): The Hugging Face API token sent as a bearer token.
+        timeout (float): Number of seconds a single request may take before it is abandoned.
+        max_concurrency (int): Maximum number of requests allowed in flight at the same time.
+
+    Explanation:
+    A blocking HTTP call (e.g. `requests.request('POST', ...)`) would stall the whole event loop while Hugging Face
+    thinks about its answer. While that happens discord.py cannot send heartbeats, run commands or handle guild joins.
+
+    This client keeps a single pooled `aiohttp.ClientSession` for the lifetime of the bot, so connections to the API
+    are reused instead of being opened for every DM. Every request gets its own timeout, and an `asyncio.Semaphore`
+    bounds how many requests are in flight so a burst of DMs can't open hundreds of sockets at once.
+
+    Note:
+        - The session and the semaphore are created lazily on the first request, because they must be created inside the
+          running event loop (the client itself is built before bot.run() starts it).
+        - Call `close()` when the bot shuts down so the connector is released cleanly.
+
+    Example usage:
+        client = InferenceClient(endpoint, token, timeout=30, max_concurrency=4)
+        response = await client.query({'inputs': {'text': 'hello rena'}})
+        await client.close()
+    """
+    def __init__(self, api_endpoint, token, timeout=30, max_concurrency=4):
+        super().__init__()
+        self.api_endpoint = api_endpoint
+        self.headers = {
+            'Authorization': 'Bearer {}'.format(token),
+            'Content-Type': 'application/json'
+        }
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._session = None
+        # Flipped off the first time the endpoint successfully answers a batched request with something we can't split up
+        self.supports_batching = True
+
+    def _get_session(self):
+        # Reuse the pooled session, (re)creating it if it was never opened or has been closed
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+        return self._session
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def query(self, payload):
+        """
+        Send a payload to the model API without blocking the event loop.
+
+        Parameters:
+            payload (dict): The JSON payload to send, e.g. {'inputs': {'text': message.content}}.
+
+        Returns:
+            dict: The decoded JSON response, or a dict with an 'error' key if the request failed or timed out.
+        """
+        _, response = await self._post(payload)
+        return response
+
+    async def _post(self, payload):
+        # Returns (HTTP status, decoded response); the status is 0 when no response arrived
+        session = self._get_session()
+        self._in_flight += 1
+        try:
+            async with self._get_semaphore():
+                async with session.post(self.api_endpoint, data=json.dumps(payload), timeout=self.timeout) as response:
+                    status = response.status
+                    body = await response.text()
+        except asyncio.TimeoutError:
+            return 0, {'error': 'Model took too long to respond'}
+        except aiohttp.ClientError as e:
+            logging.error(f"Inference request failed: {e}")
+            return 0, {'error': str(e)}
+        finally:
+            self._in_flight -= 1
+
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, {'error': 'Model returned an invalid response'}
+
+    async def query_batch(self, payloads):
+        """
+        Send several payloads to the model API as one batched request.
+
+        Parameters:
+            payloads (list[dict]): The payloads to send, each shaped like the ones accepted by `query()`.
+
+        Returns:
+            list[dict]: One response per payload, in the same order as `payloads`.
+
+        Explanation:
+        The inputs of every payload are combined into a single `{'inputs': [...]}` request. If the endpoint answers with
+        a list of the same length, each entry is handed back to its payload. If it successfully answers with anything
+        else (not every hosted pipeline accepts list inputs), batching is switched off for this client and the payloads
+        are sent individually and concurrently instead, still bounded by the semaphore.
+
+        A failed batch (a timeout, a 503 while the model is loading, any other error) says nothing about list inputs:
+        its error is handed to every payload, the same as if each had been sent alone, and batching stays on.
+        """
+        if len(payloads) == 1:
+            return [await self.query(payloads[0])]
+
+        if self.supports_batching:
+            status, response = await self._post({'inputs': [payload['inputs'] for payload in payloads]})
+            if isinstance(response, list) and len(response) == len(payloads):
+                return response
+            if not 200 <= status < 300:
+                return [response] * len(payloads)
+            logging.info("Inference endpoint does not accept batched inputs, sending requests individually")
+            self.supports_batching = False
+
+        return await asyncio.gather(*(self.query(payload) for payload in payloads))
+
+    async def close(self):
+        """
+        Close the pooled session. Safe to call more than once.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# The model and tokenizer loaded inside each LocalBackend worker process
+_local_model = None
+_local_tokenizer = None
+
+
+def _load_local_model(model_path):
+    """
+    Worker process initializer: load the model once per process so every later request reuses it.
+    """
+    global _local_model, _local_tokenizer
+    try:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+    except ImportError:
+        # Leave the model unset; _generate_local reports the error for every request instead of crashing the pool
+        return
+
+    _local_tokenizer = AutoTokenizer.from_pretrained(model_path)
+    _local_model = AutoModelForCausalLM.from_pretrained(model_path)
+    _local_model.eval()
+
+
+def _generate_local(inputs, max_length):
+    """
+    Run one DialoGPT generation inside a worker process.
+
+    DialoGPT expects the whole conversation as one sequence of turns separated by the end-of-sequence token,
+    so past inputs and responses are interleaved before the new text.
+    """
+    if _local_model is None:
+        return {'error': 'Local inference needs the transformers and torch packages installed'}
+
+    eos = _local_tokenizer.eos_token
+    turns = []
+    for user_input, response in zip(inputs.get('past_user_inputs', []), inputs.get('generated_responses', [])):
+        turns.extend([user_input, response])
+    turns.append(inputs['text'])
+
+    input_ids = _local_tokenizer.encode(eos.join(turns) + eos, return_tensors='pt')
+    output_ids = _local_model.generate(input_ids,
+                                       max_length=input_ids.shape[-1] + max_length,
+                                       pad_token_id=_local_tokenizer.eos_token_id)
+    generated_text = _local_tokenizer.decode(output_ids[0, input_ids.shape[-1]:], skip_special_tokens=True)
+    return {'generated_text': generated_text}
+
+
+class LocalBackend(InferenceBackend):
+    """
+    Runs the chat model on this machine in a pool of worker processes.
+
+    Parameters:
+        model_path (str): A Hugging Face model id or a local directory containing the model.
+        workers (int): Number of worker processes. Each one holds its own copy of the model in memory.
+        max_length (int): Maximum number of new tokens generated per reply.
+
+    Explanation:
+    Generating text on the CPU takes hundreds of milliseconds to seconds and holds the GIL while it does, so it can't
+    run on the event loop or even in a thread without stalling the bot. Every request is instead sent to a
+    `ProcessPoolExecutor`, and the coroutine simply awaits the result. Each worker loads the model once in its
+    initializer and reuses it for every request it handles.
+
+    This removes the network round-trip and the hosted API's cold starts, at the cost of the memory for one model
+    per worker.
+
+    Note:
+        - The pool uses the 'spawn' start method so workers don't inherit the bot's event loop or open sockets.
+        - `transformers` and `torch` are optional dependencies; without them every request returns an 'error' response.
+        - `warm_up()` sends one small request per worker so the model is loaded before the first DM arrives.
+    """
+    def __init__(self, model_path, workers=1, max_length=100):
+        super().__init__()
+        self.model_path = model_path
+        self.workers = workers
+        self.max_length = max_length
+        self._executor = ProcessPoolExecutor(max_workers=workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_load_local_model,
+                                             initargs=(model_path,))
+
+    async def query(self, payload):
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._executor, _generate_local, payload['inputs'], self.max_length)
+        except Exception as e:
+            logging.error(f"Local inference failed: {e}")
+            return {'error': str(e)}
+        finally:
+            self._in_flight -= 1
+
+    async def warm_up(self):
+        # Submitting one request per worker makes the pool start every process and load the model in each of them
+        responses = await self.query_batch([{'inputs': {'text': 'hello'}}] * self.workers)
+        errors = [response['error'] for response in responses if 'error' in response]
+        if errors:
+            logging.error(f"Local model {self.model_path} failed to warm up: {errors[0]}")
+        else:
+            logging.info(f"Local model {self.model_path} is warmed up on {self.workers} worker(s)")
+
+    async def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_backend(backend_type):
+    """
+    Build the inference backend selected by the INFERENCE_BACKEND setting.
+
+    Parameters:
+        backend_type (str): "http" for the hosted Hugging Face API or "local" for the in-process worker pool.
+
+    Returns:
+        InferenceBackend: The configured backend.
+    """
+    import renachan
+
+    if backend_type == "local":
+        return LocalBackend(renachan.config.local_model_path(),
+                            workers=renachan.config.inference_workers())
+    if backend_type != "http":
+        logging.error(f"Unknown inference backend '{backend_type}', falling back to the Hugging Face API")
+
+    return InferenceClient((renachan.config.api_url() or "") + renachan.config.get_model(),
+                           renachan.config.get_huggingface(),
+                           timeout=renachan.config.inference_timeout(),
+                           max_concurrency=renachan.config.inference_concurrency())
+
+
+class InferenceBatcher:
+    """
+    Collects model prompts over a short window and sends them to the model API together.
+
+    Parameters:
+        client (InferenceClient): The client used to send the batched requests.
+        window (float): Number of seconds to wait for more prompts after the first one arrives.
+        max_batch_size (int): A batch is sent right away once it reaches this many distinct prompts.
+
+    Explanation:
+    When many users DM the bot at the same time, sending one HTTP POST per message wastes request overhead and
+    eats into the Hugging Face rate limit. `submit()` instead parks each payload in a queue and returns a future.
+    The first payload starts a short timer; when it fires (or the batch is full) every queued payload is sent as one
+    batched request and each future gets its own answer back, so every reply still goes to the right `message.channel`.
+
+    Identical payloads are coalesced: while a payload is queued or in flight, anyone submitting the same payload
+    waits on the same future instead of sending another request.
+
+    Example usage:
+        batcher = InferenceBatcher(client, window=0.05, max_batch_size=8)
+        response = await batcher.submit({'inputs': {'text': message.content}})
+    """
+    def __init__(self, client, window=0.05, max_batch_size=8):
+        self.client = client
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue = []        # [(key, payload)] waiting for the next flush
+        self._pending = {}      # key -> future, for payloads that are queued or in flight
+        self._flush_handle = None
+        self._tasks = set()     # strong references to running batch requests
+
+    async def submit(self, payload):
+        """
+        Queue a payload for the next batch and wait for its response.
+
+        Parameters:
+            payload (dict): The JSON payload to send to the model.
+
+        Returns:
+            dict: The model's response for this payload.
+        """
+        key = json.dumps(payload, sort_keys=True)
+        future = self._pending.get(key)
+
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            self._queue.append((key, payload))
+
+            if len(self._queue) >= self.max_batch_size or self.window <= 0:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self._flush)
+
+        # Shield the shared future so one cancelled caller doesn't cancel the answer for everyone else waiting on it
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._queue = self._queue, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        try:
+            responses = await self.client.query_batch([payload for _, payload in batch])
+        except Exception as e:
+            logging.error(f"Batched inference request failed: {e}")
+            responses = [{'error': str(e)}] * len(batch)
+
+        for (key, _), response in zip(batch, responses):
+            future = self._pending.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+    async def close(self):
+        """
+        Send whatever is still queued and wait for every in-flight batch to finish.
+        """
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
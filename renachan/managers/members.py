@@ -0,0 +1,107 @@
+class MemberIndex:
+    """
+    In-memory index of the members of every guild the bot is in, by username.
+
+    Explanation:
+    `!rena harass` looks its target up by username. Searching `guild.members` of every guild is a scan over every
+    member the bot can see, on every call. This index maps each username to the members that carry it, so a lookup is
+    a single dictionary access however many guilds the bot is in.
+
+    The index is built from the discord.py member cache once the bot is ready (rebuild()), then kept current by the
+    member events (see renachan.events):
+
+    - on_member_join / on_member_remove add and remove one member,
+    - on_user_update moves a user to their new username in every guild,
+    - on_member_update re-files a member whose username changed (the member objects are shared with the cache,
+      so the old name is taken from `before`),
+    - on_guild_join / on_guild_remove add and remove a whole guild.
+
+    A username is shared by one member object per guild the user is in: entries are keyed by (guild id, user id).
+
+    Example usage:
+        bot.member_index = MemberIndex()
+        bot.member_index.rebuild(bot.guilds)
+        member = bot.member_index.get("JohnDoe")
+    """
+    def __init__(self):
+        self._by_name = {}  # username -> {(guild_id, user_id): discord.Member}
+
+    def __len__(self):
+        return sum(len(members) for members in self._by_name.values())
+
+    def rebuild(self, guilds):
+        """
+        Index every cached member of `guilds` from scratch.
+        """
+        self._by_name = {}
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def add(self, member, name=None):
+        """
+        Index one member, under `name` if given (otherwise its current username).
+        """
+        self._by_name.setdefault(name or member.name, {})[(member.guild.id, member.id)] = member
+
+    def remove(self, member, name=None):
+        """
+        Drop one member from the index, looking it up under `name` if given (otherwise its current username).
+        """
+        name = name or member.name
+        members = self._by_name.get(name)
+        if not members:
+            return
+        members.pop((member.guild.id, member.id), None)
+        if not members:
+            del self._by_name[name]
+
+    def rename(self, before, after):
+        """
+        Re-file a member under its new username. Does nothing if the username didn't change.
+        """
+        if before.name != after.name:
+            self.remove(after, before.name)
+            self.add(after)
+
+    def rename_user(self, before, after):
+        """
+        Re-file every member of a user (one per shared guild) under the user's new username.
+        """
+        if before.name == after.name:
+            return
+        members = self._by_name.get(before.name, {})
+        for key in [key for key in members if key[1] == after.id]:
+            member = members.pop(key)
+            self._by_name.setdefault(after.name, {})[key] = member
+        if not members:
+            self._by_name.pop(before.name, None)
+
+    def add_guild(self, guild):
+        for member in guild.members:
+            self.add(member)
+
+    def remove_guild(self, guild):
+        for name in list(self._by_name):
+            members = self._by_name[name]
+            for key in [key for key in members if key[0] == guild.id]:
+                del members[key]
+            if not members:
+                del self._by_name[name]
+
+    def find(self, name):
+        """
+        Every indexed member with a username, one per guild the user shares with the bot.
+
+        Returns:
+            list[discord.Member]: The members, possibly empty.
+        """
+        return list(self._by_name.get(name, {}).values())
+
+    def get(self, name):
+        """
+        A member with a username, or None if no guild of the bot has one.
+        """
+        members = self._by_name.get(name)
+        if not members:
+            return None
+        return next(iter(members.values()))
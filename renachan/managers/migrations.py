@@ -0,0 +1,246 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text, select, MetaData, Table, Column, DateTime, String, ForeignKey
+
+from renachan.managers.models import Base, Member, DiscordID, NAME_LENGTH, schema_version
+
+
+def delete_duplicates(connection, table, key_columns, id_column):
+    """
+    Delete duplicate rows, keeping the oldest row (lowest id) for every key.
+
+    Note:
+        - The inner SELECT is wrapped in a derived table because MySQL refuses to delete from a table
+          it is selecting from in the same statement.
+    """
+    keys = ", ".join(key_columns)
+    connection.execute(text(
+        f"DELETE FROM {table} WHERE {id_column} NOT IN ("
+        f"SELECT keep_id FROM (SELECT MIN({id_column}) AS keep_id FROM {table} GROUP BY {keys}) AS keep)"
+    ))
+
+
+def create_missing_indexes(connection, table_name, indexes):
+    """
+    Create the indexes a table doesn't have yet.
+
+    Parameters:
+        connection (sqlalchemy.engine.Connection): A connection inside a transaction.
+        table_name (str): The table the indexes belong to.
+        indexes (list[tuple[str, list[str], bool]]): (name, columns, unique) for every index.
+    """
+    existing = {index['name'] for index in inspect(connection).get_indexes(table_name)}
+    for name, columns, unique in indexes:
+        if name not in existing:
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            connection.execute(text(f"CREATE {kind} {name} ON {table_name} ({', '.join(columns)})"))
+
+
+def add_missing_columns(connection, table_name, columns):
+    """
+    Add the columns a table doesn't have yet.
+
+    Parameters:
+        connection (sqlalchemy.engine.Connection): A connection inside a transaction.
+        table_name (str): The table the columns belong to.
+        columns (list[sqlalchemy.Column]): The columns to add.
+
+    Note:
+        - New columns must be nullable (or have a server default), since existing rows get no value.
+    """
+    existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    for column in columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}"))
+
+
+def rebuild_member_server_association(connection):
+    """
+    Give member_server_association its (member_id, server_id) primary key.
+
+    Explanation:
+    Neither SQLite nor a portable ALTER TABLE can add a primary key to an existing table, so the table is rebuilt:
+    a copy with the keyed definition is created, every distinct (member_id, server_id) pair is copied over
+    (keeping the earliest created_at and latest updated_at of its duplicates), and the copy replaces the original.
+    Rows with a missing member_id or server_id can't be part of the key and are left behind.
+    """
+    new_name = "member_server_association_new"
+    # The table as of schema version 2, in a scratch MetaData (with the keys the foreign keys point at)
+    scratch = MetaData()
+    Table('members', scratch, Column('id', DiscordID, primary_key=True))
+    Table('servers', scratch, Column('id', DiscordID, primary_key=True))
+    new_table = Table(new_name, scratch,
+        Column('member_id', DiscordID, ForeignKey('members.id'), primary_key=True),
+        Column('server_id', DiscordID, ForeignKey('servers.id'), primary_key=True),
+        Column('created_at', DateTime, default=datetime.utcnow),
+        Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    )
+    # Its index is created on the final table once it has been renamed
+    new_table.create(connection)
+
+    connection.execute(text(
+        f"INSERT INTO {new_name} (member_id, server_id, created_at, updated_at) "
+        "SELECT member_id, server_id, MIN(created_at), MAX(updated_at) FROM member_server_association "
+        "WHERE member_id IS NOT NULL AND server_id IS NOT NULL GROUP BY member_id, server_id"
+    ))
+    connection.execute(text("DROP TABLE member_server_association"))
+    connection.execute(text(f"ALTER TABLE {new_name} RENAME TO member_server_association"))
+
+
+def add_lookup_indexes(connection):
+    """
+    Give the hot lookup paths their indexes and unique constraints.
+
+    Parameters:
+        connection (sqlalchemy.engine.Connection): A connection inside a transaction.
+
+    Explanation:
+    Databases created before the indexes were added to the models have none of them, and may already hold the
+    duplicates the new unique constraints forbid. For each hot lookup path this:
+
+    1. Removes duplicate trackers per (member_id, track_url) and duplicate LinkedIn URLs, keeping the oldest row.
+    2. Creates the unique indexes ix_trackers_member_id_track_url and ix_linkedin_urls_url.
+    3. Rebuilds member_server_association with its composite primary key, collapsing duplicate rows,
+       and creates ix_member_server_association_server_id.
+
+    Every step checks what is already there, so running it against an up-to-date database changes nothing.
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+
+    if 'trackers' in tables:
+        delete_duplicates(connection, 'trackers', ['member_id', 'track_url'], 'tracker_id')
+        create_missing_indexes(connection, 'trackers', [('ix_trackers_member_id_track_url', ['member_id', 'track_url'], True)])
+
+    if 'linkedin_urls' in tables:
+        delete_duplicates(connection, 'linkedin_urls', ['url'], 'id')
+        create_missing_indexes(connection, 'linkedin_urls', [('ix_linkedin_urls_url', ['url'], True)])
+
+    if 'member_server_association' in tables:
+        if not inspector.get_pk_constraint('member_server_association')['constrained_columns']:
+            rebuild_member_server_association(connection)
+        create_missing_indexes(connection, 'member_server_association',
+                               [('ix_member_server_association_server_id', ['server_id'], False)])
+
+
+def add_price_check_columns(connection):
+    """
+    Give trackers what the price checker needs: the selector the price was found with and an index on last_checked.
+
+    Trackers added before this migration have no selector, so the price checker leaves them alone.
+    """
+    if inspect(connection).has_table('trackers'):
+        add_missing_columns(connection, 'trackers', [
+            Column('selector_type', String(16)),
+            Column('selector', String(NAME_LENGTH)),
+            Column('currency_symbol', String(8)),
+        ])
+        create_missing_indexes(connection, 'trackers', [('ix_trackers_last_checked', ['last_checked'], False)])
+
+
+def add_page_validators(connection):
+    """
+    Give trackers the ETag, Last-Modified and content hash of the page at its last check.
+    """
+    if inspect(connection).has_table('trackers'):
+        add_missing_columns(connection, 'trackers', [
+            Column('etag', String(NAME_LENGTH)),
+            Column('last_modified', String(64)),
+            Column('content_hash', String(64)),
+        ])
+
+
+def initial_schema(connection):
+    """
+    Version 1: the tables as the bot created them before the schema was versioned.
+
+    Databases that reach this migration are either brand new (and get the current schema from create_all instead)
+    or were created before versioning, in which case their tables already exist. So there is nothing to do here;
+    the migration only marks where the history starts.
+    """
+
+
+# Every change to the schema after the initial tables, in order.
+# To change the schema: update the models, then append (next version, description, function) here.
+# The function receives a connection inside a transaction and must work on databases created by any older version.
+# It spells out the columns and indexes it adds rather than reading them from the models, which will have moved on.
+MIGRATIONS = [
+    (1, "Initial schema", initial_schema),
+    (2, "Lookup indexes and member_server_association primary key", add_lookup_indexes),
+    (3, "Tracker selectors and last_checked index", add_price_check_columns),
+    (4, "Tracker page validators", add_page_validators),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(connection):
+    """
+    Read the schema version, or None if the database has never been versioned.
+    """
+    if not inspect(connection).has_table(schema_version.name):
+        return None
+    return connection.execute(select(schema_version.c.version)).scalar()
+
+
+def set_schema_version(connection, version):
+    connection.execute(schema_version.delete())
+    connection.execute(schema_version.insert().values(version=version))
+
+
+def upgrade_schema(engine, logger):
+    """
+    Bring the database schema up to LATEST_VERSION.
+
+    Parameters:
+        engine (sqlalchemy.engine.Engine): The engine connected to the bot's database.
+        logger (logging.Logger): Where to log what was done.
+
+    Returns:
+        int: The schema version the database was at before the upgrade (0 for a brand new database).
+
+    Explanation:
+    The schema version lives in the single-row `schema_version` table. On a normal start the stored version already
+    equals LATEST_VERSION, so the whole check is one table lookup and one SELECT no matter how many tables the
+    schema grows to; nothing is reflected.
+
+    - A brand new database (no tables at all) gets the current schema straight from the models with
+      `Base.metadata.create_all` and is stamped with LATEST_VERSION, since there is nothing to migrate.
+    - A database created before versioning has tables but no `schema_version`. It counts as version 1: create_all
+      adds any tables it was missing (it never alters existing ones), then every later migration is applied.
+    - A versioned database applies each migration newer than its version, in order. Every migration runs in its own
+      transaction together with the version bump, so an interrupted upgrade resumes where it stopped.
+    """
+    with engine.begin() as connection:
+        version = get_schema_version(connection)
+
+        if version is None:
+            if inspect(connection).has_table(Member.__tablename__):
+                logger.info("Database predates schema versioning, upgrading it")
+                version = 1
+            else:
+                Base.metadata.create_all(connection)
+                set_schema_version(connection, LATEST_VERSION)
+                logger.info(f"Created a new database at schema version {LATEST_VERSION}")
+                return 0
+
+            Base.metadata.create_all(connection)
+            set_schema_version(connection, version)
+
+    if version == LATEST_VERSION:
+        return version
+
+    if version > LATEST_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this bot's ({LATEST_VERSION})")
+        return version
+
+    for migration_version, description, migrate in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        with engine.begin() as connection:
+            migrate(connection)
+            set_schema_version(connection, migration_version)
+        logger.info(f"Migrated database to schema version {migration_version}: {description}")
+
+    return version
@@ -1,11 +1,20 @@
 import os
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, DateTime, Table, Boolean, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Text, TIMESTAMP, ForeignKey, DateTime, Table, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
 Base = declarative_base()
 
+# Discord IDs (snowflakes) are 64-bit and don't fit in MySQL's 32-bit INT. SQLite's INTEGER is already 64-bit,
+# so SQLite keeps plain INTEGER columns (and existing dev.db files keep matching the models).
+DiscordID = BigInteger().with_variant(Integer(), "sqlite")
+
+# MySQL needs a length for every VARCHAR. URLs get a long one, but stay short enough to be indexed
+# (InnoDB index keys are limited to 3072 bytes, which is 768 characters in utf8mb4).
+NAME_LENGTH = 255
+URL_LENGTH = 700
+
 
 
 # Sure! ISO 8601 is an international standard for representing dates and times.
@@ -16,18 +25,21 @@ Base = declarative_base()
 
 
 
+# (member_id, server_id) is the primary key, so a member can only be associated with a server once,
+# and lookups by member use its index. Lookups by server get their own index.
 member_server_association = Table('member_server_association', Base.metadata,
-    Column('member_id', Integer, ForeignKey('members.id')),
-    Column('server_id', Integer, ForeignKey('servers.id')),
+    Column('member_id', DiscordID, ForeignKey('members.id'), primary_key=True),
+    Column('server_id', DiscordID, ForeignKey('servers.id'), primary_key=True),
     Column('created_at', DateTime, default=datetime.utcnow),
-    Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    Index('ix_member_server_association_server_id', 'server_id')
 )
 
 class Server(Base):
     __tablename__ = 'servers'
-    id = Column(Integer, primary_key=True)
-    owner_id = Column(Integer, ForeignKey("owners.id"))
-    server_name = Column(String)
+    id = Column(DiscordID, primary_key=True, autoincrement=False)
+    owner_id = Column(DiscordID, ForeignKey("owners.id"))
+    server_name = Column(String(NAME_LENGTH))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
@@ -51,8 +63,8 @@ class Server(Base):
 
 class Owner(Base):
     __tablename__ = 'owners'
-    id = Column(Integer, primary_key=True)
-    username = Column(Integer)
+    id = Column(DiscordID, primary_key=True, autoincrement=False)
+    username = Column(String(NAME_LENGTH))
     user_discriminator = Column(Integer)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -71,9 +83,9 @@ class Owner(Base):
 
 class Member(Base):
     __tablename__ = 'members'
-    id = Column(Integer, primary_key=True)
-    username = Column(Integer)
-    user_discriminator = Column(String)
+    id = Column(DiscordID, primary_key=True, autoincrement=False)
+    username = Column(String(NAME_LENGTH))
+    user_discriminator = Column(String(8))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
@@ -95,9 +107,9 @@ class Member(Base):
 
 class Channel(Base):
     __tablename__ = 'channels'
-    id = Column(Integer, primary_key=True)
-    server_id = Column(Integer, ForeignKey('servers.id'))
-    channel_name = Column(String)
+    id = Column(DiscordID, primary_key=True, autoincrement=False)
+    server_id = Column(DiscordID, ForeignKey('servers.id'))
+    channel_name = Column(String(NAME_LENGTH))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
@@ -116,10 +128,10 @@ class Channel(Base):
 class Finder(Base):
     __tablename__ = 'finders'
     finder_id = Column(Integer, primary_key=True)
-    server_id = Column(Integer, ForeignKey('servers.id'))
-    member_id = Column(Integer, ForeignKey('members.id'))
+    server_id = Column(DiscordID, ForeignKey('servers.id'))
+    member_id = Column(DiscordID, ForeignKey('members.id'))
     date = Column(DateTime, nullable=False, default=datetime.utcnow)
-    chosen_url = Column(String)
+    chosen_url = Column(String(URL_LENGTH))
     last_time = Column(DateTime, nullable=False, default=datetime.utcnow)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -143,8 +155,8 @@ class Finder(Base):
 class Session(Base):
     __tablename__ = 'sessions'
     session_id = Column(Integer, primary_key=True)
-    server_id = Column(Integer, ForeignKey('servers.id'))
-    member_id = Column(Integer, ForeignKey('members.id'))
+    server_id = Column(DiscordID, ForeignKey('servers.id'))
+    member_id = Column(DiscordID, ForeignKey('members.id'))
     date = Column(DateTime, nullable=False, default=datetime.utcnow)
     duration = Column(Integer)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -168,9 +180,9 @@ class Session(Base):
 class ToDo(Base):
     __tablename__ = 'to_dos'
     todo_id = Column(Integer, primary_key=True)
-    server_id = Column(Integer, ForeignKey('servers.id'))
-    member_id = Column(Integer, ForeignKey('members.id'))
-    to_do = Column(String)
+    server_id = Column(DiscordID, ForeignKey('servers.id'))
+    member_id = Column(DiscordID, ForeignKey('members.id'))
+    to_do = Column(String(NAME_LENGTH))
     due = Column(DateTime)
     date = Column(DateTime, nullable=False, default=datetime.utcnow)
     duration = Column(DateTime)
@@ -196,14 +208,28 @@ class ToDo(Base):
 
 class Tracker(Base):
     __tablename__ = 'trackers'
+    # add_tracker looks trackers up by (member_id, track_url), and a member tracks each URL only once.
+    # The price checker picks the trackers that are due by last_checked.
+    __table_args__ = (
+        Index('ix_trackers_member_id_track_url', 'member_id', 'track_url', unique=True),
+        Index('ix_trackers_last_checked', 'last_checked'),
+    )
     tracker_id = Column(Integer, primary_key=True)
-    server_id = Column(Integer, ForeignKey('servers.id'))
-    member_id = Column(Integer, ForeignKey('members.id'))
-    track_url = Column(String)
-    title = Column(String)
+    server_id = Column(DiscordID, ForeignKey('servers.id'))
+    member_id = Column(DiscordID, ForeignKey('members.id'))
+    track_url = Column(String(URL_LENGTH))
+    title = Column(String(NAME_LENGTH))
     available = Column(Boolean)
     price = Column(Float)
     last_checked = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # How the price was found when the item was tracked ("class" or "id", and its value), so it can be checked again
+    selector_type = Column(String(16))
+    selector = Column(String(NAME_LENGTH))
+    currency_symbol = Column(String(8))
+    # What the page looked like at the last check, so an unchanged page is neither downloaded nor parsed again
+    etag = Column(String(NAME_LENGTH))
+    last_modified = Column(String(64))
+    content_hash = Column(String(64))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
@@ -215,10 +241,10 @@ class Tracker(Base):
 class BotCommands(Base):
     __tablename__ = 'bot_commands'
     id = Column(Integer, primary_key = True)
-    user_id = Column(Integer)
-    username = Column(String)
-    command = Column(String)
-    last_response = Column(String)
+    user_id = Column(DiscordID)
+    username = Column(String(NAME_LENGTH))
+    command = Column(String(2000))
+    last_response = Column(String(NAME_LENGTH))
     duration = Column(Float)
     def to_dict(self):
             return {
@@ -233,10 +259,14 @@ class BotCommands(Base):
 
 class LinkedInUrls(Base):
     __tablename__ = 'linkedin_urls'
+    # Generated URLs are looked up by url, and each one is stored once
+    __table_args__ = (
+        Index('ix_linkedin_urls_url', 'url', unique=True),
+    )
     id = Column(Integer, primary_key = True)
-    url = Column(String)
-    keyword = Column(String)
-    location = Column(String)
+    url = Column(String(URL_LENGTH))
+    keyword = Column(String(NAME_LENGTH))
+    location = Column(String(NAME_LENGTH))
     applied = Column(Boolean)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -263,20 +293,20 @@ i_like = Table(
     ),
     Column(
          'member_id',  # Corrected table name here
-         Integer,
+         DiscordID,
          ForeignKey("members.id")  # Corrected table name here
     ),
     Column(
         "i_like_url",
-        String
+        String(URL_LENGTH)
     ),
     Column(
          "i_like_site",
-         String
+         String(NAME_LENGTH)
     ),
     Column(
          "i_like_title",
-         String
+         String(NAME_LENGTH)
     )
 )
 
@@ -290,19 +320,26 @@ i_might = Table(
     ),
     Column(
          'member_id',  # Corrected table name here
-         Integer,
+         DiscordID,
          ForeignKey("members.id")  # Corrected table name here
     ),
     Column(
         "i_might_like_url",
-        String
+        String(URL_LENGTH)
     ),
     Column(
          "i_might_like_site",
-         String
+         String(NAME_LENGTH)
     ),
     Column(
          "i_might_like_table",
-         String
+         String(NAME_LENGTH)
     )
 )
+
+
+# Single-row table holding the version of the schema the database is at (see renachan.managers.migrations)
+schema_version = Table(
+    "schema_version", Base.metadata,
+    Column("version", Integer, nullable=False)
+)
@@ -0,0 +1,111 @@
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import renachan.managers.models as models
+
+
+def load_seen_urls(session):
+    """
+    Unit of work for SeenUrls: every job URL already stored, as a set.
+    """
+    return set(session.execute(select(models.LinkedInUrls.url)).scalars())
+
+
+def insert_new_urls(session, rows):
+    """
+    Unit of work for SeenUrls: insert a batch of LinkedInUrls rows with one executemany, skipping URLs that are
+    already stored (ix_linkedin_urls_url is unique).
+
+    Note:
+        - SQLite gets `INSERT ... ON CONFLICT DO NOTHING` and MySQL / MariaDB `INSERT IGNORE`, so a URL another run
+          stored in the meantime never fails the batch.
+    """
+    table = models.LinkedInUrls.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        statement = sqlite_insert(table).on_conflict_do_nothing()
+    elif dialect in ("mysql", "mariadb"):
+        statement = insert(table).prefix_with("IGNORE")
+    else:
+        stored = set(session.execute(
+            select(table.c.url).where(table.c.url.in_([row['url'] for row in rows]))
+        ).scalars())
+        rows = [row for row in rows if row['url'] not in stored]
+        if not rows:
+            return
+        statement = insert(table)
+    session.execute(statement, rows)
+
+
+class SeenUrls:
+    """
+    The job URLs the LinkedIn crawl has already found, across runs.
+
+    Parameters:
+        db (renachan.managers.database.Database or None): Where the URLs are persisted (the linkedin_urls table).
+            Without a database the set only lasts as long as the object.
+        chunk_size (int): Number of rows inserted per statement by flush().
+
+    Explanation:
+    Every run of the crawl used to start over, and checking a URL meant one SELECT per URL. Instead the stored URLs are
+    read once (load()) into a plain in-memory set, so every membership test is a hash lookup. A Bloom filter would
+    use less memory, but a false positive would silently skip a new job forever; a set of job URLs stays at a few MB
+    even for tens of thousands of jobs.
+
+    add() records a URL in memory right away and queues its row; flush() writes the queued rows in bulk with
+    insert_new_urls(). The unique index on linkedin_urls.url is what keeps the table free of duplicates, so
+    overlapping runs stay correct.
+
+    Example usage:
+        seen = SeenUrls(bot.db)
+        await seen.load()
+        if seen.add({'url': url, 'keyword': keyword, 'location': location, 'applied': False}):
+            ...  # a new job
+        await seen.flush()
+    """
+    def __init__(self, db=None, chunk_size=500):
+        self.db = db
+        self.chunk_size = chunk_size
+        self._urls = None
+        self._pending = []
+
+    def __contains__(self, url):
+        return self._urls is not None and url in self._urls
+
+    def __len__(self):
+        return len(self._urls) if self._urls is not None else 0
+
+    async def load(self):
+        """
+        Read the stored URLs, once.
+        """
+        if self._urls is None:
+            self._urls = await self.db.run(load_seen_urls) if self.db is not None else set()
+
+    def add(self, row):
+        """
+        Record a URL as seen.
+
+        Parameters:
+            row (dict): The LinkedInUrls row for it: 'url', 'keyword', 'location', 'applied'.
+
+        Returns:
+            bool: True if the URL is new, False if it had been seen before.
+        """
+        if self._urls is None:
+            raise RuntimeError("SeenUrls.load() must be awaited before URLs are added")
+        if row['url'] in self._urls:
+            return False
+        self._urls.add(row['url'])
+        self._pending.append(row)
+        return True
+
+    async def flush(self):
+        """
+        Write the URLs added since the last flush.
+        """
+        rows, self._pending = self._pending, []
+        if self.db is None:
+            return
+        for start in range(0, len(rows), self.chunk_size):
+            await self.db.run(insert_new_urls, rows[start:start + self.chunk_size])
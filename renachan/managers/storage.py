@@ -0,0 +1,121 @@
+import os
+from urllib.parse import quote_plus
+
+import renachan
+
+
+class StorageBackend:
+    """
+    Describes how to connect to one kind of database.
+
+    Explanation:
+    initialize_database() doesn't need to know which database it is talking to. It asks the backend selected by
+    STORAGE_TYPE for a SQLAlchemy URL and the engine options that suit it, lets the backend configure every new
+    connection, and from then on works with a plain SQLAlchemy engine.
+
+    Methods:
+        - database_url(): The SQLAlchemy URL to connect to.
+        - engine_options(): Extra keyword arguments for create_engine(), on top of the shared pool settings.
+        - on_connect(dbapi_connection): Called for every new raw connection, e.g. to set PRAGMAs.
+    """
+    name = None
+
+    def database_url(self):
+        raise NotImplementedError
+
+    def engine_options(self):
+        return {}
+
+    def on_connect(self, dbapi_connection):
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    A local SQLite file, 'dev.db' inside the renachan package by default.
+
+    Note:
+        - Connections are opened with check_same_thread=False because the pool hands them to the database worker threads.
+        - Every new connection gets the PRAGMAs listed in SQLITE_PRAGMAS.
+    """
+    name = "sqlite"
+
+    # PRAGMAs applied to every new SQLite connection
+    ## journal_mode=WAL - readers no longer block the writer (and vice versa), so overlapping handlers don't trip over each other.
+    ## synchronous=NORMAL - in WAL mode this is still safe against corruption and saves an fsync on every commit.
+    ## busy_timeout - wait up to 5 seconds for a lock instead of failing straight away with "database is locked".
+    ## temp_store=MEMORY / cache_size - keep temporary tables and ~20MB of pages in memory.
+    SQLITE_PRAGMAS = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA busy_timeout=5000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-20000",
+    ]
+
+    def __init__(self, path=None):
+        if path is None:
+            # dev.db lives in the renachan package directory, next to managers/
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            path = os.path.join(base_dir, "dev.db")
+        self.path = path
+
+    def database_url(self):
+        return f"sqlite:///{self.path}"
+
+    def engine_options(self):
+        return {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+
+    def on_connect(self, dbapi_connection):
+        cursor = dbapi_connection.cursor()
+        for pragma in self.SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+class MySQLBackend(StorageBackend):
+    """
+    A MySQL or MariaDB server, reached through mysql-connector-python.
+
+    Explanation:
+    A database server lets several bot processes share one database, which a SQLite file can't do safely.
+    The connection details come from the DB_HOST / DB_PORT / DB_SCHEMA / DB_USER / DB_PASSWORD settings written by setup.
+
+    Note:
+        - pool_recycle replaces connections before the server's wait_timeout (8 hours by default) silently closes them.
+        - The connection uses utf8mb4 so usernames and product titles with emoji survive the round trip.
+    """
+    name = "mysql"
+
+    def database_url(self):
+        user = quote_plus(renachan.config.db_user())
+        password = quote_plus(renachan.config.db_password())
+        host = renachan.config.db_host()
+        port = renachan.config.db_port()
+        schema = renachan.config.db_schema()
+        return f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{schema}?charset=utf8mb4"
+
+    def engine_options(self):
+        return {'pool_recycle': 3600}
+
+
+# STORAGE_TYPE values the bot understands, and the backend each one uses
+STORAGE_BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "mysql": MySQLBackend,
+    "mariadb": MySQLBackend,
+}
+
+
+def get_storage_backend(storage_type):
+    """
+    Build the storage backend for a STORAGE_TYPE value.
+
+    Parameters:
+        storage_type (str): One of the keys of STORAGE_BACKENDS.
+
+    Returns:
+        StorageBackend or None: The backend, or None if the storage type is not supported.
+    """
+    backend = STORAGE_BACKENDS.get((storage_type or "").lower())
+    return backend() if backend else None
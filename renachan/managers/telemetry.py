@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from collections import deque
+
+from sqlalchemy import insert
+
+import renachan.managers.models as models
+
+
+def insert_bot_commands(session, rows):
+    """
+    Unit of work for TelemetryBuffer: insert a batch of BotCommands rows with one executemany.
+    """
+    session.execute(insert(models.BotCommands.__table__), rows)
+
+
+class TelemetryBuffer:
+    """
+    Write-behind buffer for BotCommands telemetry rows.
+
+    Parameters:
+        db (Database): The bot's data access layer (renachan.managers.database.Database).
+        batch_size (int): A flush starts as soon as this many rows are waiting.
+        flush_interval (float): Number of seconds between time-based flushes.
+        max_pending (int): Most rows held in memory. Past this, the oldest rows are dropped and counted in `dropped`.
+
+    Explanation:
+    Every command records how long it took in the `bot_commands` table. Writing and committing that row before
+    replying puts a disk fsync on the latency path of every command. Instead, `record()` only appends the row to an
+    in-memory deque and returns straight away, so the reply goes out immediately.
+
+    Rows are written in batches, with a single bulk insert and commit per batch, either when `batch_size` rows are
+    waiting or every `flush_interval` seconds, whichever comes first. `close()` (a shutdown hook) writes whatever is
+    left. Only one flush runs at a time.
+
+    Memory stays bounded under backpressure: if the database can't keep up (or is down) the deque never grows past
+    `max_pending` rows. Telemetry is the least important data the bot writes, so losing the oldest rows is preferable
+    to blocking commands or growing without limit.
+
+    Example usage:
+        bot.telemetry = TelemetryBuffer(bot.db, batch_size=50, flush_interval=5)
+        bot.telemetry.record({'user_id': ..., 'username': ..., 'command': ..., 'last_response': ..., 'duration': ...})
+    """
+    def __init__(self, db, batch_size=50, flush_interval=5, max_pending=10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self._pending = deque()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        self._timer_task = None
+
+    def record(self, row):
+        """
+        Queue one BotCommands row. Never waits on the database.
+
+        Parameters:
+            row (dict): The column values: user_id, username, command, last_response and duration.
+        """
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(row)
+
+        if self._timer_task is None:
+            # Started lazily so the buffer can be created before the event loop is running
+            self._timer_task = asyncio.ensure_future(self._flush_periodically())
+
+        if len(self._pending) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """
+        Write every queued row to the database, one batch at a time.
+        """
+        async with self._flush_lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    await self.db.run(insert_bot_commands, batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    # Put the batch back (oldest first) and try again on the next flush;
+                    # record() keeps the total bounded in the meantime
+                    logging.error(f"Could not write {len(batch)} telemetry rows: {e}")
+                    self._pending.extendleft(reversed(batch))
+                    while len(self._pending) > self.max_pending:
+                        self._pending.popleft()
+                        self.dropped += 1
+                    return
+
+    async def close(self):
+        """
+        Shutdown hook: stop the timer and write whatever is still queued.
+        """
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            self._timer_task = None
+        await self.flush()
+        if self.dropped:
+            logging.warning(f"Telemetry buffer dropped {self.dropped} rows under backpressure")
@@ -2,6 +2,8 @@ import time
 import logging
 
 import renachan
+from renachan.managers.storage import STORAGE_BACKENDS
+
 def __init__():
     input_local_host = "127.0.0.5000"
     input_local_port = "5000"
@@ -13,12 +15,19 @@ def __init__():
     input_bot_owner = input("Discord user ID:")
     input_bot_prefix = input("Command Prefix: ")
     input_bot_status = input("Bot status: (Playing xxx) ")
-    input_storage_type = input("Do you have SQLITE? [Y/N] ")
-    if input_storage_type.lower() == "y" or input_storage_type.lower() == "yes":
-        input_storage_type = "sqlite"
-    else:
-        logging.error("ERROR: Sorry this bot only works on local databases, stay updated on this feature by following me on Twitter @renadotdev :)")
+    input_db_password = ""
+    input_storage_type = input("Which database do you want to use? [sqlite/mysql/mariadb] ").strip().lower()
+    if input_storage_type not in STORAGE_BACKENDS:
+        logging.error(f"ERROR: Sorry this bot only works with {', '.join(STORAGE_BACKENDS)} databases, stay updated on this feature by following me on Twitter @renadotdev :)")
         return
+    if input_storage_type != "sqlite":
+        # A database server needs real connection details, the defaults above are only placeholders for SQLite
+        input_local_host = input("Database host: ") or "localhost"
+        input_local_port = input("Database port: ") or "3306"
+        input_db_schema = input("Database name: ") or input_db_schema
+        input_user = input("Database user: ") or input_user
+        input_db_password = input("Database password: ")
+        database_url = f"mysql+mysqlconnector://{input_user}@{input_local_host}:{input_local_port}/{input_db_schema}"
 
     try:
         config = f"""CONFIG_VERSION={renachan.config_version()}
@@ -32,6 +41,7 @@ DB_HOST={input_local_host}
 DB_PORT={input_local_port}
 DB_SCHEMA={input_db_schema}
 DB_USER={input_user}
+DB_PASSWORD={input_db_password}
 DATABASE_URL={database_url}
 """
         open('./.env', 'w').write(config)
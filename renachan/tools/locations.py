@@ -0,0 +1,39 @@
+import os
+import json
+from functools import lru_cache
+
+# The bundled location registry: LinkedIn location name -> geoId. LINKEDIN_LOCATIONS_PATH points to a bigger one.
+LOCATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locations.json")
+
+
+def normalize_location(name):
+    """
+    The registry key for a location name: case and spacing don't matter ("austin,  TX" is "Austin, TX").
+    """
+    return " ".join(str(name).lower().split())
+
+
+@lru_cache(maxsize=None)
+def load_geo_ids(path=LOCATIONS_PATH):
+    """
+    Read a location registry, once per path.
+
+    Parameters:
+        path (str): A JSON object of location name -> LinkedIn geoId.
+
+    Returns:
+        dict: normalize_location(name) -> geoId (str).
+    """
+    with open(path, encoding="utf-8") as file:
+        registry = json.load(file)
+    return {normalize_location(name): str(geo_id) for name, geo_id in registry.items()}
+
+
+def geo_id(location, geo_ids):
+    """
+    The geoId of a location, or None if the registry doesn't know it. A location given as a number is taken to be
+    a geoId already.
+    """
+    if str(location).strip().isdigit():
+        return str(location).strip()
+    return geo_ids.get(normalize_location(location))
@@ -0,0 +1,4 @@
+# The settings the LinkedIn crawl reads from the operator's linkedIn_constants.py, with values for the tests
+LOCATIONS = ["Austin, TX"]
+KEYWORDS = ["Python"]
+firefoxProfileRootDir = ""
@@ -0,0 +1,52 @@
+"""
+A local web server standing in for the sites the bot fetches from, so the tests never touch the network.
+"""
+from collections import Counter
+
+from aiohttp import web
+
+
+class StandIn:
+    """
+    Serves fixed responses on 127.0.0.1 and counts the requests made for each path.
+
+    Parameters:
+        pages (dict): path -> response. A response is a body (str), a (status, body) pair, or a coroutine function
+            taking the aiohttp request and returning a web.Response.
+
+    Example usage:
+        async with StandIn({'/item': "<html>...</html>", '/gone': (404, "")}) as site:
+            result = await fetcher.fetch(site.url("/item"))
+            assert site.requests['/item'] == 1
+    """
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = Counter()
+        self.base_url = None
+        self._runner = None
+
+    async def handle(self, request):
+        self.requests[request.path] += 1
+        page = self.pages.get(request.path)
+        if page is None:
+            return web.Response(status=404)
+        if callable(page):
+            return await page(request)
+        status, body = page if isinstance(page, tuple) else (200, page)
+        return web.Response(status=status, text=body, content_type="text/html")
+
+    def url(self, path):
+        return self.base_url + path
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
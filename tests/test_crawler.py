@@ -0,0 +1,61 @@
+import asyncio
+
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.cogs.utils.crawler import CreepyCrawler, ExtractionRules
+
+from stand_in import StandIn
+
+# A search results page: the first card's own text holds every word of the second card's title, just not together
+# ("Acme Steel Kettle" + "Glass lid"), and a long description sits between the cards so they arrive in different chunks
+LISTING = """<html><body><h1>Kettles</h1><ul class="results">
+<li><div class="card"><h3>Acme Steel Kettle</h3> <span class="variant">Glass lid</span>
+<span class="price">$19.99</span></div> <p>{padding}</p></li>
+<li><div class="card"><h3>Acme Glass Kettle</h3> <span class="price">$24.99</span></div> <p>{padding}</p></li>
+<li><div class="card"><h3>Acme Toaster</h3> <span class="price">$34.99</span></div> <p>{padding}</p></li>
+</ul></body></html>"""
+PAGE = LISTING.format(padding="Boils water fast. " * 2000)
+
+
+def crawl(titles, rules=None, stream=False):
+    """
+    Look up the price of each title on the stand-in listing in turn, like `!rena track` does.
+    Returns a (price, crawler) pair per title.
+    """
+    async def scenario():
+        fetcher = AsyncFetcher(retries=0, respect_robots=False)
+        results = []
+        async with StandIn({'/search': PAGE}) as site:
+            for title in titles:
+                crawler = CreepyCrawler(site.url("/search"), fetcher, rules=rules)
+                if stream:
+                    await crawler.stream_load("class", "price", title)
+                results.append((await crawler.find_price("class", "price", title, currency="$"), crawler))
+        await fetcher.close()
+        return results
+
+    return asyncio.run(scenario())
+
+
+def test_cached_rule_is_not_used_for_another_card():
+    rules = ExtractionRules()
+    (steel, _), (glass, _), (again, _) = crawl(["Acme Steel Kettle", "Acme Glass Kettle", "Acme Glass Kettle"], rules)
+    assert steel == 19.99
+    # Same domain and selector, so the rule from the first card applies, but it points at another product: the
+    # search runs instead and replaces the rule with the second card's, which the third crawl uses directly
+    assert glass == 24.99
+    assert again == 24.99
+    assert (rules.hits, rules.misses) == (1, 2)
+
+
+def test_stream_does_not_stop_at_another_card():
+    [(price, crawler)] = crawl(["Acme Glass Kettle"], stream=True)
+    assert price == 24.99
+    # It still stops once the product's own card is in, well before the end of the page
+    assert crawler.bytes_saved > 0
+    assert "Acme Toaster" not in crawler.tree.text_content()
+
+
+def test_stream_stops_at_the_first_card_when_it_is_the_product():
+    [(price, crawler)] = crawl(["Acme Steel Kettle"], stream=True)
+    assert price == 19.99
+    assert "Acme Glass Kettle" not in crawler.tree.text_content()
@@ -0,0 +1,75 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session as DBSession
+
+import renachan.managers.models as models
+from renachan.managers.storage import SQLiteBackend
+from renachan.managers.database import create_db_engine
+from renachan.managers.migrations import upgrade_schema
+from renachan.cogs.utils.database_helpers import sync_guild, reconcile_guild
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(SQLiteBackend(str(tmp_path / "test.db")))
+    upgrade_schema(engine, logging.getLogger(__name__))
+    yield engine
+    engine.dispose()
+
+
+def snapshot(guild_id, member_ids, owner_id=1):
+    return {'id': guild_id, 'name': f"guild {guild_id}", 'owner_id': owner_id, 'owner_name': "owner",
+            'members': [(member_id, f"member{member_id}", "0") for member_id in member_ids]}
+
+
+def count(engine, table):
+    with DBSession(bind=engine) as session:
+        return session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def run_together(*calls):
+    # Start every call at the same moment, so their lookups all happen before any of their inserts
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        barrier.wait()
+        return call()
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        return [future.result() for future in [executor.submit(run, call) for call in calls]]
+
+
+def test_concurrent_reconciliations_of_guilds_sharing_members(engine):
+    # Two guilds with the same owner and half of their members in common, reconciled side by side
+    shared = list(range(100, 1100))
+    first = snapshot(10, shared + list(range(2000, 2500)))
+    second = snapshot(20, shared + list(range(3000, 3500)))
+
+    (new_first, _), (new_second, _) = run_together(lambda: reconcile_guild(engine, first, chunk_size=200),
+                                                   lambda: reconcile_guild(engine, second, chunk_size=200))
+
+    assert new_first + new_second == 2000
+    assert count(engine, models.Owner.__table__) == 1
+    assert count(engine, models.Server.__table__) == 2
+    assert count(engine, models.Member.__table__) == 2000
+    assert count(engine, models.member_server_association) == 3000
+
+
+def test_join_while_a_guild_sharing_members_is_reconciled(engine):
+    # on_guild_join syncs the new guild while the reconciliation loop is working through one the bot was already in
+    shared = list(range(100, 1100))
+    known = snapshot(10, shared + list(range(2000, 2500)))
+    sync_guild(engine, snapshot(10, range(2000, 2500)))
+    joined = snapshot(20, shared + list(range(3000, 3500)))
+
+    new_joined, (new_known, stale) = run_together(lambda: sync_guild(engine, joined, chunk_size=200),
+                                                  lambda: reconcile_guild(engine, known, chunk_size=200))
+
+    assert new_joined + new_known == 1500
+    assert stale == 0
+    assert count(engine, models.Member.__table__) == 2000
+    assert count(engine, models.member_server_association) == 3000
@@ -0,0 +1,84 @@
+import asyncio
+
+from aiohttp import web
+
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.cogs.utils.crawler import CreepyCrawler
+
+from stand_in import StandIn
+
+PRODUCT = '<html><body><h1>Acme Kettle</h1> <span class="price">$19.99</span></body></html>'
+
+
+async def not_modified(request):
+    return web.Response(status=304)
+
+
+def fetch_all(paths, pages):
+    """
+    Fetch each path from a stand-in serving `pages`. Returns the results and the requests made per path.
+    """
+    async def scenario():
+        fetcher = AsyncFetcher(retries=1, backoff=0, respect_robots=False)
+        async with StandIn(pages) as site:
+            results = [await fetcher.fetch(site.url(path)) for path in paths]
+        await fetcher.close()
+        return results, site.requests
+
+    return asyncio.run(scenario())
+
+
+def test_error_responses_are_failures():
+    pages = {'/item': PRODUCT, '/gone': (410, ""), '/blocked': (403, ""), '/down': (503, ""), '/same': not_modified}
+    (ok, missing, gone, blocked, down, same), requests = fetch_all(
+        ["/item", "/missing", "/gone", "/blocked", "/down", "/same"], pages)
+
+    assert ok.ok and ok.error is None
+    assert [result.error for result in (missing, gone, blocked, down)] == ["HTTP 404", "HTTP 410", "HTTP 403", "HTTP 503"]
+    assert missing.status == 404 and not missing.ok
+    # A 304 is an answer, not a failure: the caller keeps what it has
+    assert same.status == 304 and same.error is None
+    # Only the 503 is worth retrying
+    assert requests['/missing'] == 1 and requests['/down'] == 2
+
+
+def test_crawler_fetches_a_missing_page_once():
+    async def scenario():
+        fetcher = AsyncFetcher(retries=1, backoff=0, respect_robots=False)
+        async with StandIn({}) as site:
+            # The steps of a streamed `!rena track` on a page that doesn't exist
+            crawler = CreepyCrawler(site.url("/missing"), fetcher)
+            await crawler.stream_load("class", "price", "Acme Kettle")
+            price = await crawler.find_price("class", "price", "Acme Kettle")
+            # The background checker's steps
+            checker = CreepyCrawler(site.url("/missing"), fetcher)
+            await checker.find_price("class", "price", "Acme Kettle")
+        await fetcher.close()
+        return price, crawler, checker, site.requests['/missing']
+
+    price, crawler, checker, requests = asyncio.run(scenario())
+    assert price is None
+    assert crawler.error == checker.error == "HTTP 404"
+    assert requests == 2
+
+
+def test_long_retry_after_is_not_waited_out():
+    async def busy(request):
+        return web.Response(status=429, headers={'Retry-After': "86400"})
+
+    async def briefly_busy(request):
+        return web.Response(status=503, headers={'Retry-After': "0"})
+
+    async def scenario():
+        fetcher = AsyncFetcher(retries=2, backoff=0, max_retry_after=1, respect_robots=False)
+        async with StandIn({'/busy': busy, '/briefly-busy': briefly_busy}) as site:
+            busy_result = await asyncio.wait_for(fetcher.fetch(site.url("/busy")), timeout=5)
+            briefly_busy_result = await fetcher.fetch(site.url("/briefly-busy"))
+        await fetcher.close()
+        return busy_result, briefly_busy_result, site.requests
+
+    busy_result, briefly_busy_result, requests = asyncio.run(scenario())
+    # A day-long wait gives up at once with the failed answer
+    assert busy_result.error == "HTTP 429" and requests['/busy'] == 1
+    # A wait within the limit is still honoured
+    assert briefly_busy_result.error == "HTTP 503" and requests['/briefly-busy'] == 3
@@ -0,0 +1,79 @@
+import json
+import asyncio
+
+from aiohttp import web
+
+from renachan.managers.inference import InferenceClient
+
+from stand_in import StandIn
+
+
+def chat(answers, bursts, timeout=5):
+    """
+    Send bursts of DMs to a stand-in model endpoint that answers with `answers` in turn.
+    Returns the responses of every burst, the client and how many requests reached the endpoint.
+    """
+    replies = iter(answers)
+
+    async def model(request):
+        status, body, delay = next(replies)
+        await asyncio.sleep(delay)
+        if body == "echo":
+            inputs = (await request.json())['inputs']
+            body = [{'generated_text': f"re: {item['text']}"} for item in inputs] if isinstance(inputs, list) \
+                else {'generated_text': f"re: {inputs['text']}"}
+        return web.Response(status=status, text=json.dumps(body), content_type="application/json")
+
+    async def scenario():
+        async with StandIn({'/model': model}) as site:
+            client = InferenceClient(site.url("/model"), "token", timeout=timeout)
+            responses = [await client.query_batch([{'inputs': {'text': text}} for text in burst]) for burst in bursts]
+            await client.close()
+        return responses, client, site.requests['/model']
+
+    return asyncio.run(scenario())
+
+
+def test_failed_batch_is_not_resent_and_keeps_batching():
+    loading = {'error': "Model is currently loading", 'estimated_time': 20}
+    responses, client, requests = chat([(503, loading, 0), (200, "echo", 0)], [["hi", "yo", "hey"], ["a", "b"]])
+    assert responses[0] == [loading] * 3
+    assert responses[1] == [{'generated_text': "re: a"}, {'generated_text': "re: b"}]
+    assert client.supports_batching
+    assert requests == 2
+
+
+def test_timed_out_batch_keeps_batching():
+    responses, client, requests = chat([(200, "echo", 1), (200, "echo", 0)], [["hi", "yo"], ["a", "b"]], timeout=0.2)
+    assert all('error' in response for response in responses[0])
+    assert responses[1][1] == {'generated_text': "re: b"}
+    assert client.supports_batching
+    assert requests == 2
+
+
+def test_endpoint_without_list_inputs_turns_batching_off():
+    # A pipeline that only takes one input answers a list with a single (successful) response
+    answers = [(200, {'generated_text': "?"}, 0)] + [(200, "echo", 0)] * 4
+    responses, client, requests = chat(answers, [["hi", "yo"], ["a", "b"]])
+    assert responses[0] == [{'generated_text': "re: hi"}, {'generated_text': "re: yo"}]
+    assert not client.supports_batching
+    assert requests == 5
+
+
+def test_client_built_before_the_loop_handles_a_queue():
+    # setup_bot() builds the client before bot.run() starts the event loop. On Python 3.9 anything loop-bound created
+    # there belongs to another loop, which only shows once requests have to wait for a free slot.
+    client = InferenceClient("http://unused", "token", max_concurrency=2)
+
+    async def model(request):
+        await asyncio.sleep(0.05)
+        return web.Response(text=json.dumps({'generated_text': "hi"}), content_type="application/json")
+
+    async def scenario():
+        async with StandIn({'/model': model}) as site:
+            client.api_endpoint = site.url("/model")
+            responses = await asyncio.gather(*(client.query({'inputs': {'text': str(i)}}) for i in range(6)))
+            await client.close()
+        return responses
+
+    assert asyncio.run(scenario()) == [{'generated_text': "hi"}] * 6
@@ -0,0 +1,74 @@
+import asyncio
+
+from aiohttp import web
+
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.cogs.utils.linkedIn_automation import Linkedin_Bot
+
+from stand_in import StandIn
+from test_linkedin_guest import GUEST_PATH, DISALLOW_ALL, CARD
+
+SEARCHES = [{'url': f"https://www.linkedin.com/jobs/search/?keywords={keyword}&geoId=104472865", 'keyword': keyword,
+             'location': "Austin, TX"} for keyword in ("Python", "Rust")]
+
+
+class Browsers:
+    """
+    Stands in for the BrowserPool: records the searches it is given and finds one job for each.
+    """
+    def __init__(self):
+        self.searches = []
+
+    async def run(self, jobs, handler):
+        self.searches.extend(jobs)
+        return [[f"https://www.linkedin.com/jobs/view/{job['keyword']}-browser"] for job in jobs]
+
+    async def close(self):
+        pass
+
+
+async def guest_search(request):
+    # Two jobs for the search's keyword, a short page, so each search is a single request
+    keyword = request.query['keywords']
+    return web.Response(text="".join(CARD.format(id=f"{keyword}-{index}") for index in range(2)))
+
+
+def collect(robots):
+    """
+    Run SEARCHES through a Linkedin_Bot whose guest endpoint is a stand-in serving `robots` as its robots.txt.
+    Returns the jobs found, the bot, the browsers and the number of search requests that reached the endpoint.
+    """
+    pages = {GUEST_PATH: guest_search}
+    if robots is not None:
+        pages['/robots.txt'] = robots
+
+    async def scenario():
+        fetcher = AsyncFetcher(retries=0)
+        browsers = Browsers()
+        async with StandIn(pages) as site:
+            linkedin = Linkedin_Bot(fetcher=fetcher, pool=browsers)
+            linkedin.guest_url = site.url(GUEST_PATH)
+            found = await linkedin.collect_jobs(SEARCHES)
+            await linkedin.close()
+        await fetcher.close()
+        return found, linkedin, browsers, site.requests[GUEST_PATH]
+
+    return asyncio.run(scenario())
+
+
+def test_searches_go_over_http_when_robots_txt_allows_it():
+    found, linkedin, browsers, requests = collect(None)
+    assert found == {search['url']: [f"https://www.linkedin.com/jobs/view/{search['keyword']}-{index}"
+                                     for index in range(2)] for search in SEARCHES}
+    assert browsers.searches == []
+    assert linkedin.fallbacks == 0 and not linkedin.robots_refused
+    assert requests == 2
+
+
+def test_searches_go_to_the_browsers_when_robots_txt_disallows_it():
+    found, linkedin, browsers, requests = collect(DISALLOW_ALL)
+    assert found == {search['url']: [f"https://www.linkedin.com/jobs/view/{search['keyword']}-browser"]
+                     for search in SEARCHES}
+    assert browsers.searches == SEARCHES
+    assert linkedin.fallbacks == 2 and linkedin.robots_refused
+    assert requests == 0
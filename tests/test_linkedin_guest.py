@@ -0,0 +1,58 @@
+import asyncio
+
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.cogs.utils.linkedIn_guest import fetch_new_jobs
+from renachan.managers.seen import SeenUrls
+
+from stand_in import StandIn
+
+GUEST_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+# What linkedin.com's robots.txt says to user agents it doesn't list
+DISALLOW_ALL = "User-agent: *\nDisallow: /\n"
+CARD = ('<li><div class="base-card base-search-card job-search-card">'
+        '<a class="base-card__full-link" href="https://www.linkedin.com/jobs/view/{id}?refId=abc"></a>'
+        '<h3 class="base-search-card__title"> Python Engineer </h3>'
+        '<h4 class="base-search-card__subtitle"><a href="/company/acme">Acme</a></h4>'
+        '<span class="job-search-card__location"> Austin, TX </span>'
+        '<time datetime="2023-08-01">1 week ago</time></div></li>')
+JOB = {'url': "https://www.linkedin.com/jobs/search/?keywords=Python&geoId=104472865", 'keyword': "Python",
+       'location': "Austin, TX"}
+
+
+def search(robots, respect_robots):
+    """
+    Run one job search against a stand-in guest endpoint serving `robots` as its robots.txt.
+    Returns the new jobs and the number of search requests that reached the endpoint.
+    """
+    pages = {GUEST_PATH: "".join(CARD.format(id=index) for index in range(3))}
+    if robots is not None:
+        pages['/robots.txt'] = robots
+
+    async def scenario():
+        fetcher = AsyncFetcher(retries=0)
+        seen = SeenUrls()
+        await seen.load()
+        async with StandIn(pages) as site:
+            jobs = await fetch_new_jobs(fetcher, JOB, seen, site.url(GUEST_PATH), respect_robots=respect_robots)
+        await fetcher.close()
+        return jobs, site.requests[GUEST_PATH]
+
+    return asyncio.run(scenario())
+
+
+def test_search_without_robots_txt():
+    jobs, requests = search(None, respect_robots=True)
+    assert [job['url'] for job in jobs] == [f"https://www.linkedin.com/jobs/view/{index}" for index in range(3)]
+    assert requests == 1
+
+
+def test_search_disallowed_by_robots_txt_goes_to_the_browsers():
+    jobs, requests = search(DISALLOW_ALL, respect_robots=True)
+    assert jobs is None
+    assert requests == 0
+
+
+def test_robots_txt_is_skipped_when_configured():
+    jobs, requests = search(DISALLOW_ALL, respect_robots=False)
+    assert len(jobs) == 3
+    assert requests == 1
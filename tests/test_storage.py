@@ -0,0 +1,124 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import text, inspect
+from sqlalchemy.engine import make_url
+
+import renachan.managers.models as models
+from renachan.managers.storage import SQLiteBackend, MySQLBackend, get_storage_backend
+from renachan.managers.database import Database, create_db_engine
+from renachan.managers.migrations import (upgrade_schema, get_schema_version, set_schema_version, LATEST_VERSION,
+                                         add_lookup_indexes, add_price_check_columns)
+
+
+@pytest.fixture
+def mysql_settings(monkeypatch):
+    monkeypatch.setenv('DB_HOST', "db.internal")
+    monkeypatch.setenv('DB_PORT', "3307")
+    monkeypatch.setenv('DB_SCHEMA', "renachan")
+    monkeypatch.setenv('DB_USER', "rena")
+    monkeypatch.setenv('DB_PASSWORD', "p@ss:word/1")
+    monkeypatch.setenv('DB_POOL_SIZE', "7")
+    monkeypatch.setenv('DB_MAX_OVERFLOW', "3")
+    monkeypatch.setenv('DB_POOL_TIMEOUT', "12")
+
+
+def save_member(session, member_id, username):
+    session.add(models.Member(id=member_id, username=username))
+
+
+def find_member(session, member_id):
+    return session.get(models.Member, member_id).username
+
+
+def test_storage_types():
+    assert isinstance(get_storage_backend("sqlite"), SQLiteBackend)
+    assert isinstance(get_storage_backend("MySQL"), MySQLBackend)
+    assert isinstance(get_storage_backend("mariadb"), MySQLBackend)
+    assert get_storage_backend("postgres") is None
+    assert get_storage_backend(None) is None
+
+
+def test_sqlite_backend_end_to_end(tmp_path):
+    backend = get_storage_backend("sqlite")
+    backend.path = str(tmp_path / "dev.db")
+    engine = create_db_engine(backend)
+
+    # A brand new database gets every table, then the latest version is recorded and a restart has nothing to do
+    upgrade_schema(engine, logging.getLogger(__name__))
+    assert upgrade_schema(engine, logging.getLogger(__name__)) == LATEST_VERSION
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == LATEST_VERSION
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+    async def scenario():
+        database = Database(engine)
+        await database.run(save_member, 42, "rena")
+        username = await database.run(find_member, 42)
+        await database.close()
+        return username
+
+    assert asyncio.run(scenario()) == "rena"
+
+
+def tracker_schema(connection):
+    inspector = inspect(connection)
+    return ({column['name'] for column in inspector.get_columns("trackers")},
+            {index['name'] for index in inspector.get_indexes("trackers")})
+
+
+def test_migrations_only_add_their_own_changes(tmp_path):
+    engine = create_db_engine(SQLiteBackend(str(tmp_path / "old.db")))
+    original = {"tracker_id", "server_id", "member_id", "track_url", "title", "available", "price", "last_checked",
+                "created_at", "updated_at"}
+    with engine.begin() as connection:
+        # trackers as the bot created them before schema versioning
+        connection.execute(text(
+            "CREATE TABLE trackers (tracker_id INTEGER PRIMARY KEY, server_id INTEGER, member_id INTEGER, "
+            "track_url VARCHAR(700), title VARCHAR(255), available BOOLEAN, price FLOAT, "
+            "last_checked DATETIME NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"))
+
+        add_lookup_indexes(connection)
+        assert tracker_schema(connection) == (original, {"ix_trackers_member_id_track_url"})
+
+        add_price_check_columns(connection)
+        columns, indexes = tracker_schema(connection)
+        assert columns == original | {"selector_type", "selector", "currency_symbol"}
+        assert indexes == {"ix_trackers_member_id_track_url", "ix_trackers_last_checked"}
+
+        # An upgrade from here (version 3) still has the page validators to add
+        connection.execute(text("CREATE TABLE members (id INTEGER PRIMARY KEY)"))
+        models.schema_version.create(connection)
+        set_schema_version(connection, 3)
+
+    assert upgrade_schema(engine, logging.getLogger(__name__)) == 3
+    with engine.connect() as connection:
+        columns, indexes = tracker_schema(connection)
+    assert columns == set(models.Tracker.__table__.columns.keys())
+    assert indexes == {index.name for index in models.Tracker.__table__.indexes}
+    engine.dispose()
+
+
+def test_mysql_backend_url_and_options(mysql_settings):
+    backend = get_storage_backend("mysql")
+    url = make_url(backend.database_url())
+    assert url.drivername == "mysql+mysqlconnector"
+    assert (url.host, url.port, url.database) == ("db.internal", 3307, "renachan")
+    # The password is quoted in the URL and comes back intact
+    assert (url.username, url.password) == ("rena", "p@ss:word/1")
+    assert url.query == {'charset': "utf8mb4"}
+    assert backend.engine_options() == {'pool_recycle': 3600}
+
+
+def test_mysql_engine_pool(mysql_settings):
+    # Building the engine loads the driver but doesn't connect, so no server is needed
+    pytest.importorskip("mysql.connector")
+    engine = create_db_engine(get_storage_backend("mysql"))
+    assert engine.pool.size() == 7
+    assert engine.pool._max_overflow == 3
+    assert engine.pool._timeout == 12
+    assert engine.pool._recycle == 3600
+    assert engine.pool._pre_ping
+    engine.dispose()
@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+from datetime import datetime
+
+from aiohttp import web
+from sqlalchemy.exc import OperationalError
+
+from renachan.cogs.tasks import check_url, notify_owner, setup_price_check_task
+from renachan.cogs.utils.fetcher import AsyncFetcher
+from renachan.cogs.utils.crawler import CrawlStats, ExtractionRules
+
+from stand_in import StandIn
+
+IN_STOCK = '<html><body><h1>Acme Kettle</h1> <span class="price">$24.99</span></body></html>'
+SOLD_OUT = '<html><body><h1>Acme Kettle</h1> <span class="stock">Sold out</span></body></html>'
+
+
+def tracker(tracker_id, path):
+    return {'tracker_id': tracker_id, 'member_id': 1, 'track_url': path, 'title': "Acme Kettle", 'price': 19.99,
+            'available': True, 'selector_type': "class", 'selector': "price", 'currency_symbol': "$",
+            'etag': None, 'last_modified': None, 'content_hash': None}
+
+
+async def accepted(request):
+    # Some shops answer bots with a 202 and a challenge page instead of the product
+    return web.Response(status=202, text=SOLD_OUT, content_type="text/html")
+
+
+def check(paths):
+    """
+    Run the background checker's check_url() on one tracker per path. Returns {path: result}.
+    """
+    pages = {'/in-stock': IN_STOCK, '/sold-out': SOLD_OUT, '/blocked': (403, SOLD_OUT), '/challenge': accepted}
+
+    async def scenario():
+        fetcher = AsyncFetcher(retries=0, respect_robots=False)
+        bot = SimpleNamespace(fetcher=fetcher, crawl_stats=CrawlStats(), extraction_rules=ExtractionRules())
+        async with StandIn(pages) as site:
+            checks = [check_url(bot, site.url(path), [tracker(index, site.url(path))], datetime.utcnow())
+                      for index, path in enumerate(paths)]
+            results = await asyncio.gather(*checks)
+        await fetcher.close()
+        return {path: result for path, [result] in zip(paths, results)}
+
+    return asyncio.run(scenario())
+
+
+def test_only_a_parsed_page_without_the_price_is_out_of_stock():
+    results = check(["/in-stock", "/sold-out", "/blocked", "/missing", "/challenge"])
+    assert (results['/in-stock']['price'], results['/in-stock']['available']) == (24.99, True)
+    assert (results['/sold-out']['price'], results['/sold-out']['available']) == (19.99, False)
+    # Pages that weren't answered with a 200 leave the tracker as it was, so nobody is told it went out of stock
+    for path in ("/blocked", "/missing", "/challenge"):
+        assert (results[path]['price'], results[path]['available']) == (19.99, True)
+
+
+class LockedDatabase:
+    """
+    A database that is locked the first time it is used, like SQLite under a long write.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    async def run(self, fn, *args):
+        self.calls += 1
+        if self.calls == 1:
+            raise OperationalError("SELECT ...", {}, Exception("database is locked"))
+        return []
+
+
+def test_price_checker_survives_a_failed_run():
+    async def scenario():
+        bot = SimpleNamespace(db=LockedDatabase(), crawl_stats=CrawlStats())
+        loop = setup_price_check_task(bot)
+        await asyncio.sleep(0.1)
+        running = loop.is_running()
+        # The next run goes through as usual
+        loop.restart()
+        await asyncio.sleep(0.1)
+        loop.cancel()
+        return running, bot.db.calls
+
+    running, calls = asyncio.run(scenario())
+    assert running
+    assert calls == 2
+
+
+class Member:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content):
+        self.messages.append(content)
+
+
+def test_first_price_of_a_tracker_stored_without_one_is_not_announced():
+    member = Member()
+    bot = SimpleNamespace(get_user=lambda member_id: member)
+    unknown, known = tracker(1, "/in-stock"), tracker(2, "/in-stock")
+    unknown['price'] = None
+
+    async def scenario():
+        await notify_owner(bot, {'tracker': unknown, 'price': 24.99, 'available': True})
+        await notify_owner(bot, {'tracker': known, 'price': 24.99, 'available': True})
+
+    asyncio.run(scenario())
+    assert member.messages == ["Heads up! The price of Acme Kettle changed from $19.99 to $24.99 :3\n/in-stock"]
+
+
+def test_trackers_on_different_versions_of_a_page_get_a_full_check():
+    async def versioned(request):
+        if request.headers.get('If-None-Match') == '"v2"':
+            return web.Response(status=304)
+        return web.Response(text=IN_STOCK, content_type="text/html", headers={'ETag': '"v2"'})
+
+    async def scenario(trackers):
+        fetcher = AsyncFetcher(retries=0, respect_robots=False)
+        bot = SimpleNamespace(fetcher=fetcher, crawl_stats=CrawlStats(), extraction_rules=ExtractionRules())
+        async with StandIn({'/item': versioned}) as site:
+            for tracker in trackers:
+                tracker['track_url'] = site.url("/item")
+            results = await check_url(bot, site.url("/item"), trackers, datetime.utcnow())
+        await fetcher.close()
+        return results, bot.crawl_stats
+
+    # The first tracker saw the current page, the second one was last checked on an older version
+    current, outdated = tracker(1, "/item"), tracker(2, "/item")
+    current.update(price=24.99, etag='"v2"')
+    outdated.update(etag='"v1"')
+    results, stats = asyncio.run(scenario([current, outdated]))
+    assert [result['price'] for result in results] == [24.99, 24.99]
+    assert results[1]['etag'] == '"v2"'
+    assert stats.not_modified == 0
+
+    # Once they agree, the check is conditional again
+    results, stats = asyncio.run(scenario([dict(current), dict(current, tracker_id=2)]))
+    assert stats.not_modified == 1